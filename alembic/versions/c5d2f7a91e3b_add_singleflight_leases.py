@@ -0,0 +1,43 @@
+"""add_singleflight_leases
+
+Revision ID: c5d2f7a91e3b
+Revises: b3a0e10df4b2
+Create Date: 2026-10-18 09:12:40.118203
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d2f7a91e3b"
+down_revision: str | Sequence[str] | None = "b3a0e10df4b2"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    # 新数据库已由 create_all 建表
+    if inspector.has_table("singleflight_leases"):
+        return
+
+    op.create_table(
+        "singleflight_leases",
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("owner", sa.String(length=128), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(op.f("ix_singleflight_leases_expires_at"), "singleflight_leases", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_singleflight_leases_expires_at"), table_name="singleflight_leases")
+    op.drop_table("singleflight_leases")
@@ -0,0 +1,41 @@
+"""add_cache_entry_blob
+
+Revision ID: d81e4b6c0f27
+Revises: c5d2f7a91e3b
+Create Date: 2026-10-18 10:05:31.402917
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d81e4b6c0f27"
+down_revision: str | Sequence[str] | None = "c5d2f7a91e3b"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    # 新数据库已由 create_all 建表
+    if any(column["name"] == "entry_blob" for column in inspector.get_columns("cache")):
+        return
+
+    with op.batch_alter_table("cache") as batch_op:
+        batch_op.add_column(sa.Column("entry_blob", sa.LargeBinary(), nullable=True))
+        batch_op.alter_column("entry_json", existing_type=sa.JSON(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 紧凑编码的条目无法在迁移中还原, 直接删除 (仅为缓存)
+    op.execute(sa.text("DELETE FROM cache WHERE entry_json IS NULL"))
+    with op.batch_alter_table("cache") as batch_op:
+        batch_op.alter_column("entry_json", existing_type=sa.JSON(), nullable=False)
+        batch_op.drop_column("entry_blob")
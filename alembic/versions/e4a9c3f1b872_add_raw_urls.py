@@ -0,0 +1,44 @@
+"""add_raw_urls
+
+Revision ID: e4a9c3f1b872
+Revises: d81e4b6c0f27
+Create Date: 2026-10-18 10:48:09.551730
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e4a9c3f1b872"
+down_revision: str | Sequence[str] | None = "d81e4b6c0f27"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    # 新数据库已由 create_all 建表
+    if inspector.has_table("raw_urls"):
+        return
+
+    op.create_table(
+        "raw_urls",
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("raw_url", sa.Text(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(op.f("ix_raw_urls_expires_at"), "raw_urls", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_raw_urls_expires_at"), table_name="raw_urls")
+    op.drop_table("raw_urls")
@@ -0,0 +1,74 @@
+"""
+CacheEntry 编码基准：对比 JSON (entry_json) 与紧凑编码 (entry_blob) 的编解码速度与体积。
+
+用法: python -m bench.bench_cache_codec [--count 30000]
+"""
+
+import argparse
+import json
+import random
+import string
+import time
+
+from services.cache import (
+    CacheEntry,
+    CacheMedia,
+    CacheMediaType,
+    CacheParseResult,
+    decode_cache_entry,
+    encode_cache_entry,
+)
+
+
+def _file_id(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_letters + string.digits + "-_", k=rng.randint(70, 90)))
+
+
+def make_entries(count: int, seed: int = 0) -> list[CacheEntry]:
+    rng = random.Random(seed)
+    entries = []
+    for _ in range(count):
+        media = [
+            CacheMedia(
+                type=rng.choice(list(CacheMediaType)),
+                file_id=_file_id(rng),
+                cover_file_id=_file_id(rng) if rng.random() < 0.3 else None,
+            )
+            for _ in range(rng.choice([1, 1, 1, 2, 4, 9]))
+        ]
+        content = " ".join(rng.choices(["解析", "视频", "图片", "hello", "world", "#tag"], k=rng.randint(5, 400)))
+        entries.append(CacheEntry(parse_result=CacheParseResult(title=content[:40], content=content), media=media))
+    return entries
+
+
+def bench(label: str, fn) -> float:  # type: ignore[no-untyped-def]
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24}{elapsed * 1000:>10.1f} ms")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=30000)
+    args = parser.parse_args()
+
+    entries = make_entries(args.count)
+    json_rows = [json.dumps(e.model_dump(mode="json"), ensure_ascii=False).encode() for e in entries]
+    blobs = [encode_cache_entry(e) for e in entries]
+
+    print(f"entries: {args.count}")
+    bench("json encode", lambda: [json.dumps(e.model_dump(mode="json"), ensure_ascii=False) for e in entries])
+    bench("compact encode", lambda: [encode_cache_entry(e) for e in entries])
+    bench("json decode+validate", lambda: [CacheEntry.model_validate(json.loads(r)) for r in json_rows])
+    bench("compact decode", lambda: [decode_cache_entry(b) for b in blobs])
+
+    json_size = sum(map(len, json_rows))
+    compact_size = sum(map(len, blobs))
+    print(f"json size      {json_size / 1024:>10.1f} KiB")
+    print(f"compact size   {compact_size / 1024:>10.1f} KiB ({compact_size / json_size:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+图片转换基准：对比旧流程 (转 JPEG 后重新打开缩放再编码) 与合并转换 (一次解码 + draft + 调优 JPEG 参数)
+的单张 CPU 时间与输出体积。
+
+用法: python -m bench.bench_image_encode [--repeat 3]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import pillow_heif
+from PIL import Image, ImageFilter
+from PIL.Image import Resampling
+
+from utils.media_processing_unit import ImageContext, MediaProcessingUnit
+
+pillow_heif.register_heif_opener()
+
+SAMPLES: list[tuple[str, tuple[int, int], str]] = [
+    ("photo.jpg", (6000, 4000), "RGB"),
+    ("photo.webp", (3000, 2000), "RGB"),
+    ("photo.heic", (4032, 3024), "RGB"),
+    ("sticker.png", (1600, 1600), "RGBA"),
+    ("small.webp", (1280, 960), "RGB"),
+]
+
+
+def make_sample(path: Path, size: tuple[int, int], mode: str) -> None:
+    """带噪声的渐变图，近似照片的可压缩性"""
+    w, h = size
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 40).filter(ImageFilter.GaussianBlur(1))
+    img = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    if mode == "RGBA":
+        img.putalpha(Image.radial_gradient("L").resize(size))
+    img.save(path, quality=92)
+
+
+def legacy_transform(src: Path, out_dir: Path, max_side: int = 2560) -> Path:
+    """旧流程: 完整解码 -> 默认参数保存 JPEG -> 重新打开 -> LANCZOS 缩放 -> 再次保存"""
+    output = src
+    with Image.open(src) as img:
+        if img.format not in {"PNG", "JPEG"} or img.mode == "RGBA":
+            output = out_dir / src.with_suffix(".jpg").name
+            (img.convert("RGB") if img.mode != "RGB" else img).save(output, format="JPEG")
+    with Image.open(output) as img:
+        w, h = img.size
+        if max(w, h) <= max_side:
+            return output
+        scale = max_side / max(w, h)
+        downscaled = out_dir / f"{output.stem}_downscaled{output.suffix}"
+        img.resize((int(w * scale), int(h * scale)), Resampling.LANCZOS).save(downscaled)
+    return downscaled
+
+
+def fused_transform(mpu: MediaProcessingUnit) -> Callable[[Path, Path], Path]:
+    def run(src: Path, _out_dir: Path) -> Path:
+        ctx = ImageContext.open(src)
+        try:
+            return mpu._transform_image(ctx).output_paths[0]
+        finally:
+            ctx.close()
+
+    return run
+
+
+def measure(fn: Callable[[Path, Path], Path], src: Path, out_dir: Path, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.process_time()
+        output = fn(src, out_dir)
+        best = min(best, time.process_time() - start)
+        size = output.stat().st_size
+    return best, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_image_"))
+    try:
+        legacy_dir, fused_dir = workdir / "legacy", workdir / "fused"
+        legacy_dir.mkdir()
+        mpu = MediaProcessingUnit(fused_dir, logger=lambda *_: None)
+        fused = fused_transform(mpu)
+
+        print(f"{'sample':<14}{'size':>12}{'legacy ms':>12}{'fused ms':>12}{'legacy KiB':>12}{'fused KiB':>12}")
+        for name, size, mode in SAMPLES:
+            src = workdir / name
+            make_sample(src, size, mode)
+            legacy_cpu, legacy_bytes = measure(legacy_transform, src, legacy_dir, args.repeat)
+            fused_cpu, fused_bytes = measure(fused, src, fused_dir, args.repeat)
+            print(
+                f"{name:<14}{f'{size[0]}x{size[1]}':>12}"
+                f"{legacy_cpu * 1000:>12.0f}{fused_cpu * 1000:>12.0f}"
+                f"{legacy_bytes / 1024:>12.0f}{fused_bytes / 1024:>12.0f}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
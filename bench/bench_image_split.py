@@ -0,0 +1,115 @@
+"""
+长图切割基准：对比旧实现 (完整解码 + 逐段裁剪保存 PNG) 与条带解码 + 并行 JPEG 编码的耗时、峰值内存与输出体积。
+
+每种实现在独立子进程中运行，峰值内存取子进程 VmHWM 相对启动时的增量 (ru_maxrss 会跨 exec 继承父进程的值)。
+
+用法: python -m bench.bench_image_split [--width 1080] [--height 40000]
+"""
+
+import argparse
+import math
+import multiprocessing
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from PIL import Image, ImageFilter
+
+SEGMENT_HEIGHT = 1400
+OVERLAP = 100
+
+
+def make_sample(path: Path, width: int, height: int) -> None:
+    """条漫风格长图：大块平涂 + 轻微噪声"""
+    tile = Image.linear_gradient("L").resize((width, 2000))
+    noise = Image.effect_noise((width, 2000), 12).filter(ImageFilter.GaussianBlur(1))
+    block = Image.merge("RGB", (tile, noise, tile.transpose(Image.Transpose.FLIP_TOP_BOTTOM)))
+    img = Image.new("RGB", (width, height))
+    for top in range(0, height, block.height):
+        img.paste(block, (0, top))
+    opts: dict[str, Any] = {"quality": 90} if path.suffix == ".jpg" else {}
+    img.save(path, **opts)
+
+
+def legacy_split(src: Path, out_dir: Path) -> list[Path]:
+    with Image.open(src) as img:
+        width, height = img.size
+        result = []
+        for i in range(math.ceil(height / SEGMENT_HEIGHT)):
+            top = i * SEGMENT_HEIGHT - (OVERLAP if i != 0 else 0)
+            bottom = min((i + 1) * SEGMENT_HEIGHT, height)
+            out_path = out_dir / f"segment_{i + 1:03d}.png"
+            img.crop((0, top, width, bottom)).save(out_path)
+            result.append(out_path)
+    return result
+
+
+def streaming_split(src: Path, out_dir: Path) -> list[Path]:
+    from utils.media_processing_unit import ImageContext, MediaProcessingUnit
+
+    mpu = MediaProcessingUnit(out_dir, segment_height=SEGMENT_HEIGHT, overlap=OVERLAP, logger=lambda *_: None)
+    ctx = ImageContext.open(src)
+    try:
+        return mpu._do_split(ctx, out_dir, SEGMENT_HEIGHT)
+    finally:
+        ctx.close()
+
+
+def _peak_rss_kib() -> int:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1])
+    raise RuntimeError("需要 Linux /proc/self/status")
+
+
+def _run(name: str, src: str, out_dir: str, queue: multiprocessing.Queue) -> None:
+    from utils.media_processing_unit import MediaProcessingUnit  # noqa: F401  预先导入，不计入峰值
+
+    fn = {"legacy": legacy_split, "streaming": streaming_split}[name]
+    baseline = _peak_rss_kib()
+    start = time.perf_counter()
+    cpu = time.process_time()
+    paths = fn(Path(src), Path(out_dir))
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+    peak = _peak_rss_kib() - baseline
+    queue.put((elapsed, cpu, peak, len(paths), sum(p.stat().st_size for p in paths)))
+
+
+def measure(name: str, src: Path, workdir: Path) -> tuple[float, float, int, int, int]:
+    out_dir = workdir / f"{name}_{src.suffix.lstrip('.')}"
+    out_dir.mkdir()
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run, args=(name, str(src), str(out_dir), queue))
+    proc.start()
+    result: tuple[float, float, int, int, int] = queue.get()
+    proc.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1080)
+    parser.add_argument("--height", type=int, default=40000)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_split_"))
+    try:
+        print(f"{'source':<8}{'impl':<11}{'wall ms':>9}{'cpu ms':>9}{'peak MiB':>10}{'segments':>10}{'output MiB':>12}")
+        for suffix in (".png", ".jpg"):
+            src = workdir / f"long{suffix}"
+            make_sample(src, args.width, args.height)
+            for name in ("legacy", "streaming"):
+                elapsed, cpu, peak, count, size = measure(name, src, workdir)
+                print(
+                    f"{suffix:<8}{name:<11}{elapsed * 1000:>9.0f}{cpu * 1000:>9.0f}"
+                    f"{peak / 1024:>10.1f}{count:>10}{size / 1024 / 1024:>12.1f}"
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+配置合并基准：对比逐字段查找元数据 + model_validate 的旧实现与预编译合并计划 + 跳过校验构造的单次耗时。
+
+用法: python -m bench.bench_settings_merge [--count 100000]
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+from typing import Any
+
+from db.models.settings import SettingsScope
+from repo.settings.schema import DEFAULT_SETTINGS_CONFIG, MergeStrategy, SettingsConfig
+from services.settings import _get_config_metadata, _hydrate_config, _merge_config_patches
+
+type Chain = list[tuple[SettingsScope, dict[str, Any]]]
+
+CHAINS: list[tuple[str, Chain]] = [
+    ("user, no rows", [(SettingsScope.USER, {})]),
+    ("user", [(SettingsScope.USER, {"default_mode": "raw", "hide_title": True})]),
+    (
+        "forum topic member",
+        [
+            (SettingsScope.FORUM_TOPIC_MEMBER, {"rich_mode": True}),
+            (SettingsScope.FORUM_TOPIC, {"hide_source": True}),
+            (SettingsScope.GROUP_MEMBER, {}),
+            (SettingsScope.GROUP, {"noprogress": True, "disabled_platforms": ["twitter", "weibo"]}),
+            (SettingsScope.USER, {"default_mode": "zip", "hide_title": True}),
+        ],
+    ),
+]
+
+
+def legacy_merge(scoped_patches: Chain) -> dict[str, Any]:
+    merged: dict[str, Any] = {}
+    for field_name in SettingsConfig.model_fields:
+        metadata = _get_config_metadata(field_name)
+        values = [
+            value
+            for scope, patch in scoped_patches
+            if scope in metadata.scopes and field_name in patch
+            for value in [patch[field_name]]
+        ]
+        if not values:
+            continue
+        match metadata.merge_strategy:
+            case MergeStrategy.UNION:
+                result = []
+                for value in values:
+                    for item in value:
+                        if item not in result:
+                            result.append(item)
+                merged[field_name] = result
+            case MergeStrategy.POLICY | MergeStrategy.PREFERENCE | MergeStrategy.STRICT:
+                merged[field_name] = values[0]
+    return merged
+
+
+def legacy_hydrate(config_patch: dict[str, Any]) -> SettingsConfig:
+    return SettingsConfig.model_validate(DEFAULT_SETTINGS_CONFIG.model_dump(mode="json") | config_patch)
+
+
+def run_legacy(chain: Chain) -> SettingsConfig:
+    return legacy_hydrate(legacy_merge(chain))
+
+
+def run_compiled(chain: Chain) -> SettingsConfig:
+    return _hydrate_config(_merge_config_patches(chain), validated=True)
+
+
+def bench(label: str, count: int, fn: Callable[[Chain], object], chain: Chain) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn(chain)
+    per_call = (time.perf_counter() - start) / count
+    print(f"  {label:<10}{per_call * 1_000_000:>10.2f} us")
+    return per_call
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+
+    for name, chain in CHAINS:
+        assert run_legacy(chain) == run_compiled(chain)
+        print(f"{name} ({len(chain)} scopes):")
+        legacy = bench("legacy", args.count, run_legacy, chain)
+        compiled = bench("compiled", args.count, run_compiled, chain)
+        print(f"  speedup   {legacy / compiled:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,8 @@ from db.init import init_db
 from i18n import ISO639_MAP
 from log import logger, setup_logging
 from plugins.helpers import COMMANDS
-from services import parse_cache
+from services import parse_cache, persistent_cache, raw_url_cache, singleflight
+from services.media import shutdown_media_executor
 from utils.event_loop import setup_optimized_event_loop
 
 pillow_heif.register_heif_opener()
@@ -49,6 +50,9 @@ class Bot(Client):
         logger.success("数据库初始化完成")
 
         parse_cache.start_cleanup()
+        raw_url_cache.start_cleanup()
+        persistent_cache.start_background()
+        singleflight.start_background()
         await super().start(*args, **kwargs)
         await self.set_menu()
         return self
@@ -56,7 +60,10 @@ class Bot(Client):
     async def stop(self, *args: Any, **kwargs: Any) -> None:
         ws.exit_flag = True
         await super().stop(*args, **kwargs)
+        await persistent_cache.stop_background()
+        await singleflight.stop_background()
         await close_db()
+        shutdown_media_executor()
         # 结束时清理下载残留
         if self.cfg.download_dir.exists() and not self.cfg.debug_skip_cleanup:
             shutil.rmtree(self.cfg.download_dir)
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 from urllib.parse import urlparse
 
 from dotenv import load_dotenv
@@ -26,6 +26,58 @@ class BotSettings(BaseSettings):
     language: str = Field(default="zh-hans")
     cache_max_entries: int = Field(default=30000, ge=0, description="缓存最大条数, 0 为不限制")
     cache_disabled: bool = Field(default=False, description="禁用缓存")
+    cache_codec: Literal["json", "compact"] = Field(
+        default="json", description="缓存写入格式, compact 为紧凑二进制编码, 读取时两种格式均支持"
+    )
+    cache_evict_low_watermark: float = Field(
+        default=0.9, gt=0, le=1, description="缓存超过最大条数后淘汰至 最大条数*该比例"
+    )
+    cache_memory_max_entries: int = Field(default=2000, ge=0, description="进程内缓存最大条数, 0 为禁用进程内缓存")
+    cache_memory_max_bytes: int = Field(
+        default=16 * 1024 * 1024, ge=0, description="进程内缓存最大字节数 (按 JSON 大小估算), 0 为不限制"
+    )
+    cache_touch_flush_interval: float = Field(default=30, gt=0, description="缓存访问时间批量写入数据库的间隔, 单位秒")
+
+    raw_url_cache_ttl: float = Field(default=86400, gt=0, description="原始链接缓存时间, 单位秒")
+    raw_url_cache_max_entries: int = Field(default=10000, ge=0, description="原始链接进程内缓存最大条数, 0 为不限制")
+    raw_url_cache_persist: bool = Field(default=False, description="原始链接缓存同时写入数据库")
+
+    media_dedup: bool = Field(
+        default=True, description="按文件内容哈希复用已上传媒体的 file_id, 相同文件跳过处理与上传"
+    )
+    media_dedup_max_entries: int = Field(default=10000, ge=0, description="内容哈希进程内缓存最大条数, 0 为不限制")
+    media_url_cache: bool = Field(default=True, description="按媒体 URL 缓存已上传媒体的 file_id, 只下载未上传过的媒体")
+    media_url_cache_max_entries: int = Field(default=10000, ge=0, description="媒体 URL 进程内缓存最大条数, 0 为不限制")
+    media_url_ignored_params: list[str] = Field(
+        default=[
+            "expires",
+            "x-expires",
+            "signature",
+            "x-signature",
+            "sig",
+            "token",
+            "auth_key",
+            "oe",
+            "oh",
+            "x-amz-date",
+            "x-amz-expires",
+            "x-amz-signature",
+            "x-amz-credential",
+            "x-amz-security-token",
+        ],
+        description="规范化媒体 URL 时去掉的查询参数 (签名、过期时间等每次解析都会变化的参数)",
+    )
+
+    settings_cache_ttl: float = Field(
+        default=300, ge=0, description="解析后的用户/群组配置缓存时间, 单位秒, 0 为不缓存"
+    )
+    settings_cache_max_entries: int = Field(default=10000, ge=0, description="配置缓存最大条数, 0 为不限制")
+
+    negative_cache_ttl: float = Field(default=60, ge=0, description="解析失败缓存时间, 单位秒, 0 为不缓存")
+    negative_cache_ttls: dict[str, float] = Field(
+        default={"UnknownPlatform": 3600, "ParseError": 300},
+        description="按错误类名设置解析失败缓存时间, 未设置的沿继承链使用父类的设置, 均未设置的使用 negative_cache_ttl",
+    )
 
     rate_limit_enabled: bool = Field(default=False, description="启用解析速率限制")
     rate_limit_burst: int = Field(default=5, ge=0, description="突发请求阈值, 0 为不限制")
@@ -36,6 +88,40 @@ class BotSettings(BaseSettings):
     # chat_id 在 RATE_LIMIT_BURST_WINDOW 秒内达到 RATE_LIMIT_BURST 次解析后，进入 RATE_LIMIT_COOLDOWN 秒冷却期;
     # 冷却期内每 RATE_LIMIT_THROTTLE_WINDOW 秒最多允许 RATE_LIMIT_THROTTLE 次解析.
 
+    scheduler_parse_workers: int = Field(default=16, ge=0, description="解析阶段最大并发数, 0 为不限制")
+    scheduler_download_workers: int = Field(default=4, ge=0, description="下载阶段最大并发数, 0 为不限制")
+    scheduler_media_workers: int = Field(default=2, ge=0, description="媒体处理阶段最大并发数, 0 为不限制")
+    parse_prefetch: bool = Field(
+        default=False,
+        description="查询缓存的同时预先开始解析, 缓存命中时取消; 命中缓存的请求也会消耗上游请求与 Cookie / 代理额度",
+    )
+    platform_detect_cache_size: int = Field(
+        default=4096, ge=0, description="平台识别结果按消息文本缓存的条数, 过滤器与解析处理共享"
+    )
+
+    media_process_parallel: bool = Field(default=True, description="使用进程池并行处理同一条流水线中的媒体文件")
+    media_process_workers: int = Field(default=0, ge=0, description="媒体处理进程池大小, 0 为 CPU 核心数")
+    media_process_concurrency: int = Field(default=4, ge=1, description="单条流水线同时处理的文件数")
+    media_process_global_concurrency: int = Field(
+        default=0, ge=0, description="全局同时处理的文件数, 0 为与进程池大小一致"
+    )
+
+    subprocess_memory_limit: int = Field(
+        default=0, ge=0, description="外部命令 (ffmpeg / ffprobe) 虚拟内存上限, 单位字节, 0 为不限制"
+    )
+    subprocess_cpu_limit: int = Field(default=0, ge=0, description="外部命令 CPU 时间上限, 单位秒, 0 为不限制")
+    transcode_max_jobs: int = Field(default=0, ge=0, description="同时运行的视频转码数, 0 为 CPU 核心数 / 4")
+    transcode_h264: bool = Field(
+        default=True,
+        description="非 h264 编码的视频 (HEVC / AV1 / VP9 等) 转码为 h264 后发送, 部分客户端无法播放其他编码",
+    )
+
+    singleflight_backend: Literal["local", "database"] = Field(
+        default="local", description="Singleflight 后端, 多副本部署时使用 database"
+    )
+    singleflight_lease_ttl: float = Field(default=60, gt=0, description="Singleflight 租约有效期, 单位秒")
+    singleflight_poll_interval: float = Field(default=1, gt=0, description="等待其他副本时的轮询间隔, 单位秒")
+
     download_dir: Path = Path("downloads")
 
     database_url: str = Field(default="sqlite+aiosqlite:///data/db/database.db")
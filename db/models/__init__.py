@@ -1,7 +1,23 @@
 from db.models.cache import Cache
 from db.models.chat import Chat, ChatType
 from db.models.forum_topic import ForumTopic
+from db.models.media_hash import MediaHash
+from db.models.media_url import MediaUrl
+from db.models.raw_url import RawUrl
 from db.models.settings import Settings, SettingsScope
+from db.models.singleflight import SingleflightLease
 from db.models.user import User
 
-__all__ = ["User", "Settings", "Cache", "ForumTopic", "Chat", "ChatType", "SettingsScope"]
+__all__ = [
+    "User",
+    "Settings",
+    "Cache",
+    "ForumTopic",
+    "Chat",
+    "ChatType",
+    "SettingsScope",
+    "SingleflightLease",
+    "RawUrl",
+    "MediaHash",
+    "MediaUrl",
+]
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import JSON, DateTime, Index, String, Text, func
+from sqlalchemy import JSON, DateTime, Index, LargeBinary, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from db.base import Base
@@ -15,7 +15,9 @@ class Cache(Base):
 
     key: Mapped[str] = mapped_column(String(64), primary_key=True)
     url: Mapped[str] = mapped_column(Text, nullable=False)
-    entry_json: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    entry_json: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
+    entry_blob: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    """紧凑编码的条目, 与 entry_json 二选一"""
     accessed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import JSON, BigInteger, DateTime, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.base import Base
+
+
+class MediaHash(Base):
+    __tablename__ = "media_hashes"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    """文件大小 + 内容哈希"""
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    media_json: Mapped[list[dict[str, Any]]] = mapped_column(JSON, nullable=False)
+    """该文件处理后各输出上传得到的 CacheMedia 列表"""
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
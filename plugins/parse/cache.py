@@ -1,6 +1,13 @@
+import os
+from collections import defaultdict
+from typing import BinaryIO
+
+from parsehub.types import AnyMediaRef, LivePhotoRef
 from pyrogram.types import InputMediaDocument, InputMediaPhoto, InputMediaVideo, Message
 
-from services import CacheMedia, CacheMediaType
+from log import logger
+from services import CacheMedia, CacheMediaType, media_hash_index, media_url_cache
+from services.media import ProcessedMedia
 
 
 def cache_media_from_message(m: Message) -> CacheMedia | None:
@@ -43,3 +50,50 @@ def build_cached_media_group(
             case CacheMediaType.DOCUMENT:
                 group.append(InputMediaDocument(media=m.file_id))
     return group
+
+
+class UploadRecorder:
+    """
+    收集本次上传得到的 CacheMedia。一个媒体的全部输出都上传成功后，
+    按媒体 URL 写入 media_url_cache，按源文件内容哈希写入 media_hash_index。
+    """
+
+    def __init__(self) -> None:
+        self._slots: dict[str, tuple[int, int]] = {}
+        """上传的本地路径或 file_id -> (媒体, 输出序号)"""
+        self._items: dict[int, tuple[AnyMediaRef, ProcessedMedia, int]] = {}
+        self._uploaded: defaultdict[int, dict[int, CacheMedia]] = defaultdict(dict)
+
+    def track(self, media_ref: AnyMediaRef, processed: ProcessedMedia, media: list[str]) -> None:
+        """登记一个媒体的全部输出，media 为上传用的本地路径 (内容哈希命中时为 file_id)"""
+        item = id(processed)
+        self._items[item] = (media_ref, processed, len(media))
+        for i, m in enumerate(media):
+            self._slots[m] = (item, i)
+
+    def uploaded(self, media: str | os.PathLike[str] | BinaryIO | None, m: Message | None) -> None:
+        """记录一个已发送的输出；降级为 document 的不记录"""
+        if isinstance(media, os.PathLike):
+            media = os.fspath(media)
+        if m is None or not isinstance(media, str) or (slot := self._slots.get(media)) is None:
+            return
+        cm = cache_media_from_message(m)
+        if cm is None or cm.type == CacheMediaType.DOCUMENT:
+            return
+        item, index = slot
+        self._uploaded[item][index] = cm
+
+    async def flush(self) -> None:
+        uploaded, self._uploaded = self._uploaded, defaultdict(dict)
+        for item, parts in uploaded.items():
+            media_ref, processed, count = self._items[item]
+            if len(parts) != count:
+                continue
+            media = [parts[i] for i in range(count)]
+            try:
+                if not isinstance(media_ref, LivePhotoRef):
+                    await media_url_cache.set(media_ref.url, media)
+                if processed.content_hash is not None and not processed.cached_media:
+                    await media_hash_index.set(processed.content_hash, media)
+            except Exception as e:
+                logger.warning(f"写入已上传媒体缓存失败: url={media_ref.url}, error={e}")
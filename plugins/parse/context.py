@@ -38,6 +38,7 @@ class ParseOptions:
     skip_media_processing: bool
     singleflight: bool
     save_metadata: bool
+    streaming: bool
     gif_only_skip_download_count_threshold: int
 
     @classmethod
@@ -47,16 +48,18 @@ class ParseOptions:
                 return cls(
                     use_caching=False,
                     skip_media_processing=True,
-                    singleflight=False,
+                    singleflight=True,
                     save_metadata=False,
+                    streaming=False,
                     gif_only_skip_download_count_threshold=0,
                 )
             case ParseMode.ZIP:
                 return cls(
                     use_caching=False,
                     skip_media_processing=True,
-                    singleflight=False,
+                    singleflight=True,
                     save_metadata=True,
+                    streaming=False,
                     gif_only_skip_download_count_threshold=0,
                 )
             case ParseMode.PREVIEW:
@@ -65,5 +68,6 @@ class ParseOptions:
                     skip_media_processing=False,
                     singleflight=not bypass_cache,
                     save_metadata=False,
+                    streaming=True,
                     gif_only_skip_download_count_threshold=GIF_ONLY_SKIP_DOWNLOAD_COUNT_THRESHOLD,
                 )
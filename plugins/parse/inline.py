@@ -94,7 +94,7 @@ async def call_inline_parse(cli: Client, inline_query: InlineQuery) -> None:
 
     parse_result = await parse_cache.get(raw_url)
     if parse_result is None:
-        parse_result = await ParseService().parse(inline_query.query)
+        parse_result = await ParseService().parse(inline_query.query, negative_cache_key=raw_url)
         await parse_cache.set(raw_url, parse_result)
 
     results = await build_inline_results(parse_result, cli, lang, config)
@@ -142,7 +142,7 @@ async def inline_result_download(cli: Client, chosen_result: ChosenInlineResult)
             file_paths = processed.output_paths or [processed.source.path]
             file_path_str = str(file_paths[0])
             logger.debug(f"inline 上传文件: {file_path_str}")
-            width, height, duration = resolve_media_info(processed, file_path_str)
+            width, height, duration = await resolve_media_info(processed, file_path_str)
 
             video_cover = str(video_ref.thumb_url) if video_ref and video_ref.thumb_url else None
             media = (
@@ -0,0 +1,97 @@
+"""解析请求规划 — 相互独立的查询并发执行，缩短请求进入流水线前的串行等待"""
+
+import asyncio
+from dataclasses import dataclass
+
+from parsehub.types import AnyParseResult
+from pyrogram.types import Message
+
+from core import bs
+from db import get_session
+from plugins.context import get_config_target
+from plugins.parse.context import ParseOptions, ParseRequest
+from repo.settings import SettingsConfig
+from services import CacheEntry, ParsePrefetch, ParseService, SettingsService, UserService
+from services.cache import parse_cache, persistent_cache
+from services.pipeline import has_local_flight
+
+
+@dataclass(slots=True)
+class ParsePlan:
+    raw_url: str
+    cached_entry: CacheEntry | None = None
+    """file_id 缓存，命中时直接发送"""
+    parse_result: AnyParseResult | None = None
+    """解析结果缓存"""
+    prefetch: ParsePrefetch | None = None
+    """缓存均未命中时仍在进行的预先解析"""
+
+
+async def _get_lang(msg: Message) -> str | None:
+    if not msg.from_user:
+        return None
+    async with get_session() as session:
+        return await UserService(session).get_lang(msg.from_user.id)
+
+
+async def _get_config(msg: Message) -> SettingsConfig:
+    async with get_session() as session:
+        return await SettingsService(session).get_config(get_config_target(msg))
+
+
+async def load_settings(msg: Message) -> tuple[str | None, SettingsConfig]:
+    """并发读取用户语言与配置链 (各自使用独立的会话)"""
+    lang, config = await asyncio.gather(_get_lang(msg), _get_config(msg))
+    return lang, config
+
+
+async def load_request(msg: Message, url: str) -> tuple[str | None, SettingsConfig, str | Exception]:
+    """
+    通过速率限制后调用，获取原始 URL 与读取用户语言、配置链同时进行。
+
+    获取原始 URL 失败时返回该异常，由调用方按读取到的语言与配置报告；读取配置失败时抛出异常。
+    """
+    settings, raw_url = await asyncio.gather(
+        load_settings(msg), ParseService().get_raw_url(url), return_exceptions=True
+    )
+    if isinstance(settings, BaseException):
+        raise settings
+    if isinstance(raw_url, BaseException) and not isinstance(raw_url, Exception):
+        raise raw_url
+    lang, config = settings
+    return lang, config, raw_url
+
+
+def _start_prefetch(req: ParseRequest, raw_url: str) -> ParsePrefetch | None:
+    """
+    开启 parse_prefetch 时开始预先解析。
+
+    近期解析失败、同一链接已在预先解析或已有流水线执行时不启动，交给流水线按失败缓存与 singleflight 处理，
+    避免重复请求上游。
+    """
+    if not bs.parse_prefetch or has_local_flight(raw_url):
+        return None
+    return ParseService().prefetch(req.url, raw_url, use_negative_cache=not req.bypass_cache)
+
+
+async def plan_parse(req: ParseRequest, options: ParseOptions, raw_url: str) -> ParsePlan:
+    """查询缓存；可以预先解析时 (见 _start_prefetch) 同时开始解析，缓存命中时取消"""
+    prefetch = _start_prefetch(req, raw_url)
+    try:
+        plan = ParsePlan(raw_url=raw_url, prefetch=prefetch)
+        if req.bypass_cache:
+            return plan
+        if options.use_caching and (cached_entry := await persistent_cache.get(raw_url)):
+            plan.cached_entry = cached_entry
+        elif cached_parse_result := await parse_cache.get(raw_url):
+            plan.parse_result = cached_parse_result
+        else:
+            return plan
+    except BaseException:
+        if prefetch is not None:
+            prefetch.cancel()
+        raise
+    if prefetch is not None:
+        prefetch.cancel()
+        plan.prefetch = None
+    return plan
@@ -21,7 +21,6 @@ logger = logger.bind(name="ParseReporter")
 
 async def disable_progress_on_report_forbidden(msg: Message, config: SettingsConfig) -> None:
     """状态消息无权限时自动关闭解析进度。"""
-    config.noprogress = True
     target = get_config_target(msg, include_member=False)
     async with get_session() as session:
         await SettingsService(session).patch_config(target=target, noprogress=True)
@@ -46,9 +45,11 @@ class MessageStatusReporter(StatusReporter):
         self._t = t
         self._config = config
         self._on_forbidden = on_forbidden
+        self._progress_disabled = False
+        """无权限发送状态消息后本次请求不再报告进度 (配置为共享的只读实例, 不直接修改)"""
 
     async def report(self, text: str) -> None:
-        if self._config.noprogress:
+        if self._config.noprogress or self._progress_disabled:
             return
         await self._edit_text(format_label(text))
 
@@ -89,6 +90,7 @@ class MessageStatusReporter(StatusReporter):
             pass
         except Forbidden as e:
             logger.warning(f"状态消息发送失败, Bot 无权限: {e}")
+            self._progress_disabled = True
             if self._on_forbidden:
                 await self._on_forbidden(self._user_msg, self._config)
 
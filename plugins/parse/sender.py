@@ -1,6 +1,7 @@
 import asyncio
 import os
-from collections.abc import Awaitable, Callable, Sequence
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable, Mapping, Sequence
+from contextlib import aclosing
 from dataclasses import dataclass, replace
 from functools import partial
 from itertools import batched
@@ -30,7 +31,7 @@ from pyrogram.types import (
 from core import bs
 from log import logger
 from plugins.helpers import build_caption, build_caption_by_str, format_label
-from plugins.parse.cache import build_cached_media_group, cache_media_from_message
+from plugins.parse.cache import UploadRecorder, build_cached_media_group, cache_media_from_message
 from repo.settings import SettingsConfig
 from services import CacheEntry, CacheMedia, CacheMediaType, CacheParseResult, PipelineResult, StatusReporter
 from services.media import ProcessedMedia, resolve_media_info
@@ -435,20 +436,55 @@ async def send_media(
     processed_list: list[ProcessedMedia],
     caption: str,
     *,
+    reused_media: Mapping[int, list[CacheMedia]] | None = None,
     _t: PreLocaleSelector,
 ) -> CacheEntry | None:
-    """构建、发送媒体，并返回缓存条目。"""
+    """构建、发送媒体，并返回缓存条目。reused_media 中的媒体直接使用已上传的 file_id。"""
     media_refs = to_list(parse_result.media)
-    photos_videos, animations = build_input_media(media_refs, processed_list, video_cover=sender.config.video_cover)
+    recorder = UploadRecorder()
+    photos_videos, animations = await build_input_media(
+        media_refs,
+        processed_list,
+        video_cover=sender.config.video_cover,
+        recorder=recorder,
+        reused_media=reused_media,
+    )
     all_count = len(photos_videos) + len(animations)
     logger.debug(f"媒体分类完成: animations={len(animations)}, photos_videos={len(photos_videos)}")
 
     if all_count == 1:
         logger.debug("单媒体模式发送")
-        media_list = await send_single(sender, photos_videos, animations, caption)
+        media_list = await send_single(sender, photos_videos, animations, caption, recorder=recorder)
     else:
         logger.debug(f"多媒体模式发送: total={all_count}")
-        media_list = await send_multi(sender, photos_videos, animations, caption, media_refs, _t=_t)
+        media_list = await send_multi(sender, photos_videos, animations, caption, media_refs, recorder=recorder, _t=_t)
+    await recorder.flush()
+
+    if media_list is None:
+        return None
+    return CacheEntry(
+        parse_result=CacheParseResult(title=parse_result.title, content=parse_result.content),
+        media=media_list,
+    )
+
+
+async def send_media_stream(
+    sender: MessageSender,
+    parse_result: AnyParseResult,
+    media_stream: AsyncGenerator[ProcessedMedia, None],
+    caption: str,
+    *,
+    reused_media: Mapping[int, list[CacheMedia]] | None = None,
+    _t: PreLocaleSelector,
+) -> CacheEntry | None:
+    """边处理边发送多媒体，并返回缓存条目。"""
+    media_refs = to_list(parse_result.media)
+    recorder = UploadRecorder()
+    async with aclosing(media_stream):
+        media_list = await send_multi_stream(
+            sender, media_stream, caption, media_refs, recorder=recorder, reused_media=reused_media, _t=_t
+        )
+    await recorder.flush()
 
     if media_list is None:
         return None
@@ -495,18 +531,71 @@ def media_input(media: str | BinaryIO | None) -> str | BinaryIO:
     return cast(str | BinaryIO, media)
 
 
-def build_input_media(
-    media_refs: Sequence[AnyMediaRef], processed_list: list[ProcessedMedia], *, video_cover: bool
+def cached_input_media(
+    media: list[CacheMedia], *, video_cover: bool
 ) -> tuple[list[InputMediaPhoto | InputMediaVideo], list[InputMediaAnimation]]:
-    """根据处理结果和媒体引用构建 Telegram InputMedia 列表。"""
+    """用已上传的 file_id 构建 InputMedia 列表。"""
     photos_videos: list[InputMediaPhoto | InputMediaVideo] = []
     animations: list[InputMediaAnimation] = []
+    for m in media:
+        match m.type:
+            case CacheMediaType.PHOTO:
+                photos_videos.append(InputMediaPhoto(media=m.file_id))
+            case CacheMediaType.VIDEO:
+                photos_videos.append(
+                    InputMediaVideo(
+                        media=m.file_id,
+                        video_cover=m.cover_file_id if video_cover else None,
+                        supports_streaming=True,
+                    )
+                )
+            case CacheMediaType.ANIMATION:
+                animations.append(InputMediaAnimation(media=m.file_id))
+    return photos_videos, animations
+
+
+async def build_input_media(
+    media_refs: Sequence[AnyMediaRef],
+    processed_list: list[ProcessedMedia],
+    *,
+    video_cover: bool,
+    recorder: UploadRecorder | None = None,
+    reused_media: Mapping[int, list[CacheMedia]] | None = None,
+) -> tuple[list[InputMediaPhoto | InputMediaVideo], list[InputMediaAnimation]]:
+    """
+    根据处理结果和媒体引用构建 Telegram InputMedia 列表。
+
+    reused_media 中的媒体 (按媒体序号) 未下载，不占用 processed_list 的位置；
+    它们与内容哈希命中的媒体一样直接使用已上传的 file_id。
+    """
+    photos_videos: list[InputMediaPhoto | InputMediaVideo] = []
+    animations: list[InputMediaAnimation] = []
+    processed_iter = iter(processed_list)
+
+    for index, media_ref in enumerate(media_refs):
+        if reused_media and index in reused_media:
+            cached_photos_videos, cached_animations = cached_input_media(reused_media[index], video_cover=video_cover)
+            photos_videos.extend(cached_photos_videos)
+            animations.extend(cached_animations)
+            continue
+        if (processed := next(processed_iter, None)) is None:
+            break
+        if processed.cached_media:
+            cached_photos_videos, cached_animations = cached_input_media(
+                processed.cached_media, video_cover=video_cover
+            )
+            photos_videos.extend(cached_photos_videos)
+            animations.extend(cached_animations)
+            if recorder is not None:
+                recorder.track(media_ref, processed, [m.file_id for m in processed.cached_media])
+            continue
 
-    for media_ref, processed in zip(media_refs, processed_list, strict=False):
         file_paths = processed.output_paths or [processed.source.path]
+        if recorder is not None:
+            recorder.track(media_ref, processed, [str(p) for p in file_paths])
         for file_path in file_paths:
             file_path_str = str(file_path)
-            width, height, duration = resolve_media_info(processed, file_path_str)
+            width, height, duration = await resolve_media_info(processed, file_path_str)
 
             match processed.source:
                 case ImageFile():
@@ -544,6 +633,8 @@ async def send_single(
     photos_videos: list[InputMediaPhoto | InputMediaVideo],
     animations: list[InputMediaAnimation],
     caption: str,
+    *,
+    recorder: UploadRecorder | None = None,
 ) -> list[CacheMedia] | None:
     """发送单个媒体，返回 CacheMedia 列表。上传失败时降级为 document。"""
     media_list: list[CacheMedia] = []
@@ -573,6 +664,8 @@ async def send_single(
 
         if sent and (cm := cache_media_from_message(sent)):
             media_list.append(cm)
+            if recorder is not None:
+                recorder.uploaded(all_media[0].media, sent)
     except Exception as e:
         logger.warning(f"上传失败 {e}, 使用兼容模式上传")
         await sender.upload_document()
@@ -599,6 +692,7 @@ async def send_multi(
     caption: str,
     media_refs: Sequence[AnyMediaRef],
     *,
+    recorder: UploadRecorder | None = None,
     _t: PreLocaleSelector,
 ) -> list[CacheMedia] | None:
     """发送多个媒体（动图逐条、图片视频分批），返回 CacheMedia 列表。"""
@@ -626,6 +720,8 @@ async def send_multi(
                     media_list.append(CacheMedia(type=CacheMediaType.DOCUMENT, file_id=sent.document.file_id))
                 elif sent and sent.animation:
                     media_list.append(CacheMedia(type=CacheMediaType.ANIMATION, file_id=sent.animation.file_id))
+                if recorder is not None:
+                    recorder.uploaded(ani.media, sent)
 
     try:
         for batch in batched(photos_videos, 10):
@@ -634,9 +730,11 @@ async def send_multi(
 
             await sender.upload_photo()
             sent_msgs = await sender.media_group(list(batch))
-            for m in sent_msgs:
+            for item, m in zip(batch, sent_msgs, strict=False):
                 if cm := cache_media_from_message(m):
                     media_list.append(cm)
+                if recorder is not None:
+                    recorder.uploaded(item.media, m)
     except Exception as e:
         logger.warning(f"上传失败 {e}, 使用兼容模式上传")
         input_documents: list[InputMediaDocument] = [
@@ -653,6 +751,120 @@ async def send_multi(
     return None if not_cache else media_list
 
 
+async def send_multi_stream(
+    sender: MessageSender,
+    media_stream: AsyncIterator[ProcessedMedia],
+    caption: str,
+    media_refs: Sequence[AnyMediaRef],
+    *,
+    recorder: UploadRecorder | None = None,
+    reused_media: Mapping[int, list[CacheMedia]] | None = None,
+    _t: PreLocaleSelector,
+) -> list[CacheMedia] | None:
+    """
+    send_multi 的流式版本：每凑满 10 个图片视频立即发送一组，动图到达后立即发送。
+    为保证 caption 落在最后一组，始终保留最后一组到流结束后再发送。
+    media_stream 不产出 reused_media 中的媒体，这些媒体按原顺序插入，直接使用已上传的 file_id。
+    """
+    media_list: list[CacheMedia] = []
+    not_cache = False
+    skip_animations = len([i for i in media_refs if isinstance(i, AniRef)]) > GIF_ONLY_SKIP_DOWNLOAD_COUNT_THRESHOLD
+    if skip_animations:
+        not_cache = True
+        await sender.text(
+            format_label(_t("GIF 过多跳过上传, 请自行下载")),
+            reply_markup=build_gif_button(media_refs),
+        )
+
+    pending: list[InputMediaPhoto | InputMediaVideo] = []
+    pending_animation: InputMediaAnimation | None = None
+    as_document = False
+
+    async def send_animation(ani: InputMediaAnimation, caption_: str) -> None:
+        nonlocal not_cache
+        await sender.upload_photo()
+        try:
+            sent = await sender.animation(media_input(ani.media), caption=caption_)
+        except Exception as e:
+            logger.warning(f"上传失败 {e}, 使用兼容模式上传")
+            not_cache = True
+            await sender.upload_document()
+            await sender.force_document(media_input(ani.media), caption=caption_)
+        else:
+            if sent and sent.document:
+                media_list.append(CacheMedia(type=CacheMediaType.DOCUMENT, file_id=sent.document.file_id))
+            elif sent and sent.animation:
+                media_list.append(CacheMedia(type=CacheMediaType.ANIMATION, file_id=sent.animation.file_id))
+            if recorder is not None:
+                recorder.uploaded(ani.media, sent)
+
+    async def send_batch(batch: list[InputMediaPhoto | InputMediaVideo], caption_: str) -> None:
+        nonlocal as_document, not_cache
+        if not as_document:
+            if caption_:
+                batch[0].caption = caption_
+            try:
+                await sender.upload_photo()
+                sent_msgs = await sender.media_group(list(batch))
+            except Exception as e:
+                logger.warning(f"上传失败 {e}, 后续媒体使用兼容模式上传")
+                batch[0].caption = ""
+                as_document = True
+                not_cache = True
+            else:
+                for item, m in zip(batch, sent_msgs, strict=False):
+                    if cm := cache_media_from_message(m):
+                        media_list.append(cm)
+                    if recorder is not None:
+                        recorder.uploaded(item.media, m)
+                return
+
+        documents: list[ReplyMediaGroupItem] = [InputMediaDocument(media=media_input(item.media)) for item in batch]
+        if caption_:
+            documents[-1].caption = caption_
+        await sender.upload_document()
+        await sender.media_group(documents)
+
+    async def enqueue(
+        photos_videos: list[InputMediaPhoto | InputMediaVideo], animations: list[InputMediaAnimation]
+    ) -> None:
+        nonlocal pending, pending_animation
+        if not skip_animations:
+            for ani in animations:
+                if pending_animation is not None:
+                    await send_animation(pending_animation, "")
+                pending_animation = ani
+
+        pending.extend(photos_videos)
+        while len(pending) > 10:
+            batch, pending = pending[:10], pending[10:]
+            await send_batch(batch, "")
+
+    media_index = 0
+
+    async def enqueue_reused() -> None:
+        nonlocal media_index
+        while reused_media and media_index in reused_media:
+            await enqueue(*cached_input_media(reused_media[media_index], video_cover=sender.config.video_cover))
+            media_index += 1
+
+    async for processed in media_stream:
+        await enqueue_reused()
+        media_ref = media_refs[media_index]
+        media_index += 1
+        await enqueue(
+            *await build_input_media([media_ref], [processed], video_cover=sender.config.video_cover, recorder=recorder)
+        )
+    await enqueue_reused()
+
+    if pending_animation is not None:
+        await send_animation(pending_animation, "" if pending else caption)
+    if pending:
+        await send_batch(pending, caption)
+
+    return None if not_cache else media_list
+
+
 async def send_cached_single(sender: MessageSender, m: CacheMedia, caption: str, *, video_cover: bool) -> None:
     """从缓存发送单个媒体。"""
     match m.type:
@@ -1,7 +1,21 @@
 from repo.cache import CacheRepo
 from repo.chat import ChatRepo
 from repo.forum_topic import ForumTopicRepo
+from repo.media_hash import MediaHashRepo
+from repo.media_url import MediaUrlRepo
+from repo.raw_url import RawUrlRepo
 from repo.settings import SettingsRepo
+from repo.singleflight import SingleflightLeaseRepo
 from repo.user import UserRepo
 
-__all__ = ["UserRepo", "SettingsRepo", "CacheRepo", "ChatRepo", "ForumTopicRepo"]
+__all__ = [
+    "UserRepo",
+    "SettingsRepo",
+    "CacheRepo",
+    "ChatRepo",
+    "ForumTopicRepo",
+    "SingleflightLeaseRepo",
+    "RawUrlRepo",
+    "MediaHashRepo",
+    "MediaUrlRepo",
+]
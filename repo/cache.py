@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, cast
 
-from sqlalchemy import delete, func, select
+from sqlalchemy import CursorResult, Select, delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models.cache import Cache
@@ -15,13 +15,22 @@ class CacheRepo:
         cache = await self._session.scalar(select(Cache).where(Cache.key == key))
         return cache
 
-    async def upsert(self, *, key: str, url: str, entry_json: dict[str, Any], accessed_at: datetime) -> Cache:
+    async def upsert(
+        self,
+        *,
+        key: str,
+        url: str,
+        entry_json: dict[str, Any] | None,
+        accessed_at: datetime,
+        entry_blob: bytes | None = None,
+    ) -> Cache:
         cache = await self.get(key)
         if cache is None:
             cache = Cache(
                 key=key,
                 url=url,
                 entry_json=entry_json,
+                entry_blob=entry_blob,
                 accessed_at=accessed_at,
             )
             self._session.add(cache)
@@ -29,6 +38,7 @@ class CacheRepo:
 
         cache.url = url
         cache.entry_json = entry_json
+        cache.entry_blob = entry_blob
         cache.accessed_at = accessed_at
         return cache
 
@@ -36,30 +46,31 @@ class CacheRepo:
     async def touch(cache: Cache, accessed_at: datetime) -> None:
         cache.accessed_at = accessed_at
 
+    async def touch_many(self, keys: list[str], accessed_at: datetime) -> None:
+        if not keys:
+            return
+        await self._session.execute(update(Cache).where(Cache.key.in_(keys)).values(accessed_at=accessed_at))
+
     async def remove(self, cache: Cache) -> None:
         await self._session.delete(cache)
 
-    async def remove_by_key(self, key: str) -> None:
-        cache = await self.get(key)
-        if cache is not None:
-            await self.remove(cache)
+    async def remove_by_key(self, key: str) -> bool:
+        result = await self._session.execute(delete(Cache).where(Cache.key == key))
+        return cast(CursorResult, result).rowcount > 0
 
     async def count(self) -> int:
         count = await self._session.scalar(select(func.count()).select_from(Cache))
         return count or 0
 
-    async def remove_stale(self, stale_before: datetime) -> int:
-        keys = await self._session.scalars(select(Cache.key).where(Cache.accessed_at < stale_before))
-        return await self.remove_by_keys(list(keys.all()))
+    async def remove_stale(self, stale_before: datetime, limit: int) -> int:
+        keys = select(Cache.key).where(Cache.accessed_at < stale_before).order_by(Cache.accessed_at).limit(limit)
+        return await self._remove_in(keys)
 
     async def remove_oldest(self, limit: int) -> int:
-        keys = await self._session.scalars(
-            select(Cache.key).order_by(Cache.accessed_at, Cache.updated_at, Cache.created_at).limit(limit)
-        )
-        return await self.remove_by_keys(list(keys.all()))
+        keys = select(Cache.key).order_by(Cache.accessed_at, Cache.updated_at, Cache.created_at).limit(limit)
+        return await self._remove_in(keys)
 
-    async def remove_by_keys(self, keys: list[str]) -> int:
-        if not keys:
-            return 0
-        await self._session.execute(delete(Cache).where(Cache.key.in_(keys)))
-        return len(keys)
+    async def _remove_in(self, keys: Select[tuple[str]]) -> int:
+        """DELETE ... WHERE key IN (子查询)，一条语句完成"""
+        result = await self._session.execute(delete(Cache).where(Cache.key.in_(keys.scalar_subquery())))
+        return cast(CursorResult, result).rowcount
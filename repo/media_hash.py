@@ -0,0 +1,25 @@
+from typing import Any, cast
+
+from sqlalchemy import CursorResult, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.media_hash import MediaHash
+
+
+class MediaHashRepo:
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+
+    async def get_media(self, key: str) -> list[dict[str, Any]] | None:
+        return await self._session.scalar(select(MediaHash.media_json).where(MediaHash.key == key))
+
+    async def upsert(self, *, key: str, size: int, media_json: list[dict[str, Any]]) -> None:
+        row = await self._session.get(MediaHash, key)
+        if row is None:
+            self._session.add(MediaHash(key=key, size=size, media_json=media_json))
+            return
+        row.media_json = media_json
+
+    async def remove(self, key: str) -> int:
+        result = await self._session.execute(delete(MediaHash).where(MediaHash.key == key))
+        return cast(CursorResult, result).rowcount
@@ -0,0 +1,30 @@
+from collections.abc import Sequence
+from typing import Any, cast
+
+from sqlalchemy import CursorResult, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.media_url import MediaUrl
+
+
+class MediaUrlRepo:
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+
+    async def get_many(self, keys: Sequence[str]) -> dict[str, list[dict[str, Any]]]:
+        if not keys:
+            return {}
+        rows = await self._session.execute(select(MediaUrl.key, MediaUrl.media_json).where(MediaUrl.key.in_(keys)))
+        return {row.key: row.media_json for row in rows}
+
+    async def upsert(self, *, key: str, url: str, media_json: list[dict[str, Any]]) -> None:
+        row = await self._session.get(MediaUrl, key)
+        if row is None:
+            self._session.add(MediaUrl(key=key, url=url, media_json=media_json))
+            return
+        row.url = url
+        row.media_json = media_json
+
+    async def remove(self, key: str) -> int:
+        result = await self._session.execute(delete(MediaUrl).where(MediaUrl.key == key))
+        return cast(CursorResult, result).rowcount
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import cast
+
+from sqlalchemy import CursorResult, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.raw_url import RawUrl
+
+
+class RawUrlRepo:
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+
+    async def get_valid(self, key: str, now: datetime) -> str | None:
+        raw_url = await self._session.scalar(select(RawUrl.raw_url).where(RawUrl.key == key, RawUrl.expires_at >= now))
+        return cast(str | None, raw_url)
+
+    async def upsert(self, *, key: str, url: str, raw_url: str, expires_at: datetime) -> None:
+        row = await self._session.get(RawUrl, key)
+        if row is None:
+            self._session.add(RawUrl(key=key, url=url, raw_url=raw_url, expires_at=expires_at))
+            return
+        row.url = url
+        row.raw_url = raw_url
+        row.expires_at = expires_at
+
+    async def remove_expired(self, now: datetime) -> int:
+        result = await self._session.execute(delete(RawUrl).where(RawUrl.expires_at < now))
+        return cast(CursorResult, result).rowcount
@@ -1,10 +1,15 @@
+from collections.abc import Iterable
 from dataclasses import dataclass
 from typing import Any, Self
 
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, and_, false, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
+from db.models.chat import Chat
+from db.models.forum_topic import ForumTopic
 from db.models.settings import Settings, SettingsScope
+from db.models.user import User
 from log import logger
 from repo.settings.migrations import REGISTRY
 from repo.settings.schema import CURRENT_SCHEMA_VERSION, DEFAULT_SETTINGS_CONFIG, SettingsConfig
@@ -50,6 +55,17 @@ class SettingsTarget:
         }
 
 
+@dataclass(frozen=True, slots=True)
+class RawSettingsConfig:
+    config: dict[str, Any]
+    schema_version: int
+
+    @property
+    def is_current(self) -> bool:
+        """当前版本的 config patch 写入前已经过 SettingsConfig 校验"""
+        return self.schema_version == CURRENT_SCHEMA_VERSION
+
+
 class SettingsRepo:
     def __init__(self, session: AsyncSession) -> None:
         self._session = session
@@ -72,6 +88,44 @@ class SettingsRepo:
         settings = await self.get(target)
         return settings.config if settings else {}
 
+    async def get_raw_configs_by_telegram_ids(
+        self,
+        scopes: Iterable[SettingsScope],
+        *,
+        telegram_user_id: int | None = None,
+        telegram_chat_id: int | None = None,
+        telegram_thread_id: int | None = None,
+    ) -> dict[SettingsScope, RawSettingsConfig]:
+        """
+        一次查询取出配置链上各范围的 config patch，按 Telegram ID 关联用户、群组与话题，不创建缺失的记录。
+
+        没有配置记录的范围不出现在结果中。
+        """
+        topic_chat = aliased(Chat)
+        user_matches = User.telegram_user_id == telegram_user_id
+        chat_matches = Chat.telegram_chat_id == telegram_chat_id
+        topic_matches = and_(
+            topic_chat.telegram_chat_id == telegram_chat_id, ForumTopic.telegram_thread_id == telegram_thread_id
+        )
+        predicates: dict[SettingsScope, ColumnElement[bool]] = {
+            SettingsScope.USER: user_matches,
+            SettingsScope.GROUP: chat_matches,
+            SettingsScope.GROUP_MEMBER: and_(chat_matches, user_matches),
+            SettingsScope.FORUM_TOPIC: topic_matches,
+            SettingsScope.FORUM_TOPIC_MEMBER: and_(topic_matches, user_matches),
+            SettingsScope.CHANNEL: chat_matches,
+        }
+        stmt = (
+            select(Settings.scope, Settings.config, Settings.schema_version)
+            .outerjoin(User, Settings.user_id == User.id)
+            .outerjoin(Chat, Settings.chat_id == Chat.id)
+            .outerjoin(ForumTopic, Settings.forum_topic_id == ForumTopic.id)
+            .outerjoin(topic_chat, ForumTopic.chat_id == topic_chat.id)
+            .where(or_(false(), *(and_(Settings.scope == scope, predicates[scope]) for scope in set(scopes))))
+        )
+        rows = await self._session.execute(stmt)
+        return {row.scope: RawSettingsConfig(row.config, row.schema_version) for row in rows}
+
     async def get_current_config(self, target: SettingsTarget) -> SettingsConfig:
         """获取最新完整配置"""
         migrated = await self.migrate(target)
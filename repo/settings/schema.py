@@ -40,7 +40,7 @@ class ConfigMetadata:
 
 
 class SettingsConfig(BaseModel):
-    model_config = ConfigDict(extra="allow")  # 保留旧字段
+    model_config = ConfigDict(extra="allow", frozen=True)  # 保留旧字段; 解析后的配置会被缓存共享, 不可修改
 
     default_mode: Annotated[
         ParseMode,
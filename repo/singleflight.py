@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import cast
+
+from sqlalchemy import CursorResult, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.singleflight import SingleflightLease
+
+
+class SingleflightLeaseRepo:
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+
+    async def add(self, *, key: str, owner: str, expires_at: datetime) -> None:
+        """新增租约，key 已存在时由数据库抛出 IntegrityError"""
+        self._session.add(SingleflightLease(key=key, owner=owner, expires_at=expires_at))
+        await self._session.flush()
+
+    async def take_over_expired(self, *, key: str, owner: str, expires_at: datetime, now: datetime) -> bool:
+        """接管已过期的租约"""
+        result = await self._session.execute(
+            update(SingleflightLease)
+            .where(SingleflightLease.key == key, SingleflightLease.expires_at < now)
+            .values(owner=owner, expires_at=expires_at)
+        )
+        return cast(CursorResult, result).rowcount == 1
+
+    async def renew(self, *, key: str, owner: str, expires_at: datetime) -> bool:
+        result = await self._session.execute(
+            update(SingleflightLease)
+            .where(SingleflightLease.key == key, SingleflightLease.owner == owner)
+            .values(expires_at=expires_at)
+        )
+        return cast(CursorResult, result).rowcount == 1
+
+    async def release(self, *, key: str, owner: str) -> None:
+        await self._session.execute(
+            delete(SingleflightLease).where(SingleflightLease.key == key, SingleflightLease.owner == owner)
+        )
+
+    async def is_alive(self, key: str, now: datetime) -> bool:
+        lease_key = await self._session.scalar(
+            select(SingleflightLease.key).where(SingleflightLease.key == key, SingleflightLease.expires_at >= now)
+        )
+        return lease_key is not None
+
+    async def remove_expired(self, now: datetime) -> int:
+        result = await self._session.execute(delete(SingleflightLease).where(SingleflightLease.expires_at < now))
+        return cast(CursorResult, result).rowcount
@@ -1,8 +1,33 @@
-from .cache import CacheEntry, CacheMedia, CacheMediaType, CacheParseResult, parse_cache, persistent_cache
+from .cache import (
+    CacheEntry,
+    CacheMedia,
+    CacheMediaType,
+    CacheParseResult,
+    LRUCache,
+    LRUCacheStats,
+    MediaHashIndex,
+    MediaUrlCache,
+    NegativeCache,
+    RawUrlCache,
+    media_hash_index,
+    media_url_cache,
+    negative_cache,
+    parse_cache,
+    persistent_cache,
+    raw_url_cache,
+)
 from .chat import ChatService
 from .forum_topic import ForumTopicService
-from .parser import ParseService
-from .pipeline import ParsePipeline, PipelineProgressCallback, PipelineResult, StatusReporter
+from .parser import CachedParseError, ParsePrefetch, ParseService, platform_index
+from .pipeline import (
+    ParsePipeline,
+    PipelineAborted,
+    PipelineProgressCallback,
+    PipelineResult,
+    PipelineTranscodeProgressCallback,
+    StatusReporter,
+)
+from .scheduler import JobScheduler, JobStage, job_scheduler
 from .settings import (
     AnySettingsTarget,
     ChannelSettingsTarget,
@@ -11,9 +36,12 @@ from .settings import (
     ForumTopicSettingsTarget,
     GroupMemberSettingsTarget,
     GroupSettingsTarget,
+    SettingsConfigCache,
     SettingsService,
     UserSettingsTarget,
+    settings_config_cache,
 )
+from .singleflight import DatabaseSingleflight, LocalSingleflight, Singleflight, singleflight
 from .user import UserService
 
 __all__ = [
@@ -22,7 +50,11 @@ __all__ = [
     "ForumTopicService",
     "ConfigPatch",
     "ParseService",
+    "ParsePrefetch",
+    "platform_index",
     "SettingsService",
+    "SettingsConfigCache",
+    "settings_config_cache",
     "AnySettingsTarget",
     "UserSettingsTarget",
     "GroupSettingsTarget",
@@ -36,8 +68,28 @@ __all__ = [
     "CacheMedia",
     "CacheMediaType",
     "CacheParseResult",
+    "LRUCache",
+    "LRUCacheStats",
+    "NegativeCache",
+    "negative_cache",
+    "CachedParseError",
+    "RawUrlCache",
+    "raw_url_cache",
+    "MediaHashIndex",
+    "media_hash_index",
+    "MediaUrlCache",
+    "media_url_cache",
     "ParsePipeline",
     "PipelineResult",
+    "PipelineAborted",
     "PipelineProgressCallback",
+    "PipelineTranscodeProgressCallback",
     "StatusReporter",
+    "JobScheduler",
+    "JobStage",
+    "job_scheduler",
+    "Singleflight",
+    "LocalSingleflight",
+    "DatabaseSingleflight",
+    "singleflight",
 ]
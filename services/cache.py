@@ -1,9 +1,15 @@
 import asyncio
 import hashlib
+import os
+import struct
 import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 from enum import StrEnum
-from typing import Any
+from typing import Any, Literal, cast
 
 from pydantic import BaseModel
 
@@ -11,6 +17,15 @@ from core import bs
 from db import get_session
 from log import logger
 from repo.cache import CacheRepo
+from repo.media_hash import MediaHashRepo
+from repo.media_url import MediaUrlRepo
+from repo.raw_url import RawUrlRepo
+from utils.helpers import normalize_media_url
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 
 class TTLCache:
@@ -87,6 +102,180 @@ class TTLCache:
                     self.logger.debug(f"定时清理过期缓存: {len(expired_keys)} 条")
 
 
+@dataclass
+class LRUCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LRUCache:
+    """
+    进程内 LRU 缓存，同时按条数与字节数限制容量。
+
+    字节数由调用方在写入时给出（估算值），max_entries / max_bytes 为 0 时对应维度不限制。
+    """
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._store: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._stats = LRUCacheStats()
+
+    @property
+    def stats(self) -> LRUCacheStats:
+        return self._stats
+
+    def get(self, key: str) -> Any | None:
+        item = self._store.get(key)
+        if item is None:
+            self._stats.misses += 1
+            return None
+        self._store.move_to_end(key)
+        self._stats.hits += 1
+        return item[0]
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        self.pop(key)
+        if self._max_bytes and size > self._max_bytes:
+            return
+        self._store[key] = (value, size)
+        self._stats.entries += 1
+        self._stats.bytes += size
+        while (self._max_entries and self._stats.entries > self._max_entries) or (
+            self._max_bytes and self._stats.bytes > self._max_bytes
+        ):
+            _, (_, evicted_size) = self._store.popitem(last=False)
+            self._stats.entries -= 1
+            self._stats.bytes -= evicted_size
+            self._stats.evictions += 1
+
+    def pop(self, key: str) -> Any | None:
+        item = self._store.pop(key, None)
+        if item is None:
+            return None
+        self._stats.entries -= 1
+        self._stats.bytes -= item[1]
+        return item[0]
+
+    def clear(self) -> None:
+        self._store.clear()
+        self._stats.entries = 0
+        self._stats.bytes = 0
+
+
+@dataclass(frozen=True, slots=True)
+class NegativeEntry:
+    error_class: str
+    message: str
+    expire_at: float
+
+
+class NegativeCache:
+    """
+    解析失败结果缓存，KEY 为 get_raw_url 的结果。
+
+    按错误类名设置 TTL，未配置的错误类沿继承链使用父类的 TTL，均未配置时使用 default_ttl，TTL 为 0 时不缓存该类错误。
+    """
+
+    def __init__(self, default_ttl: float = 60, ttls: dict[str, float] | None = None, maxsize: int = 10000):
+        self._default_ttl = default_ttl
+        self._ttls = ttls or {}
+        self._maxsize = maxsize
+        self._store: OrderedDict[str, NegativeEntry] = OrderedDict()
+        self.logger = logger.bind(name="NegativeCache")
+
+    def get(self, key: str) -> NegativeEntry | None:
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() > entry.expire_at:
+            del self._store[key]
+            return None
+        self.logger.debug(f"失败缓存命中: key={key}, error_class={entry.error_class}")
+        return entry
+
+    def set(self, key: str, error: BaseException) -> None:
+        error_class = type(error).__name__
+        ttl = next((self._ttls[c.__name__] for c in type(error).__mro__ if c.__name__ in self._ttls), self._default_ttl)
+        if ttl <= 0:
+            return
+        self._store.pop(key, None)
+        self._store[key] = NegativeEntry(error_class, str(error), time.monotonic() + ttl)
+        self.logger.debug(f"失败缓存写入: key={key}, error_class={error_class}, ttl={ttl}s")
+        while self._maxsize and len(self._store) > self._maxsize:
+            self._store.popitem(last=False)
+
+    def pop(self, key: str) -> NegativeEntry | None:
+        return self._store.pop(key, None)
+
+
+class RawUrlCache:
+    """
+    get_raw_url 结果缓存，KEY 为输入的 URL。
+
+    进程内按 TTL 与条数限制缓存，persist=True 时同时写入数据库，重启或多副本间共享。
+    """
+
+    def __init__(self, ttl: float = 86400, maxsize: int = 10000, persist: bool = False):
+        self._ttl = ttl
+        self._memory = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._persist = persist
+        self._cleanup_task: asyncio.Task | None = None
+        self.logger = logger.bind(name="RawUrlCache")
+
+    @staticmethod
+    def _make_key(url: str, clean_all: bool) -> str:
+        return hashlib.sha256(f"{int(clean_all)}:{url}".encode()).hexdigest()
+
+    async def get(self, url: str, clean_all: bool = True) -> str | None:
+        key = self._make_key(url, clean_all)
+        if (raw_url := await self._memory.get(key)) is not None:
+            return cast(str, raw_url)
+        if not self._persist:
+            return None
+        async with get_session() as session:
+            raw_url = await RawUrlRepo(session).get_valid(key, datetime.now(UTC))
+        if raw_url is not None:
+            self.logger.debug(f"数据库命中: url={url}")
+            await self._memory.set(key, raw_url)
+        return raw_url
+
+    async def set(self, url: str, raw_url: str, clean_all: bool = True) -> None:
+        key = self._make_key(url, clean_all)
+        await self._memory.set(key, raw_url)
+        if not self._persist:
+            return
+        async with get_session() as session:
+            await RawUrlRepo(session).upsert(
+                key=key, url=url, raw_url=raw_url, expires_at=datetime.now(UTC) + timedelta(seconds=self._ttl)
+            )
+
+    def start_cleanup(self) -> None:
+        """启动后台清理任务（需在事件循环运行后调用）"""
+        self._memory.start_cleanup()
+        if self._persist and self._cleanup_task is None:
+            self._cleanup_task = asyncio.create_task(self._periodic_cleanup())
+
+    async def _periodic_cleanup(self) -> None:
+        while True:
+            try:
+                async with get_session() as session:
+                    removed = await RawUrlRepo(session).remove_expired(datetime.now(UTC))
+                if removed:
+                    self.logger.debug(f"定时清理过期原始链接: {removed} 条")
+            except Exception as e:
+                self.logger.warning(f"清理过期原始链接失败: error={e}")
+            await asyncio.sleep(3600)
+
+
 class CacheMediaType(StrEnum):
     PHOTO = "photo"
     VIDEO = "video"
@@ -112,19 +301,276 @@ class CacheEntry(BaseModel):
     rich: bool = False
 
 
+type CacheCodec = Literal["json", "compact"]
+
+# ── 紧凑编码 ──
+# 头部: 版本(B) 标志(B) 媒体数(H, 0xFFFF 表示 media=None)
+# 媒体: 类型(B) file_id(H+bytes) cover_file_id(H+bytes, 0xFFFF 表示 None)
+# 文本块: title content telegraph_url (I+bytes, 0xFFFFFFFF 表示 None)，按标志压缩
+
+_COMPACT_VERSION = 1
+_FLAG_RICH = 0x01
+_FLAG_ZLIB = 0x02
+_FLAG_ZSTD = 0x04
+_COMPRESS_THRESHOLD = 256
+"""文本块达到该字节数才尝试压缩"""
+
+_HEADER = struct.Struct(">BBH")
+_U8 = struct.Struct(">B")
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+_NONE_U16 = 0xFFFF
+_NONE_U32 = 0xFFFFFFFF
+
+_MEDIA_TYPE_CODES = {
+    CacheMediaType.PHOTO: 1,
+    CacheMediaType.VIDEO: 2,
+    CacheMediaType.ANIMATION: 3,
+    CacheMediaType.DOCUMENT: 4,
+}
+_MEDIA_TYPES = {v: k for k, v in _MEDIA_TYPE_CODES.items()}
+
+
+def _pack_str(buf: bytearray, value: str | None, length: struct.Struct, none: int) -> None:
+    if value is None:
+        buf += length.pack(none)
+        return
+    data = value.encode("utf-8")
+    buf += length.pack(len(data))
+    buf += data
+
+
+def _unpack_str(data: bytes | memoryview, offset: int, length: struct.Struct, none: int) -> tuple[str | None, int]:
+    (size,) = length.unpack_from(data, offset)
+    offset += length.size
+    if size == none:
+        return None, offset
+    return bytes(data[offset : offset + size]).decode("utf-8"), offset + size
+
+
+def encode_cache_entry(entry: CacheEntry) -> bytes:
+    """将 CacheEntry 编码为紧凑二进制，文本较长时使用 zstd (未安装时使用 zlib) 压缩"""
+    flags = _FLAG_RICH if entry.rich else 0
+    media = entry.media
+    buf = bytearray(_HEADER.pack(_COMPACT_VERSION, 0, _NONE_U16 if media is None else len(media)))
+    for m in media or ():
+        buf += _U8.pack(_MEDIA_TYPE_CODES[m.type])
+        _pack_str(buf, m.file_id, _U16, _NONE_U16)
+        _pack_str(buf, m.cover_file_id, _U16, _NONE_U16)
+
+    text = bytearray()
+    _pack_str(text, entry.parse_result.title, _U32, _NONE_U32)
+    _pack_str(text, entry.parse_result.content, _U32, _NONE_U32)
+    _pack_str(text, entry.telegraph_url, _U32, _NONE_U32)
+    if len(text) >= _COMPRESS_THRESHOLD:
+        if zstandard is not None:
+            compressed, flag = zstandard.ZstdCompressor(level=3).compress(bytes(text)), _FLAG_ZSTD
+        else:
+            compressed, flag = zlib.compress(text, 1), _FLAG_ZLIB
+        if len(compressed) < len(text):
+            text, flags = bytearray(compressed), flags | flag
+    buf += text
+    buf[1] = flags
+    return bytes(buf)
+
+
+def decode_cache_entry(data: bytes) -> CacheEntry:
+    """解码 encode_cache_entry 的结果"""
+    version, flags, media_count = _HEADER.unpack_from(data, 0)
+    if version != _COMPACT_VERSION:
+        raise ValueError(f"不支持的缓存编码版本: {version}")
+    offset = _HEADER.size
+
+    media: list[dict[str, Any]] | None = None
+    if media_count != _NONE_U16:
+        media = []
+        for _ in range(media_count):
+            (type_code,) = _U8.unpack_from(data, offset)
+            file_id, offset = _unpack_str(data, offset + 1, _U16, _NONE_U16)
+            cover_file_id, offset = _unpack_str(data, offset, _U16, _NONE_U16)
+            media.append({"type": _MEDIA_TYPES[type_code], "file_id": file_id, "cover_file_id": cover_file_id})
+
+    text: bytes | memoryview = memoryview(data)[offset:]
+    if flags & _FLAG_ZSTD:
+        if zstandard is None:
+            raise ValueError("缓存使用 zstd 压缩, 但未安装 zstandard")
+        text = zstandard.ZstdDecompressor().decompress(text)
+    elif flags & _FLAG_ZLIB:
+        text = zlib.decompress(text)
+    title, offset = _unpack_str(text, 0, _U32, _NONE_U32)
+    content, offset = _unpack_str(text, offset, _U32, _NONE_U32)
+    telegraph_url, _ = _unpack_str(text, offset, _U32, _NONE_U32)
+
+    # 由 dict 整体校验比逐层 model_construct 更快
+    return CacheEntry.model_validate(
+        {
+            "parse_result": {"title": title or "", "content": content or ""},
+            "media": media,
+            "telegraph_url": telegraph_url,
+            "rich": bool(flags & _FLAG_RICH),
+        }
+    )
+
+
 class PersistentCache:
+    """
+    file_id 持久化缓存。
+
+    数据库之前有一层进程内 LRU，保存已校验的 CacheEntry，热点链接不再访问数据库；
+    LRU 只在本进程的 set / remove 时失效，返回的 CacheEntry 为共享对象，调用方不应修改。
+
+    命中时不直接写 accessed_at，而是记录到内存中，由后台任务每 touch_flush_interval 秒
+    合并为一条 UPDATE ... WHERE key IN (...) 写入，同一 key 的多次命中只写一次，读取只有 SELECT。
+
+    淘汰同样在后台进行：写入时只维护近似条数，超过 max_entries (高水位) 时唤醒淘汰任务，
+    先删除过期条目，再按 ix_cache_lru 顺序分批删除最久未访问的条目，直到低于低水位。
+    近似条数每 recount_interval 秒用 count(*) 校正一次。
+
+    codec 决定写入格式：json 写入 entry_json，compact 写入 entry_blob (见 encode_cache_entry)；
+    读取时两种格式均支持，便于切换期间新旧条目共存。
+    """
+
     def __init__(
         self,
         max_entries: int = 30000,
         stale_after: timedelta = timedelta(days=7),
-        evict_batch_size: int = 100,
+        evict_batch_size: int = 500,
+        evict_low_watermark: float = 0.9,
+        recount_interval: float = 3600,
+        codec: CacheCodec = "json",
         disable: bool = False,
+        memory_max_entries: int = 0,
+        memory_max_bytes: int = 0,
+        touch_flush_interval: float = 30,
+        touch_flush_batch_size: int = 500,
     ):
         self.logger = logger.bind(name="PersistentCache")
         self._max_entries = max_entries
         self._stale_after = stale_after
         self._evict_batch_size = evict_batch_size
+        self._low_watermark = int(max_entries * evict_low_watermark)
+        self._recount_interval = recount_interval
+        self._approx_count: int | None = None
+        self._evict_event = asyncio.Event()
+        self._codec = codec
         self._disable = disable
+        self._memory = (
+            LRUCache(max_entries=memory_max_entries, max_bytes=memory_max_bytes) if memory_max_entries else None
+        )
+        self._pending_touches: set[str] = set()
+        self._touch_flush_interval = touch_flush_interval
+        self._touch_flush_batch_size = touch_flush_batch_size
+        self._background_tasks: list[asyncio.Task] = []
+
+    @property
+    def memory_stats(self) -> LRUCacheStats | None:
+        """进程内 LRU 的命中统计，未启用时为 None"""
+        return self._memory.stats if self._memory is not None else None
+
+    def _remember(self, key: str, entry: CacheEntry, size: int) -> None:
+        if self._memory is not None:
+            self._memory.set(key, entry, size)
+
+    def start_background(self) -> None:
+        """启动 accessed_at 写入与淘汰的后台任务（需在事件循环运行后调用）"""
+        if self._disable or self._background_tasks:
+            return
+        self._background_tasks.append(asyncio.create_task(self._periodic_flush()))
+        if self._max_entries > 0:
+            self._background_tasks.append(asyncio.create_task(self._eviction_loop()))
+        self.logger.debug(
+            f"缓存后台任务已启动, flush_interval={self._touch_flush_interval}s, "
+            f"watermark={self._low_watermark}/{self._max_entries}"
+        )
+
+    async def stop_background(self) -> None:
+        """停止后台任务并写入剩余的 accessed_at"""
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks.clear()
+        await self.flush()
+
+    async def _periodic_flush(self) -> None:
+        while True:
+            await asyncio.sleep(self._touch_flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                self.logger.warning(f"写入 accessed_at 失败, 下次重试: error={e}")
+
+    async def flush(self) -> int:
+        """将缓冲的 accessed_at 批量写入数据库，返回更新的 key 数"""
+        if not self._pending_touches:
+            return 0
+        keys, self._pending_touches = list(self._pending_touches), set()
+        now = self._now()
+        try:
+            async with get_session() as session:
+                repo = CacheRepo(session)
+                for i in range(0, len(keys), self._touch_flush_batch_size):
+                    await repo.touch_many(keys[i : i + self._touch_flush_batch_size], now)
+        except BaseException:
+            self._pending_touches.update(keys)
+            raise
+        self.logger.debug(f"写入 accessed_at: {len(keys)} 条")
+        return len(keys)
+
+    async def _eviction_loop(self) -> None:
+        while True:
+            try:
+                if self._approx_count is None:
+                    await self._recount()
+                if self._approx_count is not None and self._approx_count > self._max_entries:
+                    await self.evict()
+            except Exception as e:
+                self.logger.warning(f"缓存淘汰失败: error={e}")
+            try:
+                await asyncio.wait_for(self._evict_event.wait(), timeout=self._recount_interval)
+            except TimeoutError:
+                self._approx_count = None
+            self._evict_event.clear()
+
+    async def _recount(self) -> None:
+        async with get_session() as session:
+            self._approx_count = await CacheRepo(session).count()
+        self.logger.debug(f"缓存条数校正: count={self._approx_count}")
+
+    async def evict(self) -> int:
+        """删除过期及最久未访问的条目直到低于低水位，返回删除条数"""
+        # 先写入缓冲的访问时间，避免热点条目被当作冷数据删除
+        await self.flush()
+        await self._recount()
+        count = self._approx_count or 0
+        removed = 0
+        stale_before = self._now() - self._stale_after
+        while count - removed > self._low_watermark:
+            async with get_session() as session:
+                batch = await CacheRepo(session).remove_stale(stale_before, self._evict_batch_size)
+            if not batch:
+                break
+            removed += batch
+        while count - removed > self._low_watermark:
+            limit = min(self._evict_batch_size, count - removed - self._low_watermark)
+            async with get_session() as session:
+                batch = await CacheRepo(session).remove_oldest(limit)
+            if not batch:
+                break
+            removed += batch
+
+        self._approx_count = count - removed
+        if removed and self._memory is not None:
+            # 不确定数据库淘汰了哪些条目，整体失效
+            self._memory.clear()
+        self.logger.debug(f"缓存淘汰完成: removed={removed}, count={self._approx_count}")
+        return removed
+
+    def _count_changed(self, delta: int) -> None:
+        if self._approx_count is None:
+            return
+        self._approx_count += delta
+        if self._max_entries > 0 and self._approx_count > self._max_entries:
+            self._evict_event.set()
 
     @staticmethod
     def _make_key(url: str) -> str:
@@ -139,6 +585,11 @@ class PersistentCache:
             return None
 
         key = self._make_key(url)
+        if self._memory is not None and (memory_entry := self._memory.get(key)) is not None:
+            self.logger.debug(f"内存缓存命中: key={url}")
+            self._pending_touches.add(key)
+            return cast(CacheEntry, memory_entry)
+
         async with get_session() as session:
             repo = CacheRepo(session)
             cache = await repo.get(key)
@@ -147,15 +598,22 @@ class PersistentCache:
                 return None
 
             try:
-                entry: CacheEntry = CacheEntry.model_validate(cache.entry_json)
+                if cache.entry_blob is not None:
+                    entry = decode_cache_entry(cache.entry_blob)
+                    size = len(cache.entry_blob)
+                else:
+                    entry = CacheEntry.model_validate(cache.entry_json)
+                    size = len(entry.model_dump_json())
             except Exception as e:
                 self.logger.warning(f"缓存内容无效, 已删除: key={url}, error={e}")
                 await repo.remove(cache)
+                self._count_changed(-1)
                 return None
 
-            await repo.touch(cache, self._now())
+            self._pending_touches.add(key)
             self.logger.debug(f"缓存命中: key={url}")
-            return entry
+        self._remember(key, entry, size)
+        return entry
 
     async def set(self, url: str, entry: CacheEntry) -> None:
         if self._disable:
@@ -163,36 +621,181 @@ class PersistentCache:
 
         key = self._make_key(url)
         now = self._now()
+        if self._memory is not None:
+            self._memory.pop(key)
+        self._pending_touches.discard(key)
         async with get_session() as session:
             repo = CacheRepo(session)
-            await repo.upsert(key=key, url=url, entry_json=entry.model_dump(mode="json"), accessed_at=now)
-            removed = await self._evict_overflow(repo)
-            self.logger.debug(f"缓存写入: key={url}, evicted={removed}")
+            if self._codec == "compact":
+                blob = encode_cache_entry(entry)
+                size = len(blob)
+                cache = await repo.upsert(key=key, url=url, entry_json=None, entry_blob=blob, accessed_at=now)
+            else:
+                entry_json = entry.model_dump(mode="json")
+                size = len(entry.model_dump_json())
+                cache = await repo.upsert(key=key, url=url, entry_json=entry_json, accessed_at=now)
+            inserted = cache in session.new
+        if inserted:
+            self._count_changed(1)
+        self.logger.debug(f"缓存写入: key={url}, inserted={inserted}")
+        self._remember(key, entry, size)
 
     async def remove(self, url: str) -> None:
         if self._disable:
             return
 
         key = self._make_key(url)
+        if self._memory is not None:
+            self._memory.pop(key)
+        self._pending_touches.discard(key)
         async with get_session() as session:
-            await CacheRepo(session).remove_by_key(key)
+            removed = await CacheRepo(session).remove_by_key(key)
+        if removed:
+            self._count_changed(-1)
 
-    async def _evict_overflow(self, repo: CacheRepo) -> int:
-        if self._max_entries <= 0:
-            return 0
 
-        count = await repo.count()
-        if count <= self._max_entries:
-            return 0
+class MediaHashIndex:
+    """
+    内容寻址的媒体索引，KEY 为文件大小 + 内容哈希，值为该文件处理后各输出上传得到的 CacheMedia。
 
-        removed = await repo.remove_stale(self._now() - self._stale_after)
-        count -= removed
-        overflow = count - self._max_entries
-        if overflow <= 0:
-            return removed
+    转发、镜像、短链接等不同 URL 常指向同一文件，命中时跳过处理，直接用 file_id 发送。
+    """
+
+    def __init__(self, maxsize: int = 10000, disable: bool = False):
+        self._memory = LRUCache(max_entries=maxsize)
+        self._disable = disable
+        self.logger = logger.bind(name="MediaHashIndex")
+
+    @property
+    def enabled(self) -> bool:
+        return not self._disable
 
-        return removed + await repo.remove_oldest(max(overflow, self._evict_batch_size))
+    @staticmethod
+    def _hash_file(path: str | os.PathLike[str]) -> str:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            digest = hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+        return f"{size:x}-{digest}"
+
+    async def hash_file(self, path: str | os.PathLike[str]) -> str:
+        """计算文件的 KEY，在线程中读取文件"""
+        return await asyncio.to_thread(self._hash_file, path)
+
+    async def get(self, key: str) -> list[CacheMedia] | None:
+        if self._disable:
+            return None
+        media: list[CacheMedia] | None = self._memory.get(key)
+        if media is not None:
+            return media
+        async with get_session() as session:
+            media_json = await MediaHashRepo(session).get_media(key)
+        if not media_json:
+            return None
+        try:
+            media = [CacheMedia.model_validate(m) for m in media_json]
+        except ValueError as e:
+            self.logger.warning(f"内容哈希条目损坏: key={key}, error={e}")
+            return None
+        self.logger.debug(f"数据库命中: key={key}")
+        self._memory.set(key, media, 1)
+        return media
+
+    async def set(self, key: str, media: list[CacheMedia]) -> None:
+        if self._disable or not media:
+            return
+        self._memory.set(key, media, 1)
+        async with get_session() as session:
+            await MediaHashRepo(session).upsert(
+                key=key, size=int(key.partition("-")[0], 16), media_json=[m.model_dump(mode="json") for m in media]
+            )
+
+    async def remove(self, key: str) -> None:
+        self._memory.pop(key)
+        async with get_session() as session:
+            await MediaHashRepo(session).remove(key)
+
+
+class MediaUrlCache:
+    """
+    按单个媒体 URL 缓存上传得到的 CacheMedia，KEY 为规范化 URL 的哈希。
+
+    PersistentCache 按帖子缓存，任一媒体降级上传时整帖不缓存；这里按媒体缓存，
+    部分成功的帖子再次解析时只需下载未上传的媒体，不同帖子共用的媒体也可直接复用。
+    """
+
+    def __init__(self, maxsize: int = 10000, ignored_params: Sequence[str] = (), disable: bool = False):
+        self._memory = LRUCache(max_entries=maxsize)
+        self._ignored_params = frozenset(p.lower() for p in ignored_params)
+        self._disable = disable
+        self.logger = logger.bind(name="MediaUrlCache")
+
+    @property
+    def enabled(self) -> bool:
+        return not self._disable
+
+    def _make_key(self, url: str) -> str:
+        return hashlib.sha256(normalize_media_url(url, self._ignored_params).encode()).hexdigest()
+
+    async def get_many(self, urls: Sequence[str]) -> list[list[CacheMedia] | None]:
+        """按顺序返回每个 URL 的缓存，未命中的查询合并为一次数据库请求"""
+        if self._disable or not urls:
+            return [None] * len(urls)
+        keys = [self._make_key(url) for url in urls]
+        found: dict[str, list[CacheMedia]] = {}
+        missing: list[str] = []
+        for key in keys:
+            if (media := self._memory.get(key)) is not None:
+                found[key] = media
+            else:
+                missing.append(key)
+        if missing:
+            async with get_session() as session:
+                rows = await MediaUrlRepo(session).get_many(missing)
+            for key, media_json in rows.items():
+                try:
+                    media = [CacheMedia.model_validate(m) for m in media_json]
+                except ValueError as e:
+                    self.logger.warning(f"媒体 URL 缓存条目损坏: key={key}, error={e}")
+                    continue
+                if media:
+                    found[key] = media
+                    self._memory.set(key, media, 1)
+        return [found.get(key) for key in keys]
+
+    async def set(self, url: str, media: list[CacheMedia]) -> None:
+        if self._disable or not media:
+            return
+        key = self._make_key(url)
+        self._memory.set(key, media, 1)
+        async with get_session() as session:
+            await MediaUrlRepo(session).upsert(
+                key=key,
+                url=normalize_media_url(url, self._ignored_params),
+                media_json=[m.model_dump(mode="json") for m in media],
+            )
+
+    async def remove(self, url: str) -> None:
+        key = self._make_key(url)
+        self._memory.pop(key)
+        async with get_session() as session:
+            await MediaUrlRepo(session).remove(key)
 
 
 parse_cache = TTLCache(ttl=5 * 60, maxsize=1000)  # 解析结果缓存 5 分钟
-persistent_cache = PersistentCache(max_entries=bs.cache_max_entries, disable=bs.cache_disabled)
+raw_url_cache = RawUrlCache(
+    ttl=bs.raw_url_cache_ttl, maxsize=bs.raw_url_cache_max_entries, persist=bs.raw_url_cache_persist
+)
+negative_cache = NegativeCache(default_ttl=bs.negative_cache_ttl, ttls=bs.negative_cache_ttls)
+persistent_cache = PersistentCache(
+    max_entries=bs.cache_max_entries,
+    evict_low_watermark=bs.cache_evict_low_watermark,
+    codec=bs.cache_codec,
+    disable=bs.cache_disabled,
+    memory_max_entries=bs.cache_memory_max_entries,
+    memory_max_bytes=bs.cache_memory_max_bytes,
+    touch_flush_interval=bs.cache_touch_flush_interval,
+)
+media_hash_index = MediaHashIndex(maxsize=bs.media_dedup_max_entries, disable=not bs.media_dedup)
+media_url_cache = MediaUrlCache(
+    maxsize=bs.media_url_cache_max_entries, ignored_params=bs.media_url_ignored_params, disable=not bs.media_url_cache
+)
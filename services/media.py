@@ -1,13 +1,32 @@
+import asyncio
+import math
+import multiprocessing
+import os
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
+import pillow_heif
 from easy_ai18n import PreLocaleSelector
-from parsehub.types import AnyMediaFile, DownloadResult, ProgressUnit
+from parsehub.types import AnyMediaFile, DownloadResult, LivePhotoFile, ProgressUnit
 from parsehub.utils.media_info import MediaInfoReader
 
+from core import bs
 from log import logger
+from services.cache import CacheMedia, media_hash_index
 from utils.helpers import to_list
-from utils.media_processing_unit import MediaProcessingUnit
+from utils.media_probe import probe_media
+from utils.media_processing_unit import MediaProcessingUnit, MediaProcessResult
+from utils.transcode import TranscodeManager, TranscodeProgress, TranscodeProgressCallback
+
+SEGMENT_HEIGHT = 1920
+
+_executor: ProcessPoolExecutor | None = None
+_global_semaphore: asyncio.Semaphore | None = None
+
+transcode_manager = TranscodeManager(max_jobs=bs.transcode_max_jobs, logger=logger.bind(name="Transcode").debug)
+"""全局转码队列，所有流水线共享同一并发上限"""
 
 
 @dataclass
@@ -15,14 +34,28 @@ class ProcessedMedia:
     source: AnyMediaFile
     output_paths: list[Path] | None = None
     output_dir: Path | None = None
+    content_hash: str | None = None
+    """源文件的内容哈希 (media_hash_index 的 KEY)，未参与去重时为 None"""
+    cached_media: list[CacheMedia] | None = None
+    """相同内容已上传过时的 file_id，此时跳过处理"""
 
 
-def resolve_media_info(processed: ProcessedMedia, file_path: str) -> tuple[int, int, int]:
-    """获取媒体的宽、高、时长。若经过转码则从文件读取，否则使用源信息。"""
-    if processed.output_paths:
-        info = MediaInfoReader.read(file_path)
-        return info.width, info.height, info.duration
-    return processed.source.width, processed.source.height, getattr(processed.source, "duration", 0)
+async def resolve_media_info(processed: ProcessedMedia, file_path: str) -> tuple[int, int, int]:
+    """获取媒体的宽、高、时长。若经过转码则从文件读取 (视频使用缓存的 ffprobe 结果)，否则使用源信息。"""
+    source_info = processed.source.width, processed.source.height, getattr(processed.source, "duration", 0)
+    if not processed.output_paths:
+        return source_info
+    if MediaProcessingUnit.get_media_type_by_mime(file_path) == "video":
+        try:
+            probe = await probe_media(file_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取视频信息失败, 使用源信息: path={file_path}, error={e}")
+            return source_info
+        width, height = probe.display_size
+        return width, height, math.ceil(probe.duration)
+    # 图片 / GIF 只读取文件头
+    info = MediaInfoReader.read(file_path)
+    return info.width, info.height, info.duration
 
 
 def progress(current: int, total: int, unit: ProgressUnit, _t: PreLocaleSelector) -> str | None:
@@ -40,18 +73,141 @@ def progress(current: int, total: int, unit: ProgressUnit, _t: PreLocaleSelector
     return None
 
 
-async def process_media_files(download_result: DownloadResult) -> list[ProcessedMedia]:
-    """对下载结果中的媒体文件进行处理，返回 ProcessedMedia 列表"""
+def transcode_progress(p: TranscodeProgress, _t: PreLocaleSelector) -> str:
+    text = _t(f"转 码 中... | {p.percent:.0f}%")
+    if p.speed:
+        text = f"{text} ({p.speed:.1f}x)"
+    return str(text)
+
+
+def _media_workers() -> int:
+    return bs.media_process_workers or os.cpu_count() or 1
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        workers = _media_workers()
+        # 主进程已有多个线程 (aiosqlite、wait4、默认线程池)，fork 可能让子进程卡在 fork 时被持有的锁上
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(method),
+            initializer=pillow_heif.register_heif_opener,
+        )
+        logger.debug(f"媒体处理进程池已启动: workers={workers}, start_method={method}")
+    return _executor
+
+
+def _get_global_semaphore() -> asyncio.Semaphore:
+    global _global_semaphore
+    if _global_semaphore is None:
+        _global_semaphore = asyncio.Semaphore(bs.media_process_global_concurrency or _media_workers())
+    return _global_semaphore
+
+
+def shutdown_media_executor() -> None:
+    """关闭媒体处理进程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _process_image_in_worker(output_dir: Path, file_path: str) -> MediaProcessResult:
+    """在子进程中处理单张图片，绕开 GIL"""
+    processor = MediaProcessingUnit(
+        output_dir, segment_height=SEGMENT_HEIGHT, logger=logger.bind(name="MediaProcessor").debug
+    )
+    return asyncio.run(processor.process_image(Path(file_path)))
+
+
+async def _process_file(processor: MediaProcessingUnit, file_path: str) -> MediaProcessResult:
+    """图片交给进程池处理；视频的重活由 ffmpeg 子进程完成，直接在当前进程调度"""
+    if processor.get_media_type_by_mime(file_path) != "image":
+        return await processor.process(file_path)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), _process_image_in_worker, processor.output_dir, str(file_path))
+
+
+async def _find_uploaded(media_file: AnyMediaFile, dedup: bool) -> tuple[str | None, list[CacheMedia] | None]:
+    """计算源文件的内容哈希并查询已上传的 file_id；实况照片由图片与视频两个文件组成，不参与去重"""
+    if not dedup or not media_hash_index.enabled or isinstance(media_file, LivePhotoFile):
+        return None, None
+    try:
+        key = await media_hash_index.hash_file(media_file.path)
+        return key, await media_hash_index.get(key)
+    except Exception as e:
+        logger.warning(f"内容哈希查询失败, 按新文件处理: path={media_file.path}, error={e}")
+        return None, None
+
+
+async def process_media_files(
+    download_result: DownloadResult,
+    *,
+    parallel: bool | None = None,
+    on_transcode_progress: TranscodeProgressCallback | None = None,
+    dedup: bool = False,
+) -> list[ProcessedMedia]:
+    """
+    对下载结果中的媒体文件进行处理，返回 ProcessedMedia 列表，顺序与下载结果一致。
+
+    dedup=True 时按内容哈希查询 media_hash_index，相同内容已上传过的文件跳过处理，只带回 file_id。
+    """
     processed_dir = download_result.output_dir.joinpath("processed")
-    processor = MediaProcessingUnit(processed_dir, segment_height=1920, logger=logger.bind(name="MediaProcessor").debug)
+    processor = MediaProcessingUnit(
+        processed_dir,
+        segment_height=SEGMENT_HEIGHT,
+        transcoder=transcode_manager,
+        on_transcode_progress=on_transcode_progress,
+        transcode_h264=bs.transcode_h264,
+        logger=logger.bind(name="MediaProcessor").debug,
+    )
     media_files = to_list(download_result.media)
-    logger.debug(f"开始媒体处理: 文件数={len(media_files)}, output_dir={processed_dir}")
+    parallel = bs.media_process_parallel if parallel is None else parallel
+    logger.debug(f"开始媒体处理: 文件数={len(media_files)}, parallel={parallel}, output_dir={processed_dir}")
+    if parallel:
+        return await _process_media_files_parallel(processor, media_files, dedup)
+
     processed_list: list[ProcessedMedia] = []
     for media_file in media_files:
+        key, cached = await _find_uploaded(media_file, dedup)
+        if cached:
+            logger.debug(f"内容哈希命中, 跳过处理: path={media_file.path}, key={key}")
+            processed_list.append(ProcessedMedia(media_file, content_hash=key, cached_media=cached))
+            continue
         # 对于实况图片只处理图片, 不处理视频
         logger.debug(f"处理文件: {media_file.path}")
         result = await processor.process(media_file.path)
         logger.debug(f"处理结果: output_paths={result.output_paths}")
-        processed_list.append(ProcessedMedia(media_file, result.output_paths, result.temp_dir))
+        processed_list.append(ProcessedMedia(media_file, result.output_paths, result.temp_dir, key))
     logger.debug(f"媒体处理完成: 处理数={len(processed_list)}")
     return processed_list
+
+
+async def _process_media_files_parallel(
+    processor: MediaProcessingUnit, media_files: Sequence[AnyMediaFile], dedup: bool
+) -> list[ProcessedMedia]:
+    pipeline_semaphore = asyncio.Semaphore(bs.media_process_concurrency)
+    global_semaphore = _get_global_semaphore()
+
+    async def fn(media_file: AnyMediaFile) -> ProcessedMedia:
+        key, cached = await _find_uploaded(media_file, dedup)
+        if cached:
+            logger.debug(f"内容哈希命中, 跳过处理: path={media_file.path}, key={key}")
+            return ProcessedMedia(media_file, content_hash=key, cached_media=cached)
+        async with pipeline_semaphore, global_semaphore:
+            logger.debug(f"处理文件: {media_file.path}")
+            result = await _process_file(processor, str(media_file.path))
+        logger.debug(f"处理结果: output_paths={result.output_paths}")
+        return ProcessedMedia(media_file, result.output_paths, result.temp_dir, key)
+
+    tasks = [asyncio.create_task(fn(media_file)) for media_file in media_files]
+    try:
+        processed_list = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    logger.debug(f"媒体处理完成: 处理数={len(processed_list)}")
+    return list(processed_list)
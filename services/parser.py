@@ -1,15 +1,85 @@
-from typing import Self
+import asyncio
+from typing import ClassVar, Self
 
 from parsehub import ParseHub, Platform
+from parsehub.errors import ParseHubError, UnknownPlatform
 from parsehub.types import (
     AnyParseResult,
 )
 
-from core import pl_cfg
+from core import bs, pl_cfg
 from log import logger
+from services.cache import negative_cache, raw_url_cache
+from services.scheduler import JobStage, job_scheduler
+from utils.platform_index import PlatformIndex
 
 logger = logger.bind(name="ParseService")
 
+platform_index = PlatformIndex(ParseHub().parsers, maxsize=bs.platform_detect_cache_size)
+"""全局平台识别索引，同一条消息在过滤器与处理器中只识别一次"""
+
+
+class CachedParseError(Exception):
+    """该 URL 近期解析失败，直接返回缓存的错误"""
+
+    def __init__(self, error_class: str, message: str):
+        self.error_class = error_class
+        super().__init__(message)
+
+
+def _cache_failure(key: str, error: BaseException) -> None:
+    """只缓存 parsehub 的错误 (解析失败、不支持的平台等)，网络超时等临时错误不缓存"""
+    if isinstance(error, ParseHubError):
+        negative_cache.set(key, error)
+
+
+class ParsePrefetch:
+    """
+    预先启动的解析任务，通过 ParseService.prefetch 创建。
+
+    拿到原始 URL 后立即在调度器的解析池中开始解析，与查询缓存同时进行；
+    缓存命中时调用 cancel() 放弃。结果由 result() 取得，解析失败时写入失败缓存。
+    """
+
+    _running: ClassVar[dict[str, "ParsePrefetch"]] = {}
+    """进行中的预先解析，KEY 为原始 URL，同一链接同时只预先解析一次"""
+
+    def __init__(self, url: str, raw_url: str):
+        self.url = url
+        self.raw_url = raw_url
+        self._task = asyncio.create_task(job_scheduler.submit(JobStage.PARSE, lambda: ParseService().parse(url)))
+        self._task.add_done_callback(self._on_done)
+        ParsePrefetch._running[raw_url] = self
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        if ParsePrefetch._running.get(self.raw_url) is self:
+            del ParsePrefetch._running[self.raw_url]
+        # 被取消或无人取结果时不输出 "Task exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    @classmethod
+    def running(cls, raw_url: str) -> bool:
+        return raw_url in cls._running
+
+    def cancel(self) -> None:
+        if not self._task.done():
+            logger.debug(f"取消预先解析: {self.url}")
+            self._task.cancel()
+
+    async def result(self, *, negative_cache_key: str | None = None) -> AnyParseResult:
+        """:param negative_cache_key: 同 ParseService.parse"""
+        if negative_cache_key is not None and (failed := negative_cache.get(negative_cache_key)):
+            self.cancel()
+            logger.debug(f"近期解析失败, 跳过解析: error_class={failed.error_class}")
+            raise CachedParseError(failed.error_class, failed.message)
+        try:
+            return await self._task
+        except Exception as e:
+            if negative_cache_key is not None:
+                _cache_failure(negative_cache_key, e.__cause__ or e)
+            raise
+
 
 class ParseService:
     _instance: Self | None = None
@@ -22,14 +92,47 @@ class ParseService:
     def __init__(self) -> None:
         self.parser = ParseHub()
 
+    @staticmethod
+    def detect_platform(text: str | None) -> Platform | None:
+        """识别分享文案 / 链接所属平台，结果与 ParseHub.get_platform 一致"""
+        return platform_index.detect(text)
+
     def get_platform(self, url: str) -> Platform:
-        p = self.parser.get_platform(url)
+        p = self.detect_platform(url)
         if not p:
-            raise ValueError("不支持的平台")
+            raise UnknownPlatform()
         return p
 
-    async def parse(self, url: str) -> AnyParseResult:
+    def prefetch(self, url: str, raw_url: str, *, use_negative_cache: bool = True) -> ParsePrefetch | None:
+        """
+        立即开始解析，不等待缓存查询。
+
+        近期解析失败 (use_negative_cache=True 时) 或同一链接已在预先解析时返回 None，不请求上游。
+        """
+        if use_negative_cache and negative_cache.get(raw_url) is not None:
+            return None
+        if ParsePrefetch.running(raw_url):
+            logger.debug(f"同一链接已在预先解析, 跳过: {raw_url}")
+            return None
+        return ParsePrefetch(url, raw_url)
+
+    async def parse(self, url: str, *, negative_cache_key: str | None = None) -> AnyParseResult:
+        """
+        :param negative_cache_key: 通常为 get_raw_url 的结果，指定时先检查失败缓存，解析失败后写入失败缓存
+        """
         logger.debug(f"开始解析 {url}")
+        if negative_cache_key is not None and (failed := negative_cache.get(negative_cache_key)):
+            logger.debug(f"近期解析失败, 跳过解析: error_class={failed.error_class}")
+            raise CachedParseError(failed.error_class, failed.message)
+
+        try:
+            return await self._parse(url)
+        except Exception as e:
+            if negative_cache_key is not None:
+                _cache_failure(negative_cache_key, e.__cause__ or e)
+            raise
+
+    async def _parse(self, url: str) -> AnyParseResult:
         p = self.get_platform(url)
 
         max_retries = 3
@@ -48,6 +151,14 @@ class ParseService:
         raise
 
     async def get_raw_url(self, url: str, clean_all: bool = True) -> str:
+        if (raw_url := await raw_url_cache.get(url, clean_all)) is not None:
+            logger.debug(f"原始 URL 缓存命中: {raw_url}")
+            return raw_url
+        raw_url = await self._get_raw_url(url, clean_all)
+        await raw_url_cache.set(url, raw_url, clean_all)
+        return raw_url
+
+    async def _get_raw_url(self, url: str, clean_all: bool) -> str:
         p = self.get_platform(url)
 
         max_retries = 3
@@ -1,25 +1,67 @@
 import asyncio
+import copy
 import shutil
-from collections.abc import Awaitable, Callable
-from dataclasses import dataclass, field
+import tempfile
+from collections.abc import AsyncGenerator, Awaitable, Callable, Sequence
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from types import TracebackType
 from typing import Any, Protocol
 
 from easy_ai18n import PreLocaleSelector
 from parsehub import DownloadResult
-from parsehub.types import AniRef, AnyParseResult, PostType, ProgressUnit
+from parsehub.types import (
+    AniRef,
+    AnyMediaRef,
+    AnyParseResult,
+    LivePhotoRef,
+    PostType,
+    ProgressUnit,
+)
 
 from core import bs, pl_cfg
 from log import logger
-from services import ParseService
-from services.media import ProcessedMedia, process_media_files
+from services import ParsePrefetch, ParseService
+from services.cache import CacheEntry, CacheMedia, media_url_cache
+from services.media import ProcessedMedia, process_media_files, transcode_progress
 from services.media import progress as fmt_progress
+from services.scheduler import JobStage, job_scheduler
+from services.singleflight import singleflight as _singleflight
 from utils.helpers import to_list
+from utils.transcode import TranscodeProgress
 
 logger = logger.bind(name="Pipeline")
 
-_inflight: dict[str, asyncio.Event] = {}
+STREAM_PREFETCH = 3
+"""流式模式下同时下载 / 处理的媒体数"""
+
+
+class PipelineAborted(Exception):
+    """流式流水线中途失败，错误已通过 StatusReporter 通知"""
+
+
+_output_dir_refs: dict[Path, int] = {}
+"""被多个 PipelineResult 共享的输出目录引用计数，不在表中的目录视为只有 1 个引用"""
+
+
+def _retain_output_dir(path: Path, count: int = 1) -> None:
+    _output_dir_refs[path] = _output_dir_refs.get(path, 1) + count
+
+
+def _release_output_dir(path: Path) -> None:
+    remaining = _output_dir_refs.pop(path, 1) - 1
+    if remaining > 0:
+        _output_dir_refs[path] = remaining
+        return
+    logger.debug("清理资源")
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _with_media[R: AnyParseResult](parse_result: R, media_refs: Sequence[AnyMediaRef]) -> R:
+    """复制解析结果并只保留指定媒体；保留原类型，各平台 _do_download 的请求头与下载方式 (yt-dlp 等) 仍然生效"""
+    item = copy.copy(parse_result)
+    item.media = list(media_refs)
+    return item
 
 
 class StatusReporter(Protocol):
@@ -37,17 +79,51 @@ class PipelineResult:
     parse_result: AnyParseResult
     processed_list: list[ProcessedMedia] = field(default_factory=list)
     output_dir: Path | None = None
+    media_stream: AsyncGenerator[ProcessedMedia, None] | None = None
+    """流式模式下逐个产出处理完成的媒体，产出的媒体同时追加到 processed_list"""
+    stream_completed: bool = False
+    """media_stream 是否已全部产出"""
+    reused_media: dict[int, list[CacheMedia]] = field(default_factory=dict)
+    """按媒体序号 (从 0 开始) 复用的已上传 file_id，这些媒体未下载，不在 processed_list / media_stream 中"""
+
+    @property
+    def completed(self) -> bool:
+        return self.media_stream is None or self.stream_completed
 
     def cleanup(self) -> None:
         if bs.debug_skip_cleanup:
             logger.debug("debug_skip_cleanup=True 跳过清理")
             return
         if self.output_dir:
-            logger.debug("清理资源")
-            shutil.rmtree(self.output_dir, ignore_errors=True)
+            _release_output_dir(self.output_dir)
             self.output_dir = None
 
 
+@dataclass
+class _SharedOutcome:
+    result: PipelineResult
+    cache_entry: CacheEntry | None
+
+
+@dataclass
+class _Flight:
+    """进程内同一任务的执行者与等待者共享的状态"""
+
+    future: asyncio.Future[_SharedOutcome | None]
+    waiters: int = 0
+    output_dir: Path | None = None
+    """执行期间为等待者保留的输出目录"""
+
+
+_flights: dict[str, _Flight] = {}
+
+
+def has_local_flight(raw_url: str) -> bool:
+    """当前进程中是否已有该原始 URL 的流水线在执行 (任意参数)"""
+    prefix = f"{raw_url}|"
+    return any(key.startswith(prefix) for key in _flights)
+
+
 class PipelineProgressCallback:
     """统一的下载进度回调，依赖 StatusReporter"""
 
@@ -64,14 +140,36 @@ class PipelineProgressCallback:
         await self._reporter.report(text)
 
 
+class PipelineTranscodeProgressCallback:
+    """转码进度回调，按 25% 的步长通过 StatusReporter 通知，避免频繁编辑消息"""
+
+    def __init__(self, reporter: StatusReporter, _t: PreLocaleSelector, step: float = 25):
+        self._reporter = reporter
+        self._t = _t
+        self._step = step
+        self._last_bucket = -1
+
+    async def __call__(self, progress: TranscodeProgress) -> None:
+        bucket = int(progress.percent // self._step)
+        if bucket == self._last_bucket:
+            return
+        self._last_bucket = bucket
+        await self._reporter.report(transcode_progress(progress, self._t))
+
+
 class ParsePipeline:
     """
     将 解析 → 下载 → 格式转换 封装为一条流水线。
     上传逻辑仍由调用方负责。
 
-    内置 Singleflight 机制：对同一 URL 的并发调用只会执行一次流水线，
-    其余调用等待 Event 完成后返回 None（调用方应重新检查缓存）。
+    内置 Singleflight 机制：对同一 URL 的并发调用只会执行一次流水线。
+    同进程的等待者直接获得执行者的 PipelineResult（输出目录按引用计数清理），
+    以及执行者通过 publish() 发布的 CacheEntry；
+    执行者失败或执行者位于其他进程时返回 None（调用方应重新检查缓存）。
     使用 with 创建实例，退出上下文时会自动 finish() 并清理流水线输出。
+
+    流式模式 (streaming=True)：多媒体帖子不再等待全部下载完成，
+    每个媒体下载完成后立即处理，通过 PipelineResult.media_stream 按原顺序逐个产出。
     """
 
     def __init__(
@@ -87,11 +185,17 @@ class ParsePipeline:
         gif_only_skip_download_count_threshold: int = 0,
         richtext_skip_download: bool = True,
         save_metadata: bool = False,
+        streaming: bool = False,
+        use_negative_cache: bool = True,
+        reuse_uploaded: bool = False,
+        prefetch: ParsePrefetch | None = None,
         t: PreLocaleSelector,
     ):
         """
         :param url: 未清理的 URL
         :param raw_url: 原始 URL，当做 KEY
+        :param reuse_uploaded: 复用已上传媒体的 file_id (按媒体 URL 与文件内容哈希)，只下载、处理其余媒体
+        :param prefetch: 预先启动的解析任务，由流水线接管；未用到时 (已有解析结果、等待其他流水线) 自动取消
         """
         self._url = url
         self._raw_url = raw_url
@@ -104,9 +208,15 @@ class ParsePipeline:
         self._gif_only_skip_download_count_threshold = gif_only_skip_download_count_threshold
         self._richtext_skip_download = richtext_skip_download
         self._save_metadata = save_metadata
+        self._streaming = streaming
+        self._use_negative_cache = use_negative_cache
+        self._reuse_uploaded = reuse_uploaded and not skip_media_processing
+        self._prefetch = prefetch
         self._t = t
         self._result: PipelineResult | None = None
         self._owns_inflight = False
+        self._flight: _Flight | None = None
+        self._cache_entry: CacheEntry | None = None
 
     def __enter__(self) -> "ParsePipeline":
         return self
@@ -125,14 +235,60 @@ class ParsePipeline:
         """是否因 singleflight 而等待了其他流水线"""
         return self._waited
 
+    @property
+    def shared_cache_entry(self) -> CacheEntry | None:
+        """等待者获得的执行者发布的 CacheEntry"""
+        return self._cache_entry if self._waited else None
+
+    @property
+    def _flight_key(self) -> str:
+        """流水线参数不同时结果不可共享，一并作为 singleflight 的 KEY"""
+        return "|".join(
+            map(
+                str,
+                (
+                    self._raw_url,
+                    self._skip_media_processing,
+                    self._skip_download_threshold,
+                    self._gif_only_skip_download_count_threshold,
+                    self._richtext_skip_download,
+                    self._save_metadata,
+                    self._reuse_uploaded,
+                ),
+            )
+        )
+
+    def publish(self, cache_entry: CacheEntry | None) -> None:
+        """执行者发布上传后得到的 CacheEntry，finish() 时交给等待者"""
+        self._cache_entry = cache_entry
+
+    def _cancel_prefetch(self) -> None:
+        if self._prefetch is not None:
+            self._prefetch.cancel()
+            self._prefetch = None
+
     def finish(self) -> None:
         """释放等待同一 URL 的 singleflight 调用方"""
+        self._cancel_prefetch()
         if not self._owns_inflight:
             return
-        event = _inflight.pop(self._raw_url, None)
-        if event is not None:
-            event.set()
         self._owns_inflight = False
+        _singleflight.release(self._flight_key)
+
+        flight, self._flight = self._flight, None
+        if flight is None:
+            return
+        _flights.pop(self._flight_key, None)
+        result = self._result
+        outcome = None
+        if result is not None and result.completed:
+            # 执行者可能已自行清理，输出目录以 flight 中保留的为准
+            outcome = _SharedOutcome(replace(result, output_dir=flight.output_dir), cache_entry=self._cache_entry)
+            if flight.output_dir and flight.waiters:
+                _retain_output_dir(flight.output_dir, flight.waiters)
+        flight.future.set_result(outcome)
+        if flight.output_dir and not bs.debug_skip_cleanup:
+            _release_output_dir(flight.output_dir)
 
     def cleanup(self) -> None:
         """清理流水线输出资源"""
@@ -142,24 +298,41 @@ class ParsePipeline:
     async def run(self) -> PipelineResult | None:
         """执行流水线，返回 PipelineResult 或 None（失败时已通知）"""
         if self._singleflight:
-            key = self._raw_url
-            existing = _inflight.get(key)
+            key = self._flight_key
+            if (flight := _flights.get(key)) is not None:
+                self._cancel_prefetch()
+                return await self._wait_flight(flight)
 
-            if existing is not None:
+            flight = _Flight(future=asyncio.get_running_loop().create_future())
+            _flights[key] = flight
+            try:
+                owned = await _singleflight.acquire(key)
+            except BaseException:
+                _flights.pop(key, None)
+                flight.future.set_result(None)
+                raise
+            if not owned:
+                self._cancel_prefetch()
                 self._waited = True
-                logger.debug(f"Singleflight 命中, 等待已有流水线: url={key}")
+                logger.debug(f"Singleflight 命中, 等待其他进程的流水线: url={self._raw_url}")
                 await self._reporter.report(self._t("已有相同任务正在解析, 等待解析完成..."))
-                await existing.wait()
+                try:
+                    await _singleflight.wait(key)
+                finally:
+                    _flights.pop(key, None)
+                    flight.future.set_result(None)
                 await self._reporter.dismiss()
                 return None
-
-            event = asyncio.Event()
-            _inflight[key] = event
             self._owns_inflight = True
+            self._flight = flight
 
         try:
             result = await self._execute()
             self._result = result
+            if result is not None and result.output_dir and self._flight is not None:
+                # 执行者自身的清理可能早于 finish()，为等待者保留输出目录
+                self._flight.output_dir = result.output_dir
+                _retain_output_dir(result.output_dir)
             if result is None:
                 logger.debug("流水线失败, 立即释放等待者")
                 self.finish()
@@ -169,6 +342,30 @@ class ParsePipeline:
             self.finish()
             raise
 
+    async def _wait_flight(self, flight: _Flight) -> PipelineResult | None:
+        """等待同进程的执行者完成并共享其结果"""
+        self._waited = True
+        logger.debug(f"Singleflight 命中, 等待已有流水线: url={self._raw_url}")
+        await self._reporter.report(self._t("已有相同任务正在解析, 等待解析完成..."))
+        flight.waiters += 1
+        try:
+            outcome = await asyncio.shield(flight.future)
+        except asyncio.CancelledError:
+            if flight.future.done() and (outcome := flight.future.result()) and outcome.result.output_dir:
+                _release_output_dir(outcome.result.output_dir)
+            else:
+                flight.waiters -= 1
+            raise
+        await self._reporter.dismiss()
+
+        if outcome is None:
+            logger.debug("执行者未产出可共享的结果")
+            return None
+        logger.debug(f"共享执行者结果: has_cache_entry={outcome.cache_entry is not None}")
+        self._cache_entry = outcome.cache_entry
+        self._result = replace(outcome.result, processed_list=list(outcome.result.processed_list), media_stream=None)
+        return self._result
+
     async def _execute(self) -> PipelineResult | None:
         """实际执行流水线逻辑"""
         logger.debug(f"流水线启动: url={self._url}, has_cached_result={self._parse_result is not None}")
@@ -176,10 +373,19 @@ class ParsePipeline:
         # ── 1. 解析 ──
         if self._parse_result:
             logger.debug("使用缓存的解析结果")
+            self._cancel_prefetch()
             parse_result = self._parse_result
         else:
             await self._reporter.report(self._t("解 析 中..."))
-            parse_result = await self._step("解析", lambda: ps.parse(self._url))
+            negative_cache_key = self._raw_url if self._use_negative_cache else None
+            if (prefetch := self._prefetch) is not None:
+                # 预先解析已在调度器的解析池中运行
+                self._prefetch = None
+                parse_result = await self._step("解析", lambda: prefetch.result(negative_cache_key=negative_cache_key))
+            else:
+                parse_result = await self._step(
+                    "解析", lambda: ps.parse(self._url, negative_cache_key=negative_cache_key), pool=JobStage.PARSE
+                )
             if parse_result is None:
                 return None
 
@@ -202,21 +408,42 @@ class ParsePipeline:
             logger.debug(f"GIF ({gif_count})大于设定值({self._gif_only_skip_download_count_threshold}), 跳过下载")
             return PipelineResult(parse_result=parse_result)
 
+        media_refs = to_list(parse_result.media)
+        reused_media = await self._find_reused_media(media_refs) if self._reuse_uploaded else {}
+        if reused_media:
+            logger.debug(f"媒体 URL 缓存命中: {len(reused_media)}/{len(media_refs)}")
+            if len(reused_media) == len(media_refs):
+                return PipelineResult(parse_result=parse_result, reused_media=reused_media)
+        missing_refs = [ref for i, ref in enumerate(media_refs) if i not in reused_media]
+
+        if self._streaming and not self._skip_media_processing and len(media_refs) > 1:
+            logger.debug(f"流式模式: media_count={len(media_refs)}, download_count={len(missing_refs)}")
+            await self._reporter.report(self._t("下 载 中..."))
+            bs.download_dir.mkdir(parents=True, exist_ok=True)
+            output_dir = Path(tempfile.mkdtemp(prefix=f"{parse_result.name}_", dir=bs.download_dir)).resolve()
+            result = PipelineResult(parse_result=parse_result, output_dir=output_dir, reused_media=reused_media)
+            result.media_stream = self._stream_media(parse_result, missing_refs, output_dir, result)
+            return result
+
+        # 部分媒体已上传过时只下载其余媒体
+        download_target = _with_media(parse_result, missing_refs) if reused_media else parse_result
+
         # ── 2. 下载 ──
         await self._reporter.report(self._t("下 载 中..."))
-        p = ps.parser.get_platform(self._url)
+        p = ps.get_platform(self._url)
         progress_cb = PipelineProgressCallback(self._reporter, _t=self._t)
 
         async def fn() -> DownloadResult:
             proxy = pl_cfg.roll_downloader_proxy(p.id)
             logger.debug(f"使用配置: proxy={proxy}")
-            return await parse_result.download(
+            return await download_target.download(
                 bs.download_dir, callback=progress_cb, callback_args=(), proxy=proxy, save_metadata=self._save_metadata
             )
 
         download_result = await self._step(
             "下载",
             lambda: fn(),
+            pool=JobStage.DOWNLOAD,
             timeout=60 * 30,  # 30分钟
             retries=2,
         )
@@ -234,7 +461,12 @@ class ParsePipeline:
             )
         maybe_processed_list = await self._step(
             "媒体处理",
-            lambda: process_media_files(download_result),
+            lambda: process_media_files(
+                download_result,
+                on_transcode_progress=PipelineTranscodeProgressCallback(self._reporter, _t=self._t),
+                dedup=self._reuse_uploaded,
+            ),
+            pool=JobStage.MEDIA,
             cleanup=lambda: shutil.rmtree(download_result.output_dir, ignore_errors=True),
         )
         if maybe_processed_list is None:
@@ -246,22 +478,102 @@ class ParsePipeline:
             parse_result=parse_result,
             processed_list=processed_list,
             output_dir=download_result.output_dir,
+            reused_media=reused_media,
         )
 
+    async def _find_reused_media(self, media_refs: Sequence[AnyMediaRef]) -> dict[int, list[CacheMedia]]:
+        """查询各媒体 URL 已上传的 file_id；实况照片由图片与视频两个文件组成，不参与复用"""
+        if not media_url_cache.enabled:
+            return {}
+        try:
+            found = await media_url_cache.get_many([ref.url for ref in media_refs])
+        except Exception as e:
+            logger.warning(f"查询媒体 URL 缓存失败, 下载全部媒体: error={e}")
+            return {}
+        return {
+            i: media
+            for i, (ref, media) in enumerate(zip(media_refs, found, strict=True))
+            if media and not isinstance(ref, LivePhotoRef)
+        }
+
+    async def _stream_media(
+        self,
+        parse_result: AnyParseResult,
+        media_refs: Sequence[AnyMediaRef],
+        output_dir: Path,
+        result: PipelineResult,
+    ) -> AsyncGenerator[ProcessedMedia, None]:
+        """逐个下载并处理媒体，按原顺序产出；任一媒体失败时抛出 PipelineAborted"""
+        p = ParseService().get_platform(self._url)
+        progress_cb = PipelineProgressCallback(self._reporter, _t=self._t)
+        semaphore = asyncio.Semaphore(STREAM_PREFETCH)
+        total = len(media_refs)
+        done = 0
+
+        async def fetch(index: int, media_ref: AnyMediaRef) -> list[ProcessedMedia]:
+            nonlocal done
+            item = _with_media(parse_result, [media_ref])
+
+            async def download() -> DownloadResult:
+                proxy = pl_cfg.roll_downloader_proxy(p.id)
+                return await item.download(output_dir.joinpath(f"{index:03d}"), proxy=proxy)
+
+            async with semaphore:
+                download_result = await self._step(
+                    f"下载 {index}/{total}",
+                    download,
+                    pool=JobStage.DOWNLOAD,
+                    timeout=60 * 30,
+                    retries=2,
+                )
+                if download_result is None:
+                    raise PipelineAborted(f"下载失败: index={index}")
+                done += 1
+                await progress_cb(done, total, "count")
+
+                processed = await self._step(
+                    f"媒体处理 {index}/{total}",
+                    lambda: process_media_files(
+                        download_result,
+                        on_transcode_progress=PipelineTranscodeProgressCallback(self._reporter, _t=self._t),
+                        dedup=self._reuse_uploaded,
+                    ),
+                    pool=JobStage.MEDIA,
+                )
+                if processed is None:
+                    raise PipelineAborted(f"媒体处理失败: index={index}")
+                return processed
+
+        tasks = [asyncio.create_task(fetch(i, ref)) for i, ref in enumerate(media_refs, start=1)]
+        try:
+            for task in tasks:
+                for processed in await task:
+                    result.processed_list.append(processed)
+                    yield processed
+            result.stream_completed = True
+            logger.debug(f"流式流水线完成: processed_count={len(result.processed_list)}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     async def _step[T](
         self,
         stage: str,
         action: Callable[[], Awaitable[T]],
         cleanup: Callable[[], None] | None = None,
+        pool: JobStage | None = None,
         timeout: float | None = None,
         retries: int = 0,
         retry_delay: float = 1,
     ) -> T | None:
-        """执行单个步骤，失败时统一处理"""
+        """执行单个步骤，失败时统一处理。指定 pool 时提交到全局调度器对应的工作池执行"""
         max_attempts = retries + 1
         for attempt in range(1, max_attempts + 1):
             logger.debug(f"执行步骤: [{stage}] attempt={attempt}/{max_attempts}")
             try:
+                if pool is not None:
+                    return await job_scheduler.submit(pool, action, timeout=timeout)
                 coro = action()
                 if timeout is not None:
                     return await asyncio.wait_for(coro, timeout=timeout)
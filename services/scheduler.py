@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from enum import StrEnum
+
+from core import bs
+from log import logger
+
+logger = logger.bind(name="Scheduler")
+
+
+class JobStage(StrEnum):
+    PARSE = "parse"  # 网络密集
+    DOWNLOAD = "download"  # 带宽密集
+    MEDIA = "media"  # CPU 密集
+
+
+@dataclass
+class StagePoolStats:
+    stage: JobStage
+    size: int
+    active: int = 0
+    """正在执行的任务数"""
+    waiting: int = 0
+    """排队中的任务数"""
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    total_wait: float = 0.0
+    """累计排队时间, 单位秒"""
+    max_wait: float = 0.0
+    """最长排队时间, 单位秒"""
+
+    @property
+    def avg_wait(self) -> float:
+        started = self.submitted - self.waiting
+        return self.total_wait / started if started > 0 else 0.0
+
+
+class StagePool:
+    """单阶段工作池，通过信号量限制并发数，size 为 0 时不限制"""
+
+    def __init__(self, stage: JobStage, size: int):
+        self._stage = stage
+        self._size = size
+        self._semaphore = asyncio.Semaphore(size) if size > 0 else None
+        self._stats = StagePoolStats(stage=stage, size=size)
+
+    @property
+    def stats(self) -> StagePoolStats:
+        return self._stats
+
+    async def run[T](self, action: Callable[[], Awaitable[T]], timeout: float | None = None) -> T:
+        stats = self._stats
+        stats.submitted += 1
+        stats.waiting += 1
+        enqueued_at = time.monotonic()
+        try:
+            if self._semaphore is not None:
+                if self._semaphore.locked():
+                    logger.debug(f"[{self._stage}] 工作池已满, 排队中: active={stats.active}, waiting={stats.waiting}")
+                await self._semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+
+        waited = time.monotonic() - enqueued_at
+        stats.total_wait += waited
+        stats.max_wait = max(stats.max_wait, waited)
+        if waited >= 1:
+            logger.debug(f"[{self._stage}] 排队 {waited:.1f}s 后开始执行")
+
+        stats.active += 1
+        try:
+            coro = action()
+            result = await (asyncio.wait_for(coro, timeout=timeout) if timeout is not None else coro)
+        except BaseException:
+            stats.failed += 1
+            raise
+        else:
+            stats.completed += 1
+            return result
+        finally:
+            stats.active -= 1
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+
+class JobScheduler:
+    """
+    全局任务调度器。
+
+    ParsePipeline 的 解析 / 下载 / 媒体处理 三个阶段分别提交到独立的工作池，
+    每个工作池单独限制并发数，保证峰值并发可预期。
+    超时仅计算执行时间，不包含排队时间。
+    """
+
+    def __init__(self, parse_workers: int = 0, download_workers: int = 0, media_workers: int = 0):
+        self._pools = {
+            JobStage.PARSE: StagePool(JobStage.PARSE, parse_workers),
+            JobStage.DOWNLOAD: StagePool(JobStage.DOWNLOAD, download_workers),
+            JobStage.MEDIA: StagePool(JobStage.MEDIA, media_workers),
+        }
+
+    async def submit[T](
+        self,
+        stage: JobStage,
+        action: Callable[[], Awaitable[T]],
+        *,
+        timeout: float | None = None,
+    ) -> T:
+        return await self._pools[stage].run(action, timeout=timeout)
+
+    def stats(self) -> dict[JobStage, StagePoolStats]:
+        return {stage: pool.stats for stage, pool in self._pools.items()}
+
+
+job_scheduler = JobScheduler(
+    parse_workers=bs.scheduler_parse_workers,
+    download_workers=bs.scheduler_download_workers,
+    media_workers=bs.scheduler_media_workers,
+)
@@ -1,8 +1,14 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable
 from dataclasses import dataclass
+from enum import Enum
 from typing import Any, Literal, TypedDict, Unpack
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core import bs
 from db.models.settings import SettingsScope
 from repo.settings import ParseMode, SettingsConfig, SettingsRepo
 from repo.settings.repo import SettingsTarget
@@ -79,29 +85,130 @@ class ConfigPatch(TypedDict, total=False):
     hide_error: bool
 
 
+def config_chain(target: AnySettingsTarget) -> list[AnySettingsTarget]:
+    """按合并优先级列出影响 target 的配置范围"""
+    match target:
+        case GroupMemberSettingsTarget(telegram_chat_id=telegram_chat_id, telegram_user_id=telegram_user_id):
+            return [
+                target,
+                GroupSettingsTarget(telegram_chat_id=telegram_chat_id),
+                UserSettingsTarget(telegram_user_id=telegram_user_id),
+            ]
+        case ForumTopicSettingsTarget(telegram_chat_id=telegram_chat_id):
+            return [target, GroupSettingsTarget(telegram_chat_id=telegram_chat_id)]
+        case ForumTopicMemberSettingsTarget(
+            telegram_chat_id=telegram_chat_id,
+            telegram_thread_id=telegram_thread_id,
+            telegram_user_id=telegram_user_id,
+        ):
+            return [
+                target,
+                ForumTopicSettingsTarget(telegram_chat_id=telegram_chat_id, telegram_thread_id=telegram_thread_id),
+                GroupMemberSettingsTarget(telegram_chat_id=telegram_chat_id, telegram_user_id=telegram_user_id),
+                GroupSettingsTarget(telegram_chat_id=telegram_chat_id),
+                UserSettingsTarget(telegram_user_id=telegram_user_id),
+            ]
+        case _:
+            return [target]
+
+
+class SettingsConfigCache:
+    """
+    合并后的配置缓存，KEY 为请求的配置范围。
+
+    写入某个范围时，链上包含该范围的缓存全部失效 (例如修改群组配置会清除该群组成员、话题的缓存)。
+    只在进程内失效，其他进程写入的配置最多在 ttl 秒后生效。
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._store: OrderedDict[AnySettingsTarget, tuple[SettingsConfig, float]] = OrderedDict()
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """每次失效递增；读取数据库前记录，写回时版本不一致说明期间有写入，丢弃结果"""
+        return self._version
+
+    def get(self, target: AnySettingsTarget) -> SettingsConfig | None:
+        item = self._store.get(target)
+        if item is None:
+            return None
+        config, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._store[target]
+            return None
+        self._store.move_to_end(target)
+        return config
+
+    def set(self, target: AnySettingsTarget, config: SettingsConfig, version: int) -> None:
+        if self.ttl <= 0 or version != self._version:
+            return
+        self._store[target] = (config, time.monotonic() + self.ttl)
+        self._store.move_to_end(target)
+        while self.maxsize and len(self._store) > self.maxsize:
+            self._store.popitem(last=False)
+
+    def invalidate(self, target: AnySettingsTarget) -> None:
+        self._version += 1
+        for key in [key for key in self._store if target in config_chain(key)]:
+            del self._store[key]
+
+    def clear(self) -> None:
+        self._version += 1
+        self._store.clear()
+
+
+settings_config_cache = SettingsConfigCache(maxsize=bs.settings_cache_max_entries, ttl=bs.settings_cache_ttl)
+
+
 class SettingsService:
     def __init__(self, session: AsyncSession) -> None:
+        self._session = session
         self.user = UserService(session)
         self.chat = ChatService(session)
         self.forum_topic = ForumTopicService(session)
         self.settings = SettingsRepo(session)
 
     async def get_config(self, target: AnySettingsTarget) -> SettingsConfig:
-        chain = await self._resolve_config_chain(target)
-
+        if (config := settings_config_cache.get(target)) is not None:
+            return config
+        version = settings_config_cache.version
+        config = await self._load_config(target)
+        settings_config_cache.set(target, config, version)
+        return config
+
+    async def _load_config(self, target: AnySettingsTarget) -> SettingsConfig:
+        # 只读不写：用户、群组、话题不存在时视为没有配置，记录在写入配置时才创建
+        chain = config_chain(target)
+        raw_configs = await self.settings.get_raw_configs_by_telegram_ids(
+            (settings_target.scope for settings_target in chain),
+            telegram_user_id=getattr(target, "telegram_user_id", None),
+            telegram_chat_id=getattr(target, "telegram_chat_id", None),
+            telegram_thread_id=getattr(target, "telegram_thread_id", None),
+        )
         scoped_patches = [
-            (settings_target.scope, await self.settings.get_raw_config(settings_target)) for settings_target in chain
+            (settings_target.scope, raw.config)
+            for settings_target in chain
+            if (raw := raw_configs.get(settings_target.scope)) is not None
         ]
 
         merged_patch = _merge_config_patches(scoped_patches)
-        return _hydrate_config(merged_patch)
+        return _hydrate_config(merged_patch, validated=all(raw.is_current for raw in raw_configs.values()))
 
     async def get_config_by_user(self, telegram_user_id: int) -> SettingsConfig:
         return await self.get_config(UserSettingsTarget(telegram_user_id=telegram_user_id))
 
     async def patch_config(self, target: AnySettingsTarget, **kwargs: Unpack[ConfigPatch]) -> SettingsConfig:
         self._validate_config_patch(target, kwargs)
-        return await self.settings.patch_config(await self._resolve(target), **kwargs)
+        config = await self.settings.patch_config(await self._resolve(target), **kwargs)
+        settings_config_cache.invalidate(target)
+        # 提交前其他请求仍会读到旧值并写入缓存，提交后再失效一次
+        event.listen(
+            self._session.sync_session, "after_commit", lambda _: settings_config_cache.invalidate(target), once=True
+        )
+        return config
 
     @staticmethod
     def _validate_config_patch(target: AnySettingsTarget, config_patch: ConfigPatch) -> None:
@@ -137,53 +244,6 @@ class SettingsService:
                 chat = await self.chat.ensure_channel(telegram_chat_id)
                 return SettingsTarget.channel(chat_id=chat.id)
 
-    async def _resolve_config_chain(self, target: AnySettingsTarget) -> list[SettingsTarget]:
-        match target:
-            case UserSettingsTarget(telegram_user_id=telegram_user_id):
-                user = await self.user.ensure(telegram_user_id)
-                return [SettingsTarget.user(user_id=user.id)]
-
-            case GroupSettingsTarget(telegram_chat_id=telegram_chat_id):
-                chat = await self.chat.ensure_group(telegram_chat_id)
-                return [SettingsTarget.group(chat_id=chat.id)]
-
-            case GroupMemberSettingsTarget(telegram_chat_id=telegram_chat_id, telegram_user_id=telegram_user_id):
-                chat = await self.chat.ensure_group(telegram_chat_id)
-                user = await self.user.ensure(telegram_user_id)
-                return [
-                    SettingsTarget.group_member(chat_id=chat.id, user_id=user.id),
-                    SettingsTarget.group(chat_id=chat.id),
-                    SettingsTarget.user(user_id=user.id),
-                ]
-
-            case ForumTopicSettingsTarget(telegram_chat_id=telegram_chat_id, telegram_thread_id=telegram_thread_id):
-                chat = await self.chat.ensure_group(telegram_chat_id)
-                forum_topic = await self.forum_topic.ensure(telegram_chat_id, telegram_thread_id)
-                return [
-                    SettingsTarget.forum_topic(forum_topic_id=forum_topic.id),
-                    SettingsTarget.group(chat_id=chat.id),
-                ]
-
-            case ForumTopicMemberSettingsTarget(
-                telegram_chat_id=telegram_chat_id,
-                telegram_thread_id=telegram_thread_id,
-                telegram_user_id=telegram_user_id,
-            ):
-                chat = await self.chat.ensure_group(telegram_chat_id)
-                forum_topic = await self.forum_topic.ensure(telegram_chat_id, telegram_thread_id)
-                user = await self.user.ensure(telegram_user_id)
-                return [
-                    SettingsTarget.forum_topic_member(forum_topic_id=forum_topic.id, user_id=user.id),
-                    SettingsTarget.forum_topic(forum_topic_id=forum_topic.id),
-                    SettingsTarget.group_member(chat_id=chat.id, user_id=user.id),
-                    SettingsTarget.group(chat_id=chat.id),
-                    SettingsTarget.user(user_id=user.id),
-                ]
-
-            case ChannelSettingsTarget(telegram_chat_id=telegram_chat_id):
-                chat = await self.chat.ensure_channel(telegram_chat_id)
-                return [SettingsTarget.channel(chat_id=chat.id)]
-
 
 def _get_config_metadata(field_name: str) -> ConfigMetadata:
     field = SettingsConfig.model_fields[field_name]
@@ -193,36 +253,82 @@ def _get_config_metadata(field_name: str) -> ConfigMetadata:
     raise RuntimeError(f"配置字段 {field_name} 缺少 ConfigMetadata")
 
 
-def _merge_config_patches(scoped_patches: list[tuple[SettingsScope, dict[str, Any]]]) -> dict[str, Any]:
-    merged: dict[str, Any] = {}
+_SCOPE_BITS = {scope: 1 << index for index, scope in enumerate(SettingsScope)}
+
 
-    for field_name in SettingsConfig.model_fields:
+def _scope_mask(scopes: frozenset[SettingsScope]) -> int:
+    mask = 0
+    for scope in scopes:
+        mask |= _SCOPE_BITS[scope]
+    return mask
+
+
+@dataclass(frozen=True, slots=True)
+class _FieldMergePlan:
+    name: str
+    scopes: int
+    """允许写入的范围位掩码"""
+    strategy: MergeStrategy
+    convert: Callable[[Any], Any] | None
+    """JSON 值转换为字段类型 (枚举)，None 为原样使用"""
+
+
+def _compile_merge_plan() -> dict[str, _FieldMergePlan]:
+    """导入时按字段预先解析 ConfigMetadata，合并时不再查找元数据"""
+    plan = {}
+    for field_name, field in SettingsConfig.model_fields.items():
         metadata = _get_config_metadata(field_name)
+        annotation = field.annotation
+        convert = annotation if isinstance(annotation, type) and issubclass(annotation, Enum) else None
+        plan[field_name] = _FieldMergePlan(field_name, _scope_mask(metadata.scopes), metadata.merge_strategy, convert)
+    return plan
 
-        values = [
-            value
-            for scope, patch in scoped_patches
-            if scope in metadata.scopes and field_name in patch
-            for value in [patch[field_name]]
-        ]
 
-        if not values:
-            continue
+_MERGE_PLAN = _compile_merge_plan()
+_DEFAULT_CONFIG_DATA = DEFAULT_SETTINGS_CONFIG.model_dump()
+
+
+def _merge_config_patches(scoped_patches: list[tuple[SettingsScope, dict[str, Any]]]) -> dict[str, Any]:
+    """按链上优先级合并；只遍历 patch 中实际存在的字段"""
+    merged: dict[str, Any] = {}
+
+    for scope, patch in scoped_patches:
+        bit = _SCOPE_BITS[scope]
+        for field_name, value in patch.items():
+            field = _MERGE_PLAN.get(field_name)
+            if field is None or not bit & field.scopes:
+                continue
 
-        match metadata.merge_strategy:
-            case MergeStrategy.UNION:
-                result = []
-                for value in values:
+            match field.strategy:
+                case MergeStrategy.UNION:
+                    result = merged.setdefault(field_name, [])
                     for item in value:
                         if item not in result:
                             result.append(item)
-                merged[field_name] = result
 
-            case MergeStrategy.POLICY | MergeStrategy.PREFERENCE | MergeStrategy.STRICT:
-                merged[field_name] = values[0]
+                case MergeStrategy.POLICY | MergeStrategy.PREFERENCE | MergeStrategy.STRICT:
+                    merged.setdefault(field_name, value)
 
     return merged
 
 
-def _hydrate_config(config_patch: dict[str, Any]) -> SettingsConfig:
-    return SettingsConfig.model_validate(DEFAULT_SETTINGS_CONFIG.model_dump(mode="json") | config_patch)
+def _hydrate_config(config_patch: dict[str, Any], *, validated: bool = False) -> SettingsConfig:
+    """
+    在默认配置上应用 patch。
+
+    validated=True 表示 patch 全部来自当前 schema 版本的记录 (写入时已校验)，跳过校验直接构造。
+    """
+    if not config_patch:
+        return DEFAULT_SETTINGS_CONFIG
+    if not validated:
+        return SettingsConfig.model_validate(_DEFAULT_CONFIG_DATA | config_patch)
+    update = {}
+    for field_name, value in config_patch.items():
+        convert = _MERGE_PLAN[field_name].convert
+        if convert:
+            value = convert(value)
+        elif isinstance(value, list):
+            # 复制一份，缓存的配置不与 patch 共享可变对象
+            value = list(value)
+        update[field_name] = value
+    return DEFAULT_SETTINGS_CONFIG.model_copy(update=update)
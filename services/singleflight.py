@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import os
+import socket
+import uuid
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from datetime import UTC, datetime, timedelta
+from typing import Protocol
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import bs
+from db import get_session
+from log import logger
+from repo.singleflight import SingleflightLeaseRepo
+
+logger = logger.bind(name="Singleflight")
+
+
+class Singleflight(Protocol):
+    """
+    Singleflight 后端：同一 key 同一时间只允许一个执行者。
+
+    acquire 返回 True 表示成为执行者，执行完成后必须调用 release；
+    返回 False 表示已有执行者，调用 wait 等待其完成。
+    """
+
+    async def acquire(self, key: str) -> bool: ...
+
+    async def wait(self, key: str) -> None: ...
+
+    def release(self, key: str) -> None: ...
+
+    def start_background(self) -> None:
+        """启动后台任务（需在事件循环运行后调用）"""
+
+    async def stop_background(self) -> None: ...
+
+
+class LocalSingleflight(Singleflight):
+    """进程内 Singleflight，仅对当前进程去重"""
+
+    def __init__(self) -> None:
+        self._inflight: dict[str, asyncio.Event] = {}
+
+    async def acquire(self, key: str) -> bool:
+        if key in self._inflight:
+            return False
+        self._inflight[key] = asyncio.Event()
+        return True
+
+    async def wait(self, key: str) -> None:
+        if (event := self._inflight.get(key)) is not None:
+            await event.wait()
+
+    def release(self, key: str) -> None:
+        if (event := self._inflight.pop(key, None)) is not None:
+            event.set()
+
+    def start_background(self) -> None:
+        pass
+
+    async def stop_background(self) -> None:
+        pass
+
+
+class DatabaseSingleflight(Singleflight):
+    """
+    基于数据库租约的跨进程 Singleflight。
+
+    执行者写入带过期时间的租约并定时续约，其他进程轮询租约直到其被释放或过期。
+    进程内仍通过 Event 去重，同一进程的多个等待者只有一个负责轮询数据库。
+    执行者进程崩溃时租约自然过期，等待者随即返回并由调用方重新检查缓存。
+    过期后无人再访问的租约由后台任务按 lease_ttl 的 10 倍间隔定时删除。
+    """
+
+    def __init__(
+        self,
+        lease_ttl: float = 60,
+        poll_interval: float = 1,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = get_session,
+    ):
+        self._lease_ttl = timedelta(seconds=lease_ttl)
+        self._heartbeat_interval = lease_ttl / 3
+        self._cleanup_interval = lease_ttl * 10
+        self._cleanup_task: asyncio.Task | None = None
+        self._poll_interval = poll_interval
+        self._session_factory = session_factory
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._inflight: dict[str, asyncio.Event] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._background: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _make_key(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(UTC)
+
+    async def acquire(self, key: str) -> bool:
+        if key in self._inflight:
+            return False
+        event = asyncio.Event()
+        self._inflight[key] = event
+
+        try:
+            owned = await self._try_lease(key)
+        except BaseException:
+            self._wake(key, event)
+            raise
+
+        if owned:
+            logger.debug(f"获得租约: key={key}, owner={self._owner}")
+            self._tasks[key] = asyncio.create_task(self._heartbeat(key))
+        else:
+            logger.debug(f"租约由其他进程持有, 开始轮询: key={key}")
+            self._tasks[key] = asyncio.create_task(self._poll(key, event))
+        return owned
+
+    async def wait(self, key: str) -> None:
+        if (event := self._inflight.get(key)) is not None:
+            await event.wait()
+
+    def release(self, key: str) -> None:
+        if (task := self._tasks.pop(key, None)) is not None:
+            task.cancel()
+        if (event := self._inflight.get(key)) is not None:
+            self._wake(key, event)
+
+        task = asyncio.create_task(self._release_lease(key))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def start_background(self) -> None:
+        if self._cleanup_task is None:
+            self._cleanup_task = asyncio.create_task(self._periodic_cleanup())
+            logger.debug(f"过期租约清理任务已启动, interval={self._cleanup_interval}s")
+
+    async def stop_background(self) -> None:
+        if (task := self._cleanup_task) is not None:
+            self._cleanup_task = None
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _periodic_cleanup(self) -> None:
+        while True:
+            try:
+                async with self._session_factory() as session:
+                    removed = await SingleflightLeaseRepo(session).remove_expired(self._now())
+                if removed:
+                    logger.debug(f"定时清理过期租约: {removed} 条")
+            except Exception as e:
+                logger.warning(f"清理过期租约失败: error={e}")
+            await asyncio.sleep(self._cleanup_interval)
+
+    def _wake(self, key: str, event: asyncio.Event) -> None:
+        if self._inflight.get(key) is event:
+            del self._inflight[key]
+        event.set()
+
+    async def _try_lease(self, key: str) -> bool:
+        lease_key = self._make_key(key)
+        now = self._now()
+        expires_at = now + self._lease_ttl
+        try:
+            async with self._session_factory() as session:
+                await SingleflightLeaseRepo(session).add(key=lease_key, owner=self._owner, expires_at=expires_at)
+            return True
+        except IntegrityError:
+            pass
+
+        async with self._session_factory() as session:
+            return await SingleflightLeaseRepo(session).take_over_expired(
+                key=lease_key, owner=self._owner, expires_at=expires_at, now=now
+            )
+
+    async def _heartbeat(self, key: str) -> None:
+        lease_key = self._make_key(key)
+        while True:
+            await asyncio.sleep(self._heartbeat_interval)
+            try:
+                async with self._session_factory() as session:
+                    renewed = await SingleflightLeaseRepo(session).renew(
+                        key=lease_key, owner=self._owner, expires_at=self._now() + self._lease_ttl
+                    )
+            except Exception as e:
+                logger.warning(f"租约续期失败: key={key}, error={e}")
+                continue
+            if not renewed:
+                logger.warning(f"租约已丢失: key={key}")
+                return
+
+    async def _poll(self, key: str, event: asyncio.Event) -> None:
+        lease_key = self._make_key(key)
+        try:
+            while True:
+                try:
+                    async with self._session_factory() as session:
+                        alive = await SingleflightLeaseRepo(session).is_alive(lease_key, self._now())
+                except Exception as e:
+                    logger.warning(f"租约查询失败: key={key}, error={e}")
+                    alive = True
+                if not alive:
+                    logger.debug(f"租约已释放: key={key}")
+                    return
+                await asyncio.sleep(self._poll_interval)
+        finally:
+            self._tasks.pop(key, None)
+            self._wake(key, event)
+
+    async def _release_lease(self, key: str) -> None:
+        try:
+            async with self._session_factory() as session:
+                await SingleflightLeaseRepo(session).release(key=self._make_key(key), owner=self._owner)
+        except Exception as e:
+            logger.warning(f"租约释放失败, 将在过期后失效: key={key}, error={e}")
+
+
+def create_singleflight() -> Singleflight:
+    match bs.singleflight_backend:
+        case "database":
+            return DatabaseSingleflight(
+                lease_ttl=bs.singleflight_lease_ttl,
+                poll_interval=bs.singleflight_poll_interval,
+            )
+        case _:
+            return LocalSingleflight()
+
+
+singleflight = create_singleflight()
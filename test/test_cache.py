@@ -0,0 +1,48 @@
+from pathlib import Path
+
+from services.cache import LRUCache, MediaHashIndex, MediaUrlCache, NegativeCache
+
+
+def test_lru_cache_bounds_entries_and_bytes() -> None:
+    cache = LRUCache(max_entries=3, max_bytes=10)
+    cache.set("a", 1, 4)
+    cache.set("b", 2, 4)
+    assert cache.get("a") == 1
+    cache.set("c", 3, 4)  # 超出字节数, 淘汰最久未使用的 b
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    cache.set("big", 4, 11)  # 超过单条上限, 不缓存
+    assert cache.get("big") is None
+
+    cache.pop("a")
+    stats = cache.stats
+    assert (stats.entries, stats.bytes) == (1, 4)
+    assert (stats.hits, stats.misses, stats.evictions) == (3, 2, 1)
+
+
+def test_negative_cache_ttl_per_error_class() -> None:
+    cache = NegativeCache(default_ttl=60, ttls={"OSError": 0})
+    cache.set("a", ValueError("gone"))
+    cache.set("b", TimeoutError())
+    entry = cache.get("a")
+    assert entry is not None and entry.error_class == "ValueError" and entry.message == "gone"
+    assert cache.get("b") is None
+
+
+def test_media_hash_index_key_by_content(tmp_path: Path) -> None:
+    a, b, c = tmp_path / "a.mp4", tmp_path / "b.jpg", tmp_path / "c.mp4"
+    a.write_bytes(b"x" * 100_000)
+    b.write_bytes(b"x" * 100_000)
+    c.write_bytes(b"x" * 100_001)
+    assert MediaHashIndex._hash_file(a) == MediaHashIndex._hash_file(b)
+    assert MediaHashIndex._hash_file(a) != MediaHashIndex._hash_file(c)
+    assert MediaHashIndex._hash_file(c).startswith(f"{100_001:x}-")
+
+
+def test_media_url_cache_key_ignores_volatile_params() -> None:
+    cache = MediaUrlCache(ignored_params=["Expires", "sig"])
+    key = cache._make_key("https://CDN.example.com:443/a/1.jpg?w=100&h=50&expires=1#frag")
+    assert key == cache._make_key("https://cdn.example.com/a/1.jpg?h=50&w=100&expires=2&sig=x")
+    assert key != cache._make_key("https://cdn.example.com/a/1.jpg?h=50&w=200")
+    assert key != cache._make_key("https://cdn.example.com/a/2.jpg?h=50&w=100")
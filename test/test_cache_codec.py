@@ -0,0 +1,28 @@
+from services.cache import (
+    CacheEntry,
+    CacheMedia,
+    CacheMediaType,
+    CacheParseResult,
+    decode_cache_entry,
+    encode_cache_entry,
+)
+
+
+def test_compact_codec_round_trip() -> None:
+    entries = [
+        CacheEntry(parse_result=CacheParseResult(title="标题", content="内容"), telegraph_url="https://telegra.ph/x"),
+        CacheEntry(
+            parse_result=CacheParseResult(title="t", content="长文本" * 500),
+            media=[
+                CacheMedia(type=CacheMediaType.VIDEO, file_id="BAACAgUAAxkBAAI" * 5, cover_file_id="AgACAgUAAxkB"),
+                CacheMedia(type=CacheMediaType.ANIMATION, file_id="CgACAgQAAxkB"),
+            ],
+            rich=True,
+        ),
+        CacheEntry(parse_result=CacheParseResult(), media=[]),
+    ]
+    for entry in entries:
+        blob = encode_cache_entry(entry)
+        assert decode_cache_entry(blob).model_dump() == entry.model_dump()
+
+    assert len(encode_cache_entry(entries[1])) < len(entries[1].model_dump_json().encode())
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from utils.image_header import parse_image_header, read_image_header
+
+
+@pytest.mark.parametrize(
+    ("name", "mode", "save_kwargs"),
+    [
+        ("rgb.jpg", "RGB", {}),
+        ("gray.jpg", "L", {"progressive": True}),
+        ("rgba.png", "RGBA", {}),
+        ("palette.png", "P", {}),
+        ("lossy.webp", "RGB", {}),
+        ("lossless.webp", "RGBA", {"lossless": True}),
+        ("anim.gif", "P", {}),
+    ],
+)
+def test_read_image_header_matches_pillow(tmp_path: Path, name: str, mode: str, save_kwargs: dict) -> None:
+    path = tmp_path / name
+    Image.new(mode, (321, 123)).save(path, **save_kwargs)
+
+    header = read_image_header(path)
+
+    with Image.open(path) as img:
+        assert header is not None
+        assert (header.format, header.width, header.height) == (img.format, img.width, img.height)
+        assert header.mode == img.mode
+
+
+def test_parse_image_header_unknown_or_truncated() -> None:
+    assert parse_image_header(b"not an image") is None
+    assert parse_image_header(b"\xff\xd8\xff\xe0\x00\x10JFIF") is None
+
+
+def test_parse_image_header_rejects_zero_size(tmp_path: Path) -> None:
+    path = tmp_path / "dnl.jpg"
+    Image.new("RGB", (64, 32)).save(path)
+    head = bytearray(path.read_bytes())
+    # 将 SOF 中的高度改为 0，模拟由 DNL 标记给出高度的 JPEG
+    sof = head.index(b"\xff\xc0")
+    head[sof + 5 : sof + 7] = b"\x00\x00"
+    assert parse_image_header(bytes(head)) is None
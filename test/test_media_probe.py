@@ -0,0 +1,23 @@
+from utils.media_probe import MediaProbe
+
+
+def test_media_probe_from_ffprobe_json() -> None:
+    probe = MediaProbe.from_ffprobe(
+        {
+            "streams": [
+                {"codec_type": "audio", "codec_name": "aac"},
+                {
+                    "codec_type": "video",
+                    "codec_name": "H264",
+                    "width": 1920,
+                    "height": 1080,
+                    "side_data_list": [{"side_data_type": "Display Matrix", "rotation": -90}],
+                },
+            ],
+            "format": {"format_name": "mov,mp4,m4a,3gp,3g2,mj2", "duration": "12.5", "size": "1024", "bit_rate": "655"},
+        }
+    )
+    assert probe.video_codec == "h264" and probe.audio_codec == "aac"
+    assert probe.duration == 12.5 and probe.size == 1024
+    assert probe.rotation == 270
+    assert probe.display_size == (1080, 1920)
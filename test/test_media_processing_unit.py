@@ -0,0 +1,90 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from utils.media_processing_unit import ImageContext, MediaProcessingUnit
+
+
+def _transform(tmp_path: Path, src: Path) -> Path:
+    mpu = MediaProcessingUnit(tmp_path / "out", logger=lambda *_: None)
+    ctx = ImageContext.open(src)
+    try:
+        (output,) = mpu._transform_image(ctx).output_paths
+    finally:
+        ctx.close()
+    return output
+
+
+def test_transform_keeps_compliant_image(tmp_path: Path) -> None:
+    src = tmp_path / "ok.jpg"
+    Image.new("RGB", (800, 600)).save(src)
+    assert _transform(tmp_path, src) == src
+
+
+def test_transform_converts_and_downscales_in_one_pass(tmp_path: Path) -> None:
+    src = tmp_path / "big.png"
+    Image.new("RGBA", (5120, 3000), (255, 0, 0, 128)).save(src)
+
+    output = _transform(tmp_path, src)
+
+    assert output.name == "big_downscaled.jpg"
+    with Image.open(output) as img:
+        assert (img.format, img.mode, img.size) == ("JPEG", "RGB", (2560, 1500))
+
+
+def test_transform_jpeg_draft_decode_keeps_exact_size(tmp_path: Path) -> None:
+    src = tmp_path / "photo.jpg"
+    Image.new("RGB", (6000, 4000), (0, 128, 255)).save(src)
+
+    output = _transform(tmp_path, src)
+
+    with Image.open(output) as img:
+        assert img.size == (2560, 1706)
+
+
+def test_png_strip_segments_match_full_decode_crops(tmp_path: Path) -> None:
+    src = tmp_path / "long.png"
+    Image.effect_mandelbrot((240, 3100), (-2, -1.5, 1, 1.5), 40).convert("RGB").save(src)
+    mpu = MediaProcessingUnit(tmp_path / "out", overlap=100, logger=lambda *_: None)
+
+    ctx = ImageContext.open(src)
+    try:
+        segments = list(mpu._iter_segments(ctx, 1000))
+    finally:
+        ctx.close()
+
+    with Image.open(src) as img:
+        expected = [img.crop((0, 0, 240, 1000))] + [
+            img.crop((0, i * 1000 - 100, 240, min((i + 1) * 1000, 3100))) for i in range(1, 4)
+        ]
+        assert [s.size for s in segments] == [(240, 1000), (240, 1100), (240, 1100), (240, 200)]
+        assert [s.tobytes() for s in segments] == [e.tobytes() for e in expected]
+
+
+def test_process_video_transcodes_non_h264(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    src = tmp_path / "clip.mp4"
+    src.write_bytes(b"hevc")
+    mpu = MediaProcessingUnit(tmp_path / "out", transcode_h264=True, logger=lambda *_: None)
+
+    async def codec(path: Path) -> str:
+        return "h264" if path.name.endswith("_h264.mp4") else "hevc"
+
+    async def container(path: Path) -> str:
+        return "mov,mp4,m4a,3gp,3g2,mj2"
+
+    async def ensure_h264(path: Path) -> Path:
+        out = mpu.output_dir / f"{path.stem}_h264.mp4"
+        out.write_bytes(b"h264")
+        return out
+
+    monkeypatch.setattr(mpu, "get_video_codec", codec)
+    monkeypatch.setattr(mpu, "get_container", container)
+    monkeypatch.setattr(mpu, "ensure_h264", ensure_h264)
+
+    result = asyncio.run(mpu.process_video(src))
+    assert result.output_paths == [mpu.output_dir / "clip_h264.mp4"]
+
+    mpu.transcode_h264 = False
+    assert asyncio.run(mpu.process_video(src)).output_paths == [src]
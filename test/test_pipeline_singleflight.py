@@ -0,0 +1,116 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from parsehub.errors import UnknownPlatform
+from parsehub.types import MultimediaParseResult
+
+from services import ParseService, negative_cache
+from services.parser import _cache_failure
+from services.pipeline import ParsePipeline, PipelineResult
+
+
+class _Reporter:
+    async def report(self, text: str) -> None: ...
+
+    async def report_error(self, stage: str, error: Exception) -> None: ...
+
+    async def dismiss(self) -> None: ...
+
+
+def test_waiter_shares_owner_result(tmp_path: Path) -> None:
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    executions = 0
+
+    async def execute() -> PipelineResult:
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return PipelineResult(parse_result=MultimediaParseResult(title="t", media=[]), output_dir=output_dir)
+
+    def make() -> ParsePipeline:
+        pipeline = ParsePipeline("u", "raw", _Reporter(), t=lambda s: s)  # type: ignore[arg-type]
+        pipeline._execute = execute  # type: ignore[method-assign]
+        return pipeline
+
+    async def main() -> None:
+        owner, waiter = make(), make()
+
+        async def run_owner() -> None:
+            with owner:
+                assert await owner.run() is not None
+                await asyncio.sleep(0.01)
+                owner.publish(None)
+
+        owner_task = asyncio.create_task(run_owner())
+        await asyncio.sleep(0)
+        with waiter:
+            result = await waiter.run()
+            await owner_task
+            assert waiter.waited
+            assert result is not None and result.output_dir == output_dir
+            assert output_dir.exists()
+        assert not output_dir.exists()
+
+    asyncio.run(main())
+    assert executions == 1
+
+
+def test_waiter_cancels_prefetch() -> None:
+    class _Prefetch:
+        cancelled = False
+
+        def cancel(self) -> None:
+            self.cancelled = True
+
+    async def execute() -> PipelineResult:
+        await asyncio.sleep(0.01)
+        return PipelineResult(parse_result=MultimediaParseResult(title="t", media=[]))
+
+    async def main() -> None:
+        owner = ParsePipeline("u", "raw-prefetch", _Reporter(), t=lambda s: s)  # type: ignore[arg-type]
+        owner._execute = execute  # type: ignore[method-assign]
+        prefetch = _Prefetch()
+        waiter = ParsePipeline("u", "raw-prefetch", _Reporter(), prefetch=prefetch, t=lambda s: s)  # type: ignore[arg-type]
+
+        with owner:
+            owner_task = asyncio.create_task(owner.run())
+            await asyncio.sleep(0)
+            with waiter:
+                waiter_task = asyncio.create_task(waiter.run())
+                await asyncio.sleep(0)
+                assert prefetch.cancelled
+                await owner_task
+                owner.finish()
+                await waiter_task
+
+    asyncio.run(main())
+
+
+def test_prefetch_skips_failed_and_duplicate_urls() -> None:
+    async def main() -> None:
+        ps = ParseService()
+        negative_cache.set("raw-failed", UnknownPlatform())
+        assert ps.prefetch("u", "raw-failed") is None
+
+        first = ps.prefetch("u", "raw-dup")
+        assert first is not None
+        assert ps.prefetch("u", "raw-dup") is None
+        first.cancel()
+
+    asyncio.run(main())
+
+
+def test_parse_caches_only_parsehub_errors() -> None:
+    async def main() -> None:
+        ps = ParseService()
+        with pytest.raises(UnknownPlatform):
+            await ps.parse("no link here", negative_cache_key="raw-unknown")
+        entry = negative_cache.get("raw-unknown")
+        assert entry is not None and entry.error_class == "UnknownPlatform"
+
+        _cache_failure("raw-timeout", TimeoutError())
+        assert negative_cache.get("raw-timeout") is None
+
+    asyncio.run(main())
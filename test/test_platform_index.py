@@ -0,0 +1,48 @@
+import re
+
+import pytest
+from parsehub import ParseHub
+
+import utils.platform_index
+from utils.platform_index import PlatformIndex, _required_literals
+
+
+def test_required_literals() -> None:
+    pattern = r"^(http(s)?://)?.+(twitter|fixupx|x).com/.*/status/\d+"
+    assert _required_literals(re._parser.parse(pattern)) == {"/status/"}  # type: ignore[attr-defined]
+    assert _required_literals(re._parser.parse(r"(Foo|bar)\d+")) == {"foo", "bar"}  # type: ignore[attr-defined]
+    assert _required_literals(re._parser.parse(r"(foo|\d)")) is None  # type: ignore[attr-defined]
+
+
+TEXTS = [
+    "",
+    "今天天气不错",
+    "I think so. See you tomorrow.",
+    "看这个 https://www.bilibili.com/video/BV1xx411c7mD 不错",
+    "BV1xx411c7mD",
+    "https://x.com/user/status/123",
+    "https://example.com/user/status/123",
+    "https://youtu.be/abc",
+    "https://www.xiaohongshu.com/explore/abc",
+]
+
+
+def test_detect_matches_parsehub() -> None:
+    parsehub = ParseHub()
+    index = PlatformIndex(parsehub.parsers)
+    # 当前 Python 版本下能从已安装的解析器中提取到字面量
+    assert any(literals for _, _, literals in index._entries)
+    for text in TEXTS:
+        assert index.detect(text) == parsehub.get_platform(text), text
+
+
+def test_literal_extraction_failure_falls_back_to_full_match(monkeypatch: pytest.MonkeyPatch) -> None:
+    def broken(items: object) -> None:
+        raise AttributeError("re._parser changed")
+
+    monkeypatch.setattr(utils.platform_index, "_required_literals", broken)
+    parsehub = ParseHub()
+    index = PlatformIndex(parsehub.parsers)
+    assert all(literals is None for _, _, literals in index._entries)
+    for text in TEXTS:
+        assert index.detect(text) == parsehub.get_platform(text), text
@@ -0,0 +1,88 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from utils.process import _run_process_simple, process_metrics, run_process
+
+# 启动一个孙进程后自身也长时间运行，用于验证结束的是整个进程组
+SPAWN_GRANDCHILD = (
+    "import subprocess, sys, time\n"
+    "p = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+    "print(p.pid, flush=True)\n"
+    "time.sleep(60)\n"
+)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        state = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[0]
+    except FileNotFoundError:
+        return False
+    return state != "Z"
+
+
+def _wait_dead(pid: int) -> bool:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if not _alive(pid):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+pytestmark = pytest.mark.skipif(not Path("/proc").exists(), reason="需要 Linux /proc")
+
+
+def test_run_process_captures_stdout_and_records_metrics() -> None:
+    result = asyncio.run(run_process(sys.executable, "-c", "print('hello')", capture_stdout=True))
+
+    assert result.ok and result.stdout.strip() == b"hello"
+    assert result.wall_time > 0 and result.cpu_time > 0
+    assert process_metrics.snapshot()[Path(sys.executable).name].count >= 1
+
+
+def test_run_process_timeout_kills_process_group() -> None:
+    lines: list[str] = []
+
+    async def on_line(line: str) -> None:
+        lines.append(line)
+
+    result = asyncio.run(run_process(sys.executable, "-c", SPAWN_GRANDCHILD, timeout=1, on_line=on_line))
+
+    assert result.timed_out and not result.ok and result.returncode < 0
+    assert _wait_dead(int(lines[0]))
+
+
+def test_run_process_cancel_kills_process_group() -> None:
+    lines: list[str] = []
+
+    async def on_line(line: str) -> None:
+        lines.append(line)
+
+    async def main() -> None:
+        task = asyncio.create_task(run_process(sys.executable, "-c", SPAWN_GRANDCHILD, on_line=on_line))
+        while not lines:
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert _wait_dead(int(lines[0]))
+
+
+def test_simple_fallback_captures_stdout_and_times_out() -> None:
+    async def main() -> None:
+        program = Path(sys.executable).name
+        result = await _run_process_simple([sys.executable, "-c", "print('hi')"], program, None, True, None)
+        assert result.ok and result.stdout.strip() == b"hi"
+
+        result = await _run_process_simple(
+            [sys.executable, "-c", "import time; time.sleep(60)"], program, 0.5, False, None
+        )
+        assert result.timed_out and not result.ok
+
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+import asyncio
+
+from services.scheduler import JobScheduler, JobStage
+
+
+def test_stage_pool_caps_concurrency() -> None:
+    scheduler = JobScheduler(download_workers=2)
+    running = 0
+    peak = 0
+
+    async def job() -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    async def main() -> None:
+        await asyncio.gather(*(scheduler.submit(JobStage.DOWNLOAD, job) for _ in range(6)))
+
+    asyncio.run(main())
+    stats = scheduler.stats()[JobStage.DOWNLOAD]
+    assert peak == 2
+    assert stats.completed == 6
+    assert stats.active == stats.waiting == 0
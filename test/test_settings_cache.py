@@ -0,0 +1,32 @@
+from repo.settings.schema import DEFAULT_SETTINGS_CONFIG
+from services.settings import (
+    ForumTopicMemberSettingsTarget,
+    GroupMemberSettingsTarget,
+    GroupSettingsTarget,
+    SettingsConfigCache,
+    UserSettingsTarget,
+)
+
+
+def test_invalidate_group_clears_members() -> None:
+    cache = SettingsConfigCache(ttl=60)
+    member = GroupMemberSettingsTarget(telegram_chat_id=-100, telegram_user_id=1)
+    topic_member = ForumTopicMemberSettingsTarget(telegram_chat_id=-100, telegram_thread_id=5, telegram_user_id=1)
+    other = UserSettingsTarget(telegram_user_id=2)
+    for target in (member, topic_member, other):
+        cache.set(target, DEFAULT_SETTINGS_CONFIG, cache.version)
+
+    cache.invalidate(GroupSettingsTarget(telegram_chat_id=-100))
+
+    assert cache.get(member) is None
+    assert cache.get(topic_member) is None
+    assert cache.get(other) is DEFAULT_SETTINGS_CONFIG
+
+
+def test_set_after_invalidate_is_dropped() -> None:
+    cache = SettingsConfigCache(ttl=60)
+    target = UserSettingsTarget(telegram_user_id=1)
+    version = cache.version
+    cache.invalidate(target)
+    cache.set(target, DEFAULT_SETTINGS_CONFIG, version)
+    assert cache.get(target) is None
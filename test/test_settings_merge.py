@@ -0,0 +1,25 @@
+from db.models.settings import SettingsScope
+from repo.settings.schema import ParseMode
+from services.settings import _hydrate_config, _merge_config_patches
+
+
+def test_merge_respects_chain_order_and_scopes() -> None:
+    merged = _merge_config_patches(
+        [
+            (SettingsScope.GROUP_MEMBER, {"hide_title": True, "noprogress": True}),
+            (SettingsScope.GROUP, {"hide_title": False, "noprogress": False, "enable_inline_raw_url": True}),
+            (SettingsScope.USER, {"default_mode": "raw"}),
+        ]
+    )
+    # 不属于字段允许范围的值被忽略
+    assert merged == {"hide_title": True, "noprogress": False, "default_mode": "raw"}
+
+
+def test_hydrate_without_validation_matches_validated() -> None:
+    disabled_platforms = ["twitter"]
+    patch = {"default_mode": "raw", "disabled_platforms": disabled_platforms, "hide_desc": True}
+    config = _hydrate_config(patch, validated=True)
+    assert config == _hydrate_config(patch)
+    assert config.default_mode is ParseMode.RAW
+    disabled_platforms.append("weibo")
+    assert config.disabled_platforms == ["twitter"]
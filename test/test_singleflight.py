@@ -0,0 +1,87 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from db.base import Base
+from repo.singleflight import SingleflightLeaseRepo
+from services.singleflight import DatabaseSingleflight, LocalSingleflight
+
+
+def test_local_singleflight_releases_waiters() -> None:
+    async def main() -> None:
+        sf = LocalSingleflight()
+        assert await sf.acquire("k")
+        assert not await sf.acquire("k")
+        waiter = asyncio.create_task(sf.wait("k"))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        sf.release("k")
+        await asyncio.wait_for(waiter, 1)
+        assert await sf.acquire("k")
+
+    asyncio.run(main())
+
+
+def test_database_singleflight_across_instances(tmp_path: Path) -> None:
+    async def main() -> None:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'sf.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        @asynccontextmanager
+        async def session_factory() -> AsyncIterator[AsyncSession]:
+            async with maker() as session, session.begin():
+                yield session
+
+        owner = DatabaseSingleflight(lease_ttl=5, poll_interval=0.01, session_factory=session_factory)
+        other = DatabaseSingleflight(lease_ttl=5, poll_interval=0.01, session_factory=session_factory)
+
+        assert await owner.acquire("https://example.com/a")
+        assert not await other.acquire("https://example.com/a")
+        waiter = asyncio.create_task(other.wait("https://example.com/a"))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+
+        owner.release("https://example.com/a")
+        await asyncio.wait_for(waiter, 1)
+        assert await other.acquire("https://example.com/a")
+        other.release("https://example.com/a")
+        await asyncio.sleep(0.05)
+        await engine.dispose()
+
+    asyncio.run(main())
+
+
+def test_database_singleflight_prunes_expired_leases(tmp_path: Path) -> None:
+    async def main() -> None:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'sf.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        @asynccontextmanager
+        async def session_factory() -> AsyncIterator[AsyncSession]:
+            async with maker() as session, session.begin():
+                yield session
+
+        now = datetime.now(UTC)
+        async with session_factory() as session:
+            await SingleflightLeaseRepo(session).add(key="expired", owner="o", expires_at=now - timedelta(seconds=1))
+            await SingleflightLeaseRepo(session).add(key="alive", owner="o", expires_at=now + timedelta(minutes=1))
+
+        sf = DatabaseSingleflight(lease_ttl=5, session_factory=session_factory)
+        sf.start_background()
+        await asyncio.sleep(0.1)
+        await sf.stop_background()
+
+        async with session_factory() as session:
+            assert not await SingleflightLeaseRepo(session).is_alive("expired", now - timedelta(minutes=1))
+            assert await SingleflightLeaseRepo(session).is_alive("alive", now)
+        await engine.dispose()
+
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+import utils.transcode
+from utils.transcode import TranscodeManager, TranscodePlan, TranscodeProgress, select_plan
+
+
+def test_select_plan_speeds_up_when_queue_is_deep() -> None:
+    idle = select_plan(duration=20, height=1080, queued=0, max_jobs=2, cpu_count=8)
+    busy = select_plan(duration=20, height=1080, queued=3, max_jobs=2, cpu_count=8)
+
+    assert (idle.preset, idle.crf, idle.threads) == ("slow", 18, 4)
+    assert busy.preset == "fast"
+    assert select_plan(duration=3600, height=1080, queued=10, max_jobs=1, cpu_count=1).preset == "ultrafast"
+    assert select_plan(duration=3600, height=1080, queued=0, max_jobs=1, cpu_count=1).scale_720p
+
+
+def test_progress_update_parses_ffmpeg_progress_block() -> None:
+    progress = TranscodeProgress(Path("a.mp4"), duration=10)
+    lines = ["frame=10", "out_time_us=2500000", "speed=1.5x", "progress=continue"]
+
+    assert [progress.update(line) for line in lines] == [False, False, False, True]
+    assert progress.percent == 25 and progress.speed == 1.5 and not progress.done
+    assert progress.update("progress=end") and progress.percent == 100
+
+
+def test_manager_caps_concurrent_jobs_and_reports_progress(monkeypatch: pytest.MonkeyPatch) -> None:
+    script = (
+        "import sys, time\n"
+        "for t in (1, 2):\n"
+        "    print(f'out_time_us={t * 1000000}', 'progress=continue', sep='\\n', flush=True)\n"
+        "    time.sleep(0.05)\n"
+        "print('progress=end', flush=True)\n"
+    )
+
+    def fake_cmd(src: Path, out: Path, plan: TranscodePlan) -> list[str]:
+        return [sys.executable, "-c", script]
+
+    monkeypatch.setattr(utils.transcode, "build_transcode_cmd", fake_cmd)
+    manager = TranscodeManager(max_jobs=2, cpu_count=4, logger=lambda *_: None)
+    peak = 0
+    reports: list[float] = []
+
+    async def on_progress(progress: TranscodeProgress) -> None:
+        nonlocal peak
+        peak = max(peak, len(manager.active_jobs))
+        reports.append(progress.percent)
+
+    async def main() -> list[bool]:
+        jobs = [manager.transcode(Path(f"{i}.mp4"), Path("out.mp4"), 4, 720, on_progress) for i in range(5)]
+        return await asyncio.gather(*jobs)
+
+    assert asyncio.run(main()) == [True] * 5
+    assert peak == 2
+    assert reports.count(100) == 5 and 25 in reports and 50 in reports
+    assert manager.active_threads == 0 and manager.queued == 0
@@ -0,0 +1,35 @@
+from utils.video_split import Keyframe, VideoPart, parse_keyframes, plan_video_parts
+
+
+def _keyframes(duration: int, gop: int, byte_rate: int, with_pos: bool = True) -> list[Keyframe]:
+    return [Keyframe(float(t), t * byte_rate if with_pos else -1) for t in range(0, duration, gop)]
+
+
+def test_plan_video_parts_respects_size_limit_and_keeps_overlap() -> None:
+    keyframes = _keyframes(duration=600, gop=2, byte_rate=1000)
+    parts = plan_video_parts(keyframes, duration=600, file_size=600_000, size_limit=100_000, keep_sec=1)
+
+    starts = {k.time for k in keyframes}
+    assert all(p.start in starts for p in parts)
+    assert parts[-1].duration is None
+    for prev, cur in zip(parts, parts[1:], strict=False):
+        assert prev.duration is not None
+        assert prev.duration * 1000 <= 100_000 * 0.95
+        # 后一段从前一段结束前的关键帧开始
+        assert prev.start < cur.start < prev.start + prev.duration
+
+
+def test_plan_video_parts_estimates_by_bitrate_without_positions() -> None:
+    keyframes = _keyframes(duration=100, gop=5, byte_rate=1000, with_pos=False)
+    parts = plan_video_parts(keyframes, duration=100, file_size=100_000, size_limit=40_000, keep_sec=0)
+
+    assert parts == [VideoPart(0.0, 35.0), VideoPart(35.0, 35.0), VideoPart(70.0, None)]
+
+
+def test_plan_video_parts_without_keyframes() -> None:
+    assert plan_video_parts([], duration=10, file_size=100, size_limit=50) == []
+
+
+def test_parse_keyframes_skips_non_key_and_unknown_fields() -> None:
+    out = "1,2.000000,4096\n0,2.040000,5000\n1,0.000000,48\n1,N/A,9000\n1,4.000000,N/A\n"
+    assert parse_keyframes(out) == [Keyframe(0.0, 48), Keyframe(2.0, 4096), Keyframe(4.0, -1)]
@@ -1,28 +1,21 @@
-import asyncio
 import functools
 import tarfile
 import uuid
-from collections.abc import Awaitable, Callable, Sequence
+from collections.abc import Awaitable, Callable, Collection, Sequence
 from pathlib import Path
 from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from log import logger
+from utils.process import run_process
 
 
 async def run_cmd(*cmd: str, timeout: float = 30) -> str:
-    """运行外部命令并异步读取输出"""
-    proc = await asyncio.create_subprocess_exec(
-        *cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.DEVNULL,
-    )
-    try:
-        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=timeout)
-    except TimeoutError:
-        proc.kill()
-        await proc.wait()
+    """运行外部命令并返回标准输出，超时返回空字符串"""
+    result = await run_process(*cmd, timeout=timeout, capture_stdout=True)
+    if result.timed_out:
         return ""
-    return stdout.decode().strip()
+    return result.stdout.decode().strip()
 
 
 def to_list[T](v: T | Sequence[T]) -> Sequence[T]:
@@ -70,3 +63,18 @@ def mask_secret(value: str) -> str:
         return ""
     c = min(len(value) // 3, 4)
     return f"{value[:c]}******{value[-c:]}"
+
+
+def normalize_media_url(url: str, ignored_params: Collection[str] = ()) -> str:
+    """
+    规范化媒体 URL 用作缓存 KEY：协议与域名小写，去掉片段与默认端口，
+    去掉签名 / 过期时间等每次解析都会变化的查询参数 (不区分大小写)，其余参数排序。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        netloc = f"{netloc}:{parts.port}"
+    ignored = {p.lower() for p in ignored_params}
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in ignored)
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(query), ""))
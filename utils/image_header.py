@@ -0,0 +1,140 @@
+"""图片文件头解析 — 不依赖 Pillow，只读取文件开头的少量字节获取格式与尺寸"""
+
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+
+_HEAD_SIZE = 64 * 1024
+"""读取的最大字节数，JPEG 的 SOF 与 HEIF 的 ispe 通常都在开头 64KB 内"""
+
+_JPEG_SOF = frozenset({0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF})
+_JPEG_MODES = {1: "L", 3: "RGB", 4: "CMYK"}
+_PNG_MODES = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+_HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1"}
+_AVIF_BRANDS = {b"avif", b"avis"}
+_HEIF_ALPHA_URNS = (b"urn:mpeg:hevc:2015:auxid:1", b"urn:mpeg:mpegB:cicp:systems:auxiliary:alpha")
+
+
+@dataclass(frozen=True, slots=True)
+class ImageHeader:
+    format: str
+    """与 Pillow Image.format 一致的格式名: JPEG / PNG / WEBP / GIF / HEIF / AVIF"""
+    width: int
+    height: int
+    mode: str
+    """近似的 Pillow 模式，WEBP / HEIF / AVIF 只区分 RGB 与 RGBA"""
+
+
+def read_image_header(file_path: str | Path) -> ImageHeader | None:
+    """解析图片文件头，无法识别或数据不完整时返回 None"""
+    with open(file_path, "rb") as f:
+        head = f.read(_HEAD_SIZE)
+    try:
+        return parse_image_header(head)
+    except (struct.error, IndexError, ValueError):
+        return None
+
+
+def parse_image_header(head: bytes) -> ImageHeader | None:
+    header = _parse_header(head)
+    # 尺寸为 0 (如 JPEG 的高度由 DNL 标记给出) 时视为无法识别，交给 Pillow / ffmpeg 处理
+    if header is None or header.width == 0 or header.height == 0:
+        return None
+    return header
+
+
+def _parse_header(head: bytes) -> ImageHeader | None:
+    if head.startswith(b"\xff\xd8"):
+        return _parse_jpeg(head)
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return _parse_png(head)
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        width, height = struct.unpack_from("<HH", head, 6)
+        return ImageHeader("GIF", width, height, "P")
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return _parse_webp(head)
+    if head[4:8] == b"ftyp":
+        return _parse_heif(head)
+    return None
+
+
+def _parse_png(head: bytes) -> ImageHeader | None:
+    if head[12:16] != b"IHDR":
+        return None
+    width, height, _bit_depth, color_type = struct.unpack_from(">IIBB", head, 16)
+    return ImageHeader("PNG", width, height, _PNG_MODES.get(color_type, "RGB"))
+
+
+def _parse_jpeg(head: bytes) -> ImageHeader | None:
+    offset = 2
+    while offset + 4 <= len(head):
+        if head[offset] != 0xFF:
+            return None
+        marker = head[offset + 1]
+        if marker == 0xFF:
+            # 填充字节
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        (length,) = struct.unpack_from(">H", head, offset + 2)
+        if marker in _JPEG_SOF:
+            height, width, components = struct.unpack_from(">HHB", head, offset + 5)
+            return ImageHeader("JPEG", width, height, _JPEG_MODES.get(components, "RGB"))
+        offset += 2 + length
+    return None
+
+
+def _parse_webp(head: bytes) -> ImageHeader | None:
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack_from("<HH", head, 26)
+        return ImageHeader("WEBP", width & 0x3FFF, height & 0x3FFF, "RGB")
+    if chunk == b"VP8L":
+        (bits,) = struct.unpack_from("<I", head, 21)
+        width = (bits & 0x3FFF) + 1
+        height = ((bits >> 14) & 0x3FFF) + 1
+        has_alpha = bool((bits >> 28) & 1)
+        return ImageHeader("WEBP", width, height, "RGBA" if has_alpha else "RGB")
+    if chunk == b"VP8X":
+        flags = head[20]
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return ImageHeader("WEBP", width, height, "RGBA" if flags & 0x10 else "RGB")
+    return None
+
+
+def _parse_heif(head: bytes) -> ImageHeader | None:
+    (ftyp_size,) = struct.unpack_from(">I", head, 0)
+    brands = {head[8:12]} | {head[i : i + 4] for i in range(16, min(ftyp_size, len(head)), 4)}
+    if brands & _AVIF_BRANDS:
+        fmt = "AVIF"
+    elif brands & _HEIF_BRANDS:
+        fmt = "HEIF"
+    else:
+        return None
+
+    # ispe: 图像空间尺寸属性，缩略图同样有 ispe，取面积最大的作为主图
+    best: tuple[int, int] | None = None
+    index = head.find(b"ispe")
+    while index != -1:
+        width, height = struct.unpack_from(">II", head, index + 8)
+        if best is None or width * height > best[0] * best[1]:
+            best = (width, height)
+        index = head.find(b"ispe", index + 4)
+    if best is None or not all(best):
+        return None
+    width, height = best
+
+    # clap: 裁剪后的实际尺寸 (HEVC 编码尺寸通常被补齐为偶数)
+    if (index := head.find(b"clap")) != -1:
+        width_n, width_d, height_n, height_d = struct.unpack_from(">IIII", head, index + 4)
+        if width_d and height_d and 0 < width_n // width_d <= width and 0 < height_n // height_d <= height:
+            width, height = width_n // width_d, height_n // height_d
+    # irot: 逆时针旋转 90° 的倍数
+    if (index := head.find(b"irot")) != -1 and head[index + 4] & 0x01:
+        width, height = height, width
+
+    mode = "RGBA" if any(urn in head for urn in _HEIF_ALPHA_URNS) else "RGB"
+    return ImageHeader(fmt, width, height, mode)
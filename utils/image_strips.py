@@ -0,0 +1,138 @@
+"""按行条带解码 PNG — 长图切割时每次只在内存中保留一个条带，而不是整张解码后的图片
+
+PNG 的像素数据是一条连续的 zlib 流，每行带有一个引用上一行的过滤字节。
+这里逐块解压 IDAT，每凑够一个条带的行数，就把这些行与上一条带的最后一行 (已还原) 重新封装成一个
+小 PNG 交给 Pillow 解码，因此行过滤的还原仍由 Pillow 完成。
+"""
+
+import struct
+import zlib
+from collections.abc import Iterator
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO
+
+from PIL import Image
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+"""color type -> 每像素字节数 (仅 8 bit)"""
+_ANCILLARY = {b"PLTE", b"tRNS"}
+"""需要复制到每个条带中的辅助块"""
+_READ_SIZE = 256 * 1024
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+class PngStrips:
+    """逐条带读取 8 bit 非隔行扫描 PNG，通过 open_png_strips 创建"""
+
+    def __init__(self, path: Path, width: int, height: int, ihdr: bytes, ancillary: list[tuple[bytes, bytes]]):
+        self.path = path
+        self.width = width
+        self.height = height
+        self._ihdr = ihdr
+        self._ancillary = b"".join(_chunk(tag, data) for tag, data in ancillary)
+        self._row_bytes = 1 + width * _CHANNELS[ihdr[9]]
+
+    def iter_strips(self, strip_height: int) -> Iterator[Image.Image]:
+        """依次产出高度为 strip_height 的条带 (最后一条可能更矮)"""
+        prev_row: bytes | None = None
+        pending = bytearray()
+        strip_bytes = strip_height * self._row_bytes
+        decoded_rows = 0
+        with open(self.path, "rb") as f:
+            for data in self._iter_pixel_data(f, max_length=strip_bytes):
+                pending += data
+                while len(pending) >= strip_bytes and decoded_rows + strip_height <= self.height:
+                    strip, prev_row = self._decode_strip(pending[:strip_bytes], strip_height, prev_row)
+                    del pending[:strip_bytes]
+                    decoded_rows += strip_height
+                    yield strip
+
+        rest = self.height - decoded_rows
+        if rest > 0:
+            if len(pending) < rest * self._row_bytes:
+                raise OSError(f"PNG 数据不完整: {self.path}")
+            strip, _ = self._decode_strip(pending[: rest * self._row_bytes], rest, prev_row)
+            yield strip
+
+    def _iter_pixel_data(self, f: BinaryIO, max_length: int) -> Iterator[bytes]:
+        """逐块解压 IDAT，产出过滤后的原始行数据，每块不超过 max_length 字节 (高压缩率图片也不会一次解压出整张图)"""
+        inflater = zlib.decompressobj()
+        f.seek(len(_PNG_SIGNATURE))
+        while header := f.read(8):
+            length, tag = struct.unpack(">I4s", header)
+            if tag == b"IEND":
+                break
+            if tag != b"IDAT":
+                f.seek(length + 4, 1)
+                continue
+            remaining = length
+            while remaining:
+                data = f.read(min(remaining, _READ_SIZE))
+                if not data:
+                    raise OSError(f"PNG 数据不完整: {self.path}")
+                remaining -= len(data)
+                yield inflater.decompress(data, max_length)
+                while inflater.unconsumed_tail:
+                    yield inflater.decompress(inflater.unconsumed_tail, max_length)
+            f.seek(4, 1)  # CRC
+        yield inflater.flush()
+
+    def _decode_strip(self, rows: bytes | bytearray, height: int, prev_row: bytes | None) -> tuple[Image.Image, bytes]:
+        """把条带的行数据封装为独立 PNG 解码；非首个条带在开头补上一条带已还原的最后一行作为过滤参考"""
+        if prev_row is not None:
+            rows = b"\x00" + prev_row + rows
+            height += 1
+        ihdr = struct.pack(">II", self.width, height) + self._ihdr[8:]
+        png = (
+            _PNG_SIGNATURE
+            + _chunk(b"IHDR", ihdr)
+            + self._ancillary
+            + _chunk(b"IDAT", zlib.compress(rows, 0))
+            + _chunk(b"IEND", b"")
+        )
+        with Image.open(BytesIO(png)) as img:
+            img.load()
+            if prev_row is not None:
+                strip = img.crop((0, 1, self.width, height))
+            else:
+                strip = img.copy()
+        last_row = strip.crop((0, strip.height - 1, self.width, strip.height)).tobytes()
+        return strip, last_row
+
+
+def open_png_strips(path: str | Path) -> PngStrips | None:
+    """文件为可按条带解码的 PNG (8 bit、非隔行扫描) 时返回 PngStrips，否则返回 None"""
+    path = Path(path)
+    ihdr: bytes | None = None
+    ancillary: list[tuple[bytes, bytes]] = []
+    with open(path, "rb") as f:
+        if f.read(8) != _PNG_SIGNATURE:
+            return None
+        while header := f.read(8):
+            if len(header) < 8:
+                return None
+            length, tag = struct.unpack(">I4s", header)
+            if tag == b"IHDR":
+                ihdr = f.read(length)
+                width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", ihdr)
+                if bit_depth != 8 or interlace or color_type not in _CHANNELS or not width or not height:
+                    return None
+                f.seek(4, 1)
+                continue
+            if tag in (b"IDAT", b"IEND"):
+                break
+            if ihdr is None:
+                return None
+            if tag in _ANCILLARY:
+                ancillary.append((tag, f.read(length)))
+                f.seek(4, 1)
+            else:
+                f.seek(length + 4, 1)
+    if ihdr is None:
+        return None
+    return PngStrips(path, width, height, ihdr, ancillary)
@@ -0,0 +1,100 @@
+"""ffprobe 元数据读取 — 一次调用获取容器与全部流信息，按 路径 + mtime 缓存"""
+
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from utils.helpers import run_cmd
+
+_PROBE_CACHE_SIZE = 512
+_probe_cache: OrderedDict[tuple[str, int, int], "MediaProbe"] = OrderedDict()
+
+
+@dataclass(frozen=True, slots=True)
+class MediaProbe:
+    """ffprobe -show_format -show_streams 的结果，只保留用到的字段"""
+
+    format_name: str
+    duration: float
+    size: int
+    bit_rate: int
+    video_codec: str = ""
+    width: int = 0
+    height: int = 0
+    rotation: int = 0
+    """显示时需要旋转的角度 (来自 displaymatrix / rotate tag)"""
+    audio_codec: str = ""
+
+    @property
+    def has_video(self) -> bool:
+        return bool(self.video_codec)
+
+    @property
+    def has_audio(self) -> bool:
+        return bool(self.audio_codec)
+
+    @property
+    def display_size(self) -> tuple[int, int]:
+        """考虑旋转后的显示宽高"""
+        if self.rotation % 180:
+            return self.height, self.width
+        return self.width, self.height
+
+    @classmethod
+    def from_ffprobe(cls, data: dict[str, Any]) -> "MediaProbe":
+        fmt = data.get("format") or {}
+        if not fmt:
+            raise ValueError(f"ffprobe 未返回容器信息: {data}")
+        streams: list[dict[str, Any]] = data.get("streams") or []
+        video = next((s for s in streams if s.get("codec_type") == "video"), {})
+        audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+        return cls(
+            format_name=fmt.get("format_name", ""),
+            duration=_to_float(fmt.get("duration") or video.get("duration")),
+            size=int(_to_float(fmt.get("size"))),
+            bit_rate=int(_to_float(fmt.get("bit_rate"))),
+            video_codec=(video.get("codec_name") or "").lower(),
+            width=int(video.get("width") or 0),
+            height=int(video.get("height") or 0),
+            rotation=_rotation(video),
+            audio_codec=(audio.get("codec_name") or "").lower(),
+        )
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _rotation(stream: dict[str, Any]) -> int:
+    for side_data in stream.get("side_data_list") or []:
+        if "rotation" in side_data:
+            return int(_to_float(side_data["rotation"])) % 360
+    return int(_to_float((stream.get("tags") or {}).get("rotate"))) % 360
+
+
+async def probe_media(file_path: str | Path, timeout: float = 30) -> MediaProbe:
+    """运行一次 ffprobe 获取媒体信息，同一文件 (路径 + mtime + 大小 不变) 只探测一次；失败时抛出 ValueError"""
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if (cached := _probe_cache.get(key)) is not None:
+        _probe_cache.move_to_end(key)
+        return cached
+
+    out = await run_cmd("ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", path, timeout=timeout)
+    try:
+        data = json.loads(out) if out else {}
+    except json.JSONDecodeError as e:
+        raise ValueError(f"ffprobe 输出无法解析: {path}") from e
+    probe = MediaProbe.from_ffprobe(data)
+
+    _probe_cache[key] = probe
+    while len(_probe_cache) > _PROBE_CACHE_SIZE:
+        _probe_cache.popitem(last=False)
+    return probe
@@ -1,21 +1,32 @@
 """媒体处理器 — 将图片/视频转换为 Telegram 兼容格式"""
 
 import asyncio
-import json
 import math
 import mimetypes
 import os
 import time
-from collections.abc import Callable
-from dataclasses import dataclass
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 
-from haishoku.haishoku import Haishoku
+from haishoku import alg
 from loguru import logger
 from PIL import Image, ImageOps
 from PIL.Image import Resampling
 
 from utils.helpers import run_cmd
+from utils.image_header import read_image_header
+from utils.image_strips import open_png_strips
+from utils.media_probe import probe_media
+from utils.process import run_process
+from utils.transcode import TranscodeManager, TranscodeProgressCallback
+from utils.video_split import VideoPart, plan_video_parts, probe_keyframes
+
+JPEG_SAVE_OPTIONS = {"quality": 75, "subsampling": "4:2:0", "optimize": True, "progressive": False}
+"""重新编码 JPEG 时的参数。Telegram 会再次压缩图片，更高的质量只会增加上传体积；
+optimize 以少量 CPU 换取约 5% 体积，progressive 编码耗时翻倍但体积收益很小"""
 
 
 @dataclass
@@ -26,6 +37,54 @@ class MediaProcessResult:
     temp_dir: Path | None = None
 
 
+@dataclass
+class ImageContext:
+    """图片处理上下文，整个 process_image 流程只打开一次文件
+
+    格式 / 模式 / 尺寸优先从文件头解析，像素数据在首次访问 image 时才解码并复用
+    """
+
+    path: Path
+    format: str
+    mode: str
+    width: int
+    height: int
+    broken: bool = False
+    """Pillow 无法识别，格式来自 ffprobe，尺寸未知"""
+    _image: Image.Image | None = field(default=None, repr=False)
+
+    @classmethod
+    def open(cls, path: Path) -> "ImageContext":
+        """解析文件头，无法识别时退回 Pillow 惰性打开；Pillow 同样无法识别时抛出 OSError"""
+        if header := read_image_header(path):
+            return cls(path, header.format, header.mode, header.width, header.height)
+        img = Image.open(path)
+        return cls(path, (img.format or "").upper(), img.mode, img.width, img.height, _image=img)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def image(self) -> Image.Image:
+        """解码后的图片，首次访问时解码"""
+        return self.decode()
+
+    def decode(self, draft_size: tuple[int, int] | None = None) -> Image.Image:
+        """解码图片；尚未解码的 JPEG 指定 draft_size 时由解码器直接按 1/2、1/4、1/8 缩小 (不小于 draft_size)"""
+        if self._image is None:
+            self._image = Image.open(self.path)
+            if draft_size is not None and self._image.format == "JPEG":
+                self._image.draft(self._image.mode, draft_size)
+        self._image.load()
+        return self._image
+
+    def close(self) -> None:
+        if self._image is not None:
+            self._image.close()
+            self._image = None
+
+
 class MediaProcessingUnit:
     """媒体处理器，将媒体转换为 Telegram 兼容的格式
 
@@ -40,6 +99,8 @@ class MediaProcessingUnit:
     """
 
     TG_MAX_VIDEO_SIZE = 2000 * 1000**2
+    FFMPEG_COPY_TIMEOUT = 30 * 60
+    """stream copy (重新封装 / 分割) 的超时时间，单位秒"""
 
     def __init__(
         self,
@@ -47,6 +108,11 @@ class MediaProcessingUnit:
         segment_height: int = 1400,
         medium_threshold: int = 2,
         overlap: int = 100,
+        split_workers: int = 2,
+        video_split_workers: int = 3,
+        transcoder: TranscodeManager | None = None,
+        on_transcode_progress: TranscodeProgressCallback | None = None,
+        transcode_h264: bool = False,
         logger: Callable = logger.info,
     ):
         self.output_dir = Path(output_dir)
@@ -54,6 +120,12 @@ class MediaProcessingUnit:
         self.segment_height = segment_height
         self.medium_threshold = medium_threshold
         self.overlap = overlap
+        self.split_workers = split_workers
+        self.video_split_workers = video_split_workers
+        self.transcoder = transcoder or TranscodeManager(logger=logger)
+        self.on_transcode_progress = on_transcode_progress
+        self.transcode_h264 = transcode_h264
+        """非 h264 编码的视频先转码为 h264"""
         self.logger = logger
 
     # ------------------------------------------------------------------ #
@@ -75,67 +147,71 @@ class MediaProcessingUnit:
     # ------------------------------------------------------------------ #
 
     async def process_image(self, file_path: Path) -> MediaProcessResult:
-        image_format, is_broken, image_mode = await self._detect_image_format(file_path)
-        if image_format == "GIF":
+        ctx = await self._open_image(file_path)
+        if ctx.format == "GIF":
             self.logger("图片为 GIF 格式，无需处理")
             return MediaProcessResult(output_paths=[file_path])
-        needs_convert = image_format not in {"PNG", "JPEG"}
-        needs_rgb = image_mode == "RGBA"
-        source = file_path
+        contexts = [ctx]
         intermediates: list[Path] = []  # 统一收集中间文件
 
         try:
-            if needs_convert or is_broken or needs_rgb:
-                self.logger(f"图片需转换: format={image_format}, mode={image_mode}, broken={is_broken}")
-                source = await self._img2jpg(file_path)
-                intermediates.append(source)
-
-            if result := await asyncio.to_thread(self._adapt_image, source):
-                return result
-
-            # _adapt_image 无需处理，尝试 downscale
-            if downscaled := await asyncio.to_thread(self._downscale_image, source):
-                intermediates.append(downscaled)
-                source = downscaled
-
-            intermediates = [p for p in intermediates if p != source]
-            return MediaProcessResult(output_paths=[source])
+            if ctx.broken:
+                self.logger(f"图片无法由 Pillow 识别, 使用 ffmpeg 转换: format={ctx.format}")
+                ctx = await self._img2jpg(ctx)
+                contexts.append(ctx)
+                intermediates.append(ctx.path)
+
+            try:
+                result = await asyncio.to_thread(self._transform_image, ctx)
+            except OSError as e:
+                if ctx.path in intermediates:
+                    raise
+                self.logger(f"Pillow 处理失败，尝试 ffmpeg: {e}")
+                ctx = await self._img2jpg(ctx)
+                contexts.append(ctx)
+                intermediates.append(ctx.path)
+                result = await asyncio.to_thread(self._transform_image, ctx)
+
+            intermediates = [p for p in intermediates if p not in result.output_paths]
+            return result
         finally:
+            for c in contexts:
+                c.close()
             for p in intermediates:
                 if p.exists():
                     self.logger(f"删除中间文件: {p}")
                     os.remove(p)
 
     @staticmethod
-    async def _detect_image_format(file_path: Path) -> tuple[str, bool, str]:
+    async def _open_image(file_path: Path) -> ImageContext:
         try:
-            with Image.open(file_path) as img:
-                return (img.format or "").upper(), False, img.mode
+            return ImageContext.open(file_path)
         except OSError:
-            return await MediaProcessingUnit._probe_image_format(file_path), True, ""
+            image_format = await MediaProcessingUnit._probe_image_format(file_path)
+            return ImageContext(file_path, image_format, "", 0, 0, broken=True)
 
     @staticmethod
     async def _probe_image_format(file_path: Path) -> str:
-        codec = await run_cmd(
-            "ffprobe",
-            "-v",
-            "error",
-            "-select_streams",
-            "v:0",
-            "-show_entries",
-            "stream=codec_name",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            str(file_path),
-        )
-        return {"mjpeg": "JPEG", "jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}.get(
-            codec.strip().lower(), codec.strip().upper()
-        )
-
-    def _adapt_image(self, file_path: Path) -> MediaProcessResult | None:
+        try:
+            codec = (await probe_media(file_path)).video_codec
+        except ValueError:
+            return ""
+        return {"mjpeg": "JPEG", "jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}.get(codec, codec.upper())
+
+    def _transform_image(self, ctx: ImageContext) -> MediaProcessResult:
+        """填充 / 切割，或在一次解码中完成 颜色转换 + 缩放 + 编码；已符合要求的图片直接返回原文件"""
+        needs_rgb = ctx.format not in {"PNG", "JPEG"} or ctx.mode == "RGBA"
+        if result := self._adapt_image(ctx, needs_rgb):
+            return result
+
+        target = self._downscale_size(ctx.size)
+        if not needs_rgb and target is None:
+            return MediaProcessResult(output_paths=[ctx.path])
+        return MediaProcessResult(output_paths=[self._encode_image(ctx, needs_rgb, target)])
+
+    def _adapt_image(self, ctx: ImageContext, rgb: bool = False) -> MediaProcessResult | None:
         """分析图片尺寸并做填充 / 切割，返回 None 表示无需处理"""
-        with Image.open(file_path) as img:
-            w, h = img.width, img.height
+        w, h = ctx.size
 
         wh_ratio = w / h
         hw_ratio = h / w
@@ -148,8 +224,7 @@ class MediaProcessingUnit:
                 return None
             self.logger("横图比例超限，需要填充")
             padding = self._calc_padding_horizontal(w, h)
-            with Image.open(file_path) as img:
-                return self._pad_image(file_path, img, padding)
+            return self._pad_image(ctx.path, self._decode(ctx, rgb), padding)
         else:
             # 竖图
             if hw_ratio <= 5 or (w < 200 and hw_ratio < 20):
@@ -158,56 +233,68 @@ class MediaProcessingUnit:
             if w < 200 and hw_ratio > 20:
                 self.logger("窄竖图比例超限，需要填充")
                 padding = self._calc_padding_vertical(w, h)
-                with Image.open(file_path) as img:
-                    return self._pad_image(file_path, img, padding)
+                return self._pad_image(ctx.path, self._decode(ctx, rgb), padding)
             # 长图切割
             segments = h // self.segment_height
             seg_h = h // 2 if segments < self.medium_threshold else self.segment_height
             self.logger(f"长图切割: segments={segments}, seg_h={seg_h}")
-            return self._split_image(file_path, seg_h)
+            return self._split_image(ctx, seg_h)
 
-    async def _img2jpg(self, file_path: Path) -> Path:
-        output = self.output_dir / file_path.with_suffix(".jpg").name
-        try:
-            with Image.open(file_path) as pil_img:
-                img = pil_img.convert("RGB") if pil_img.mode != "RGB" else pil_img
-                img.save(output, format="JPEG")
-        except OSError as e:
-            self.logger(f"Pillow 转换失败，尝试 ffmpeg: {e}")
-            await run_cmd(
-                "ffmpeg",
-                "-v",
-                "error",
-                "-i",
-                str(file_path),
-                "-frames:v",
-                "1",
-                "-q:v",
-                "1",
-                "-y",
-                str(output),
-                timeout=60,
-            )
-            if not output.exists() or output.stat().st_size == 0:
-                raise
-        self.logger(f"图片转换完成: {output}")
-        return output
+    @staticmethod
+    def _decode(ctx: ImageContext, rgb: bool) -> Image.Image:
+        img = ctx.image
+        return img.convert("RGB") if rgb and img.mode != "RGB" else img
 
-    def _downscale_image(self, file_path: Path, max_side: int = 2560) -> Path | None:
-        """若图片任一边超过 max_side，等比缩放至长边为 max_side，返回新文件路径；无需缩放返回 None"""
-        with Image.open(file_path) as img:
-            w, h = img.size
-            if max(w, h) <= max_side:
-                return None
-            scale = max_side / max(w, h)
-            new_w, new_h = int(w * scale), int(h * scale)
-            self.logger(f"图片长边超限({max(w, h)}px > {max_side}px)，缩放: {w}x{h} -> {new_w}x{new_h}")
-            resized = img.resize((new_w, new_h), Resampling.LANCZOS)
-            ext = file_path.suffix
-            out_path = self.output_dir / f"{file_path.stem}_downscaled{ext}"
-            resized.save(out_path)
+    @staticmethod
+    def _downscale_size(size: tuple[int, int], max_side: int = 2560) -> tuple[int, int] | None:
+        """任一边超过 max_side 时返回等比缩放至长边为 max_side 的尺寸；无需缩放返回 None"""
+        w, h = size
+        if max(w, h) <= max_side:
+            return None
+        scale = max_side / max(w, h)
+        return int(w * scale), int(h * scale)
+
+    def _encode_image(self, ctx: ImageContext, rgb: bool, target: tuple[int, int] | None) -> Path:
+        """颜色转换、缩放与编码合并为一步，JPEG 源使用 draft 模式按缩小比例解码"""
+        img = ctx.decode(target)
+        if rgb and img.mode != "RGB":
+            img = img.convert("RGB")
+        if target is not None:
+            self.logger(f"图片长边超限({max(ctx.size)}px)，缩放: {ctx.width}x{ctx.height} -> {target[0]}x{target[1]}")
+            img = img.resize(target, Resampling.LANCZOS)
+
+        suffix = "_downscaled" if target else ""
+        if rgb or ctx.format == "JPEG":
+            out_path = self.output_dir / f"{ctx.path.stem}{suffix}.jpg"
+            img.save(out_path, format="JPEG", **JPEG_SAVE_OPTIONS)
+        else:
+            out_path = self.output_dir / f"{ctx.path.stem}{suffix}{ctx.path.suffix}"
+            img.save(out_path)
+        self.logger(f"图片转换完成: format={ctx.format}, mode={ctx.mode}, output={out_path}")
         return out_path
 
+    async def _img2jpg(self, ctx: ImageContext) -> ImageContext:
+        """使用 ffmpeg 转换为 JPEG，用于 Pillow 无法解码的图片"""
+        output = self.output_dir / ctx.path.with_suffix(".jpg").name
+        await run_cmd(
+            "ffmpeg",
+            "-v",
+            "error",
+            "-i",
+            str(ctx.path),
+            "-frames:v",
+            "1",
+            "-q:v",
+            "1",
+            "-y",
+            str(output),
+            timeout=60,
+        )
+        if not output.exists() or output.stat().st_size == 0:
+            raise OSError(f"ffmpeg 转换失败: {ctx.path}")
+        self.logger(f"图片转换完成: {output}")
+        return ImageContext.open(output)
+
     # -- 图片辅助 --------------------------------------------------------- #
 
     @staticmethod
@@ -221,9 +308,14 @@ class MediaProcessingUnit:
         return w_padding, 0, w_padding, 0
 
     @staticmethod
-    def _get_dominant_color(file_path: Path) -> tuple[int, ...]:
-        haishoku = Haishoku.loadHaishoku(str(file_path))
-        return tuple(int(v * 0.8) for v in haishoku.palette[0][1])
+    def _get_dominant_color(img: Image.Image) -> tuple[int, ...]:
+        """与 Haishoku.loadHaishoku(...).palette[0] 相同的主色算法，直接使用已解码的图片"""
+        thumbnail = img.convert("RGB")
+        thumbnail.thumbnail((256, 256))
+        colors = alg.sort_by_rgb(thumbnail.getcolors(thumbnail.width * thumbnail.height))
+        grouped = alg.group_by_accuracy(colors)
+        colors_mean = [alg.get_weighted_mean(g) for plane in grouped for row in plane for g in row if g]
+        return tuple(int(v * 0.8) for v in max(colors_mean)[1])
 
     def _pad_image(
         self,
@@ -231,133 +323,140 @@ class MediaProcessingUnit:
         img: Image.Image,
         padding: tuple[int, int, int, int],
     ) -> MediaProcessResult:
-        fill_color = self._get_dominant_color(file_path)
+        fill_color = self._get_dominant_color(img)
         padded = ImageOps.expand(img, padding, fill=fill_color)
-        out_path = self.output_dir / f"padded_{time.time_ns()}.png"
+        out_path = self.output_dir / f"{file_path.stem}_padded_{time.time_ns()}.png"
         padded.save(out_path)
         self.logger(f"填充完成: padding={padding}, color={fill_color}, output={out_path}")
         return MediaProcessResult(output_paths=[out_path])
 
-    def _split_image(self, file_path: Path, segment_height: int) -> MediaProcessResult:
-        temp_dir = self.output_dir / f"split_{time.time_ns()}"
+    def _split_image(self, ctx: ImageContext, segment_height: int) -> MediaProcessResult:
+        temp_dir = self.output_dir / f"{ctx.path.stem}_split_{time.time_ns()}"
         temp_dir.mkdir(parents=True, exist_ok=True)
-        segments = self._do_split(file_path, temp_dir, segment_height)
+        segments = self._do_split(ctx, temp_dir, segment_height)
         self.logger(f"图片切割完成: {len(segments)} 段, output_dir={temp_dir}")
         return MediaProcessResult(output_paths=segments, temp_dir=temp_dir)
 
     def _do_split(
         self,
-        input_path: Path,
+        ctx: ImageContext,
         output_dir: Path,
         segment_height: int,
     ) -> list[Path]:
-        with Image.open(input_path) as img:
-            width, height = img.size
-            num_segments = math.ceil(height / segment_height)
-            self.logger(f"切割参数: size={width}x{height}, segment_h={segment_height}, num={num_segments}")
-            result: list[Path] = []
-            for i in range(num_segments):
-                top = i * segment_height - (self.overlap if i != 0 else 0)
-                bottom = min((i + 1) * segment_height, height)
-                segment = img.crop((0, top, width, bottom))
-                out_path = output_dir / f"segment_{i + 1:03d}.png"
-                segment.save(out_path)
-                result.append(out_path)
+        """按条带切割并以 JPEG 并行编码，第 i 段 (i > 0) 在顶部带上前一段末尾 overlap 像素"""
+        width, height = ctx.size
+        num_segments = math.ceil(height / segment_height)
+        self.logger(f"切割参数: size={width}x{height}, segment_h={segment_height}, num={num_segments}")
+        result = [output_dir / f"segment_{i + 1:03d}.jpg" for i in range(num_segments)]
+
+        with ThreadPoolExecutor(max_workers=self.split_workers) as pool:
+            pending: deque[Future] = deque()
+            for out_path, segment in zip(result, self._iter_segments(ctx, segment_height), strict=True):
+                if segment.mode not in ("RGB", "L"):
+                    segment = segment.convert("RGB")
+                # 限制同时在内存中的段数
+                if len(pending) >= self.split_workers:
+                    pending.popleft().result()
+                pending.append(pool.submit(segment.save, out_path, format="JPEG", **JPEG_SAVE_OPTIONS))
+            for future in pending:
+                future.result()
         return result
 
+    def _iter_segments(self, ctx: ImageContext, segment_height: int) -> Iterator[Image.Image]:
+        """依次产出带重叠的切割段
+
+        PNG 逐条带解码，每段由上一条带末尾 overlap 行与当前条带拼接；
+        其他格式 Pillow 无法部分解码，完整解码后直接裁剪。
+        """
+        width, height = ctx.size
+        if ctx.format == "PNG" and (strips := open_png_strips(ctx.path)) is not None:
+            prev: Image.Image | None = None
+            for strip in strips.iter_strips(segment_height):
+                if prev is None or not self.overlap:
+                    yield strip
+                else:
+                    overlap = min(self.overlap, prev.height)
+                    segment = Image.new(strip.mode, (width, strip.height + overlap))
+                    if strip.mode == "P":
+                        segment.putpalette(strip.getpalette() or [])
+                        segment.info = strip.info
+                    segment.paste(prev.crop((0, prev.height - overlap, width, prev.height)), (0, 0))
+                    segment.paste(strip, (0, overlap))
+                    yield segment
+                prev = strip
+            return
+
+        img = ctx.image
+        for i in range(math.ceil(height / segment_height)):
+            top = max(i * segment_height - (self.overlap if i != 0 else 0), 0)
+            bottom = min((i + 1) * segment_height, height)
+            yield img.crop((0, top, width, bottom))
+
     # ------------------------------------------------------------------ #
     #  视频处理
     # ------------------------------------------------------------------ #
 
     async def process_video(self, file_path: Path) -> MediaProcessResult:
+        intermediates: list[Path] = []
+        if self.transcode_h264 and (codec := await self.get_video_codec(file_path)) not in ("", "h264"):
+            self.logger(f"视频编码为 {codec}，开始转码为 h264")
+            if (transcoded := await self.ensure_h264(file_path)) != file_path:
+                intermediates.append(transcoded)
+                file_path = transcoded
+
         container = await self.get_container(file_path)
         self.logger(f"视频容器: container={container}, path={file_path}")
 
-        converted: Path | None = None
         if "mp4" not in container:
             self.logger("容器非 mp4，开始重新封装")
             converted = await self.remux_to_mp4(file_path)
             self.logger(f"封装完成: {converted}")
+            intermediates.append(converted)
 
-        source = converted or file_path
+        source = intermediates[-1] if intermediates else file_path
         video_size = source.stat().st_size
         self.logger(f"视频大小: {video_size / 1000 / 1000:.1f} MB ({video_size / 1024 / 1024:.1f} MiB)")
 
         if video_size > self.TG_MAX_VIDEO_SIZE:
             self.logger(f"视频超过 {self.TG_MAX_VIDEO_SIZE / 1000 / 1000:.0f} MB 限制，开始分割")
             output_paths, output_dir = await self.split_video(source, self.output_dir, self.TG_MAX_VIDEO_SIZE)
-            if converted:
-                os.remove(converted)
+            for path in intermediates:
+                os.remove(path)
             return MediaProcessResult(output_paths=output_paths, temp_dir=output_dir)
 
         return MediaProcessResult(output_paths=[source])
 
     @staticmethod
     async def get_video_codec(file_path: Path) -> str:
-        out = await run_cmd(
-            "ffprobe",
-            "-v",
-            "error",
-            "-select_streams",
-            "v:0",
-            "-show_entries",
-            "stream=codec_name",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            str(file_path),
-        )
-        return out.strip().lower() if out else ""
+        try:
+            return (await probe_media(file_path)).video_codec
+        except ValueError:
+            return ""
 
     @staticmethod
     async def get_container(file_path: Path) -> str:
-        result = await run_cmd(
-            "ffprobe", "-v", "error", "-show_entries", "format=format_name", "-of", "json", str(file_path)
-        )
-        r: dict[str, dict[str, str]] = json.loads(result)
-        if not (f := r.get("format", {})):
-            raise ValueError(f"ffprobe failed to get container: {result}")
-        return f["format_name"]
+        return (await probe_media(file_path)).format_name
 
     @staticmethod
     async def get_duration(file_path: Path) -> float:
-        out = await run_cmd(
-            "ffprobe",
-            "-v",
-            "error",
-            "-show_entries",
-            "format=duration",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            str(file_path),
-        )
-        return float(out.strip()) if out else 0.0
+        try:
+            return (await probe_media(file_path)).duration
+        except ValueError:
+            return 0.0
 
     async def remux_to_mp4(self, file_path: Path) -> Path:
         out = self.output_dir / (file_path.stem + "_remux" + ".mp4")
         cmd = ["ffmpeg", "-i", str(file_path), "-c", "copy", "-movflags", "+faststart", "-y", str(out)]
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.DEVNULL,
-        )
-        await proc.wait()
+        await run_process(*cmd, timeout=self.FFMPEG_COPY_TIMEOUT)
         return out
 
     async def ensure_h264(self, file_path: Path) -> Path:
-        out = self.output_dir / (file_path.stem + "_h264" + file_path.suffix)
+        out = self.output_dir / (file_path.stem + "_h264.mp4")
         duration = await self.get_duration(file_path)
         height = await self._get_video_height(file_path)
 
-        cmd = self._build_sw_transcode_cmd(file_path, out, duration, height)
-
         self.logger(f"h264 转码: {file_path.name} -> {out.name}, duration={duration:.0f}s, encoder=SW:libx264")
-
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.DEVNULL,
-        )
-        await proc.wait()
+        await self.transcoder.transcode(file_path, out, duration, height, on_progress=self.on_transcode_progress)
 
         if out.exists() and out.stat().st_size > 0:
             self.logger(f"h264 转码成功: size={out.stat().st_size / 1024 / 1024:.1f}MB")
@@ -368,51 +467,10 @@ class MediaProcessingUnit:
 
     @staticmethod
     async def _get_video_height(file_path: Path) -> int:
-        out = await run_cmd(
-            "ffprobe",
-            "-v",
-            "error",
-            "-select_streams",
-            "v:0",
-            "-show_entries",
-            "stream=height",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            str(file_path),
-        )
-        return int(out.strip()) if out and out.strip().isdigit() else 0
-
-    def _build_sw_transcode_cmd(self, file_path: Path, out: Path, duration: float, height: int) -> list[str]:
-        if duration <= 30:
-            preset, crf = "slow", "18"
-        elif duration <= 60:
-            preset, crf = "medium", "20"
-        elif duration <= 600:
-            preset, crf = "fast", "23"
-        elif duration <= 1800:
-            preset, crf = "veryfast", "26"
-        else:
-            preset, crf = "ultrafast", "28"
-
-        scale = ["-vf", "scale=-2:720"] if duration > 1800 and height > 720 else []
-        self.logger(f"SW 转码策略: preset={preset}, crf={crf}, scale={'720p' if scale else 'original'}")
-
-        return [
-            "ffmpeg",
-            "-i",
-            str(file_path),
-            "-c:v",
-            "libx264",
-            "-preset",
-            preset,
-            "-crf",
-            crf,
-            *scale,
-            "-c:a",
-            "aac",
-            "-y",
-            str(out),
-        ]
+        try:
+            return (await probe_media(file_path)).height
+        except ValueError:
+            return 0
 
     async def split_video(
         self,
@@ -425,19 +483,72 @@ class MediaProcessingUnit:
         if ffmpeg_args is None:
             ffmpeg_args = ["-c", "copy"]
 
-        base = file_path.stem
-        split_dir = output_dir / f"{base}_split"
+        split_dir = output_dir / f"{file_path.stem}_split"
         split_dir.mkdir(parents=True, exist_ok=True)
-        ext = file_path.suffix.lstrip(".")
-        total_duration = int(await self.get_duration(file_path))
         self.logger(
-            f"视频分割: duration={total_duration}s, "
+            f"视频分割: path={file_path}, "
             f"size_limit={size_limit / 1000 / 1000:.0f} MB ({size_limit / 1024 / 1024:.1f} MiB)"
         )
 
+        output_paths: list[Path] | None = None
+        if ffmpeg_args == ["-c", "copy"]:
+            # 只有 stream copy 的输出大小可以由源文件字节偏移估算
+            output_paths = await self._split_video_planned(file_path, split_dir, size_limit, keep_sec)
+        if output_paths is None:
+            output_paths = await self._split_video_sequential(file_path, split_dir, size_limit, ffmpeg_args, keep_sec)
+
+        self.logger(f"视频分割完成: {len(output_paths)} 段")
+        return output_paths, split_dir
+
+    def _part_path(self, file_path: Path, split_dir: Path, part: int) -> Path:
+        return split_dir / f"{file_path.stem}_part_{part:03d}{file_path.suffix}"
+
+    async def _split_video_planned(
+        self, file_path: Path, split_dir: Path, size_limit: int, keep_sec: float
+    ) -> list[Path] | None:
+        """按关键帧预先规划切割点并发执行 stream copy；无法规划或结果超限时返回 None"""
+        try:
+            duration = (await probe_media(file_path)).duration
+        except ValueError:
+            return None
+        keyframes = await probe_keyframes(file_path)
+        parts = plan_video_parts(keyframes, duration, file_path.stat().st_size, size_limit, keep_sec)
+        if not parts:
+            self.logger("未读取到关键帧，回退为逐段分割")
+            return None
+        self.logger(f"分割规划: duration={duration:.0f}s, keyframes={len(keyframes)}, parts={len(parts)}")
+
+        output_paths = [self._part_path(file_path, split_dir, i + 1) for i in range(len(parts))]
+        semaphore = asyncio.Semaphore(self.video_split_workers)
+
+        async def cut(part: VideoPart, out_file: Path) -> None:
+            # 输入端 -ss 在 stream copy 时会落到不晚于该时间的关键帧，加 1ms 避免浮点误差落到前一个关键帧
+            cmd = ["ffmpeg", "-v", "error", "-ss", f"{part.start + 0.001:.3f}", "-i", str(file_path)]
+            if part.duration is not None:
+                cmd += ["-t", f"{part.duration:.3f}"]
+            cmd += ["-fs", str(size_limit), "-c", "copy", "-y", str(out_file)]
+            async with semaphore:
+                await run_process(*cmd, timeout=self.FFMPEG_COPY_TIMEOUT)
+            self.logger(f"分割 part {out_file.name}: offset={part.start:.1f}s, duration={part.duration}")
+
+        await asyncio.gather(*(cut(part, out) for part, out in zip(parts, output_paths, strict=True)))
+
+        # 达到 -fs 上限说明估算偏小，该段末尾被截断
+        if invalid := [p for p in output_paths if not p.exists() or not 0 < p.stat().st_size < size_limit * 0.99]:
+            self.logger(f"分割结果异常，回退为逐段分割: {[p.name for p in invalid]}")
+            for p in output_paths:
+                p.unlink(missing_ok=True)
+            return None
+        return output_paths
+
+    async def _split_video_sequential(
+        self, file_path: Path, split_dir: Path, size_limit: int, ffmpeg_args: list[str], keep_sec: float
+    ) -> list[Path]:
+        """逐段执行 ffmpeg -fs，由每段输出的时长决定下一段起点"""
+        total_duration = int(await self.get_duration(file_path))
         cur, part, output_paths = 0, 1, []
         while cur < total_duration:
-            out_file = split_dir / f"{base}_part_{part:03d}.{ext}"
+            out_file = self._part_path(file_path, split_dir, part)
             output_paths.append(out_file)
             cmd = [
                 "ffmpeg",
@@ -451,12 +562,7 @@ class MediaProcessingUnit:
                 "-y",
                 str(out_file),
             ]
-            proc = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.DEVNULL,
-            )
-            await proc.wait()
+            await run_process(*cmd, timeout=self.FFMPEG_COPY_TIMEOUT if ffmpeg_args == ["-c", "copy"] else None)
 
             new_dur = int(await self.get_duration(out_file))
             self.logger(f"分割 part {part}: offset={cur}s, duration={new_dur}s, file={out_file}")
@@ -466,9 +572,7 @@ class MediaProcessingUnit:
             if cur < total_duration:
                 cur = max(cur - int(keep_sec), 0)
             part += 1
-
-        self.logger(f"视频分割完成: {len(output_paths)} 段")
-        return output_paths, split_dir
+        return output_paths
 
     # ------------------------------------------------------------------ #
     #  工具方法
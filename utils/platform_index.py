@@ -0,0 +1,109 @@
+"""平台识别索引 — 从各解析器的 __match__ 中提取必须出现的字面量，直接排除不可能匹配的文本，只对候选解析器做完整匹配"""
+
+import functools
+import re
+from collections.abc import Sequence
+from typing import Any
+
+from parsehub import Platform
+from parsehub.parsers.base import BaseParser
+from parsehub.utils.helpers import match_url
+
+try:
+    # re 的私有模块，结构随 Python 版本变化 (3.11 前为 sre_constants / sre_parse)
+    from re import _constants as sre_constants  # type: ignore[attr-defined]
+    from re import _parser as sre_parser  # type: ignore[attr-defined]
+except ImportError:
+    sre_constants = sre_parser = None
+
+type Literals = frozenset[str]
+
+
+def _better(a: Literals | None, b: Literals | None) -> Literals | None:
+    """选择区分度更高的一组：最短的字面量越长越好，其次备选越少越好"""
+    if not a:
+        return b
+    if not b:
+        return a
+    return max(a, b, key=lambda lits: (min(map(len, lits)), -len(lits)))
+
+
+def _required_literals(items: Any) -> Literals | None:
+    """
+    返回一组小写字面量，匹配的文本中至少包含其中一个；无法确定时返回 None。
+
+    只处理连续的字面字符、分组、分支与至少重复一次的部分，其余节点 (任意字符、字符集、断言等) 视为中断。
+    """
+    best: Literals | None = None
+    run: list[str] = []
+
+    def flush() -> None:
+        nonlocal best
+        if run:
+            best = _better(best, frozenset(["".join(run)]))
+            run.clear()
+
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av).lower())
+            continue
+        flush()
+        if op is sre_constants.SUBPATTERN:
+            best = _better(best, _required_literals(av[-1]))
+        elif op is sre_constants.BRANCH:
+            branches = [_required_literals(branch) for branch in av[1]]
+            if all(branches):
+                best = _better(best, frozenset().union(*branches))  # type: ignore[arg-type]
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, sre_constants.POSSESSIVE_REPEAT):
+            min_count, _, sub = av
+            if min_count >= 1:
+                best = _better(best, _required_literals(sub))
+    flush()
+    return best
+
+
+def _extract_literals(pattern: str) -> Literals | None:
+    """提取必需字面量；私有解析器不可用或解析出错时返回 None，该解析器按原方式完整匹配"""
+    if sre_parser is None:
+        return None
+    try:
+        return _required_literals(sre_parser.parse(pattern))
+    except Exception:
+        return None
+
+
+class PlatformIndex:
+    """
+    与 ParseHub.get_platform 结果一致的平台识别。
+
+    ParseHub 对每个解析器依次调用 match，每次都重新从文本中提取 URL；这里先用必需字面量筛出候选解析器，
+    URL 只提取一次，结果按文本缓存，同一条消息在过滤器与处理器中只识别一次。
+    重写了 match 的解析器 (如 Bilibili 识别 BV 号) 无法预判，始终按原方式匹配。
+    """
+
+    def __init__(self, parsers: Sequence[type[BaseParser]], maxsize: int = 4096):
+        self._entries: list[tuple[type[BaseParser], re.Pattern[str] | None, Literals | None]] = []
+        for parser in parsers:
+            if parser.match.__func__ is not BaseParser.match.__func__:
+                self._entries.append((parser, None, None))
+            elif parser.__match__:
+                self._entries.append((parser, re.compile(parser.__match__), _extract_literals(parser.__match__)))
+        self.detect = functools.lru_cache(maxsize=maxsize)(self._detect)
+
+    def _detect(self, text: str | None) -> Platform | None:
+        if not text:
+            return None
+        lowered = text.lower()
+        url: str | None = None
+        for parser, pattern, literals in self._entries:
+            if pattern is None:
+                if parser.match(text):
+                    return parser.__platform__
+                continue
+            if literals is not None and not any(literal in lowered for literal in literals):
+                continue
+            if url is None:
+                url = match_url(text)
+            if pattern.match(url):
+                return parser.__platform__
+        return None
@@ -0,0 +1,288 @@
+"""受管子进程 — 独立进程组运行外部命令，超时或取消时结束整个进程组，通过 rlimit 限制资源并记录耗时"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from core import bs
+from log import logger
+
+if sys.platform != "win32":
+    import resource
+
+_wait_executor: ThreadPoolExecutor | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class ProcessLimits:
+    memory_bytes: int = 0
+    """虚拟内存上限 (RLIMIT_AS)，0 为不限制"""
+    cpu_seconds: int = 0
+    """CPU 时间上限 (RLIMIT_CPU)，超出后子进程收到 SIGKILL，0 为不限制"""
+
+    @classmethod
+    def from_settings(cls) -> "ProcessLimits":
+        return cls(memory_bytes=bs.subprocess_memory_limit, cpu_seconds=bs.subprocess_cpu_limit)
+
+
+@dataclass(frozen=True, slots=True)
+class ProcessResult:
+    returncode: int
+    """退出码，被信号结束时为负的信号值"""
+    stdout: bytes
+    wall_time: float
+    cpu_time: float
+    """子进程 user + sys CPU 时间"""
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+
+@dataclass
+class ProcessStats:
+    count: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+
+
+class ProcessMetrics:
+    """按程序名 (ffmpeg / ffprobe ...) 汇总外部命令的次数与耗时"""
+
+    def __init__(self) -> None:
+        self._stats: defaultdict[str, ProcessStats] = defaultdict(ProcessStats)
+
+    def record(self, program: str, wall_time: float, cpu_time: float, *, ok: bool, timed_out: bool = False) -> None:
+        stats = self._stats[program]
+        stats.count += 1
+        stats.wall_time += wall_time
+        stats.cpu_time += cpu_time
+        stats.failures += not ok
+        stats.timeouts += timed_out
+
+    def record_cancelled(self, program: str, wall_time: float) -> None:
+        stats = self._stats[program]
+        stats.count += 1
+        stats.cancelled += 1
+        stats.wall_time += wall_time
+
+    def snapshot(self) -> dict[str, ProcessStats]:
+        return {program: ProcessStats(**vars(stats)) for program, stats in self._stats.items()}
+
+
+process_metrics = ProcessMetrics()
+
+
+def _get_wait_executor() -> ThreadPoolExecutor:
+    """os.wait4 是阻塞调用，放到专用线程池，避免占用默认线程池"""
+    global _wait_executor
+    if _wait_executor is None:
+        _wait_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="process-wait")
+    return _wait_executor
+
+
+if sys.platform != "win32":
+
+    def _apply_limits(pid: int, limits: ProcessLimits) -> None:
+        # prlimit 在子进程启动后设置，不使用 preexec_fn (多线程环境下 fork 后执行 Python 代码不安全)
+        if not hasattr(resource, "prlimit"):
+            return
+        try:
+            if limits.memory_bytes:
+                resource.prlimit(pid, resource.RLIMIT_AS, (limits.memory_bytes, limits.memory_bytes))
+            if limits.cpu_seconds:
+                resource.prlimit(pid, resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds))
+        except (ProcessLookupError, PermissionError, ValueError) as e:
+            logger.warning(f"设置子进程资源限制失败: pid={pid}, error={e}")
+
+    class _ProcessGroup:
+        """
+        子进程 (兼进程组组长) 的回收与结束。
+
+        回收与发送信号互斥：子进程被回收后 PID 可能被复用，此后不再对该进程组发信号。
+        支持 waitid 的平台先以 WNOWAIT 等待退出 (不回收)，再在锁内回收，锁只在回收僵尸进程的瞬间持有。
+        """
+
+        def __init__(self, pid: int):
+            self.pid = pid
+            self._lock = threading.Lock()
+            self._reaped = False
+
+        def wait(self) -> tuple[int, int, resource.struct_rusage]:
+            """阻塞等待子进程结束并回收，在等待线程中调用"""
+            if hasattr(os, "waitid"):
+                os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOWAIT)
+                with self._lock:
+                    self._reaped = True
+                    return os.wait4(self.pid, 0)
+            result = os.wait4(self.pid, 0)
+            with self._lock:
+                self._reaped = True
+            return result
+
+        def kill(self) -> None:
+            """子进程尚未回收时 SIGKILL 整个进程组"""
+            with self._lock:
+                if self._reaped:
+                    return
+                try:
+                    os.killpg(self.pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+
+
+async def _read_stdout(
+    reader: asyncio.StreamReader, chunks: list[bytes], on_line: Callable[[str], Awaitable[None]] | None
+) -> None:
+    if on_line is None:
+        chunks.append(await reader.read())
+        return
+    async for raw in reader:
+        chunks.append(raw)
+        await on_line(raw.decode(errors="ignore"))
+
+
+async def run_process(
+    *cmd: str | Path,
+    timeout: float | None = None,
+    capture_stdout: bool = False,
+    on_line: Callable[[str], Awaitable[None]] | None = None,
+    limits: ProcessLimits | None = None,
+) -> ProcessResult:
+    """
+    运行外部命令直到结束。
+
+    子进程位于独立的进程组，超时或当前任务被取消时整组 SIGKILL，不会遗留仍在运行的 ffmpeg。
+    Windows 上没有进程组与 rlimit，只结束子进程本身。
+    超时返回 timed_out=True 的结果；取消时结束子进程后继续抛出 CancelledError。
+    on_line 按行回调标准输出 (同时收集到 stdout)。
+    """
+    args = [str(c) for c in cmd]
+    program = Path(args[0]).name
+    capture = capture_stdout or on_line is not None
+    if sys.platform == "win32":
+        return await _run_process_simple(args, program, timeout, capture, on_line)
+    else:
+        return await _run_process_group(args, program, timeout, capture, on_line, limits)
+
+
+if sys.platform != "win32":
+
+    async def _run_process_group(
+        args: list[str],
+        program: str,
+        timeout: float | None,
+        capture: bool,
+        on_line: Callable[[str], Awaitable[None]] | None,
+        limits: ProcessLimits | None,
+    ) -> ProcessResult:
+        limits = limits if limits is not None else ProcessLimits.from_settings()
+        loop = asyncio.get_running_loop()
+
+        start = time.monotonic()
+        proc = subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        _apply_limits(proc.pid, limits)
+        group = _ProcessGroup(proc.pid)
+        waiter = loop.run_in_executor(_get_wait_executor(), group.wait)
+
+        chunks: list[bytes] = []
+        transport: asyncio.ReadTransport | None = None
+        reader_task: asyncio.Task | None = None
+        timed_out = False
+        try:
+            if proc.stdout is not None:
+                reader = asyncio.StreamReader(limit=1024 * 1024)
+                transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), proc.stdout)
+                reader_task = asyncio.create_task(_read_stdout(reader, chunks, on_line))
+            try:
+                async with asyncio.timeout(timeout):
+                    if reader_task is not None:
+                        await reader_task
+                    _, status, rusage = await asyncio.shield(waiter)
+            except TimeoutError:
+                timed_out = True
+                logger.warning(f"外部命令超时, 结束进程组: program={program}, pid={proc.pid}, timeout={timeout}s")
+                group.kill()
+                _, status, rusage = await waiter
+        except BaseException:
+            # 取消或回调异常：结束整个进程组，由等待线程回收
+            group.kill()
+            process_metrics.record_cancelled(program, time.monotonic() - start)
+            raise
+        finally:
+            if reader_task is not None and not reader_task.done():
+                reader_task.cancel()
+            if transport is not None:
+                transport.close()
+
+        returncode = os.waitstatus_to_exitcode(status)
+        proc.returncode = returncode  # 已由 wait4 回收，避免 Popen 再次等待
+        return _finish(program, returncode, chunks, start, rusage.ru_utime + rusage.ru_stime, timed_out)
+
+
+async def _run_process_simple(
+    args: list[str],
+    program: str,
+    timeout: float | None,
+    capture: bool,
+    on_line: Callable[[str], Awaitable[None]] | None,
+) -> ProcessResult:
+    """Windows 没有进程组、wait4 与 rlimit：使用 asyncio 子进程，超时或取消时只结束子进程本身，不统计 CPU 时间"""
+    start = time.monotonic()
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        limit=1024 * 1024,
+    )
+    chunks: list[bytes] = []
+    timed_out = False
+    try:
+        try:
+            async with asyncio.timeout(timeout):
+                if proc.stdout is not None:
+                    await _read_stdout(proc.stdout, chunks, on_line)
+                returncode = await proc.wait()
+        except TimeoutError:
+            timed_out = True
+            logger.warning(f"外部命令超时, 结束进程: program={program}, pid={proc.pid}, timeout={timeout}s")
+            proc.kill()
+            returncode = await proc.wait()
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+        process_metrics.record_cancelled(program, time.monotonic() - start)
+        raise
+    return _finish(program, returncode, chunks, start, 0.0, timed_out)
+
+
+def _finish(
+    program: str, returncode: int, chunks: list[bytes], start: float, cpu_time: float, timed_out: bool
+) -> ProcessResult:
+    wall_time = time.monotonic() - start
+    result = ProcessResult(returncode, b"".join(chunks), wall_time, cpu_time, timed_out)
+    process_metrics.record(program, wall_time, cpu_time, ok=result.ok, timed_out=timed_out)
+    logger.debug(
+        f"外部命令结束: program={program}, returncode={returncode}, wall={wall_time:.2f}s, cpu={cpu_time:.2f}s"
+    )
+    return result
@@ -0,0 +1,200 @@
+"""libx264 转码调度 — 限制同时运行的转码数，按排队深度选择 preset 与线程数，解析 ffmpeg -progress 输出"""
+
+import asyncio
+import math
+import os
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+
+from utils.process import run_process
+
+PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow")
+"""由快到慢"""
+
+
+@dataclass(frozen=True, slots=True)
+class TranscodePlan:
+    preset: str
+    crf: int
+    threads: int
+    scale_720p: bool
+
+
+@dataclass(slots=True)
+class TranscodeProgress:
+    """单个转码任务的进度，由 ffmpeg -progress 的 key=value 输出更新"""
+
+    path: Path
+    duration: float
+    out_time: float = 0.0
+    speed: float = 0.0
+    """相对实时的倍速"""
+    done: bool = False
+
+    @property
+    def percent(self) -> float:
+        if self.done:
+            return 100.0
+        if self.duration <= 0:
+            return 0.0
+        return min(self.out_time * 100 / self.duration, 99.9)
+
+    def update(self, line: str) -> bool:
+        """处理一行输出，返回 True 表示一个进度块结束 (progress=continue / end)"""
+        key, _, value = line.strip().partition("=")
+        match key:
+            case "out_time_us" | "out_time_ms":
+                # 两者单位均为微秒 (out_time_ms 是 ffmpeg 的历史命名错误)
+                if value.isdigit():
+                    self.out_time = int(value) / 1_000_000
+            case "speed":
+                try:
+                    self.speed = float(value.rstrip("x"))
+                except ValueError:
+                    pass
+            case "progress":
+                self.done = value == "end"
+                return True
+        return False
+
+
+type TranscodeProgressCallback = Callable[[TranscodeProgress], Awaitable[None]]
+
+
+def base_preset(duration: float) -> tuple[str, int]:
+    """按时长选择 preset 与 crf，短视频追求画质，长视频追求速度"""
+    if duration <= 30:
+        return "slow", 18
+    if duration <= 60:
+        return "medium", 20
+    if duration <= 600:
+        return "fast", 23
+    if duration <= 1800:
+        return "veryfast", 26
+    return "ultrafast", 28
+
+
+def select_plan(duration: float, height: int, queued: int, max_jobs: int, cpu_count: int) -> TranscodePlan:
+    """
+    在时长决定的 preset 基础上，每排队 max_jobs 个任务加快一档；
+    线程数按并发上限平分 CPU，避免多个 libx264 同时运行时超额占用。
+    """
+    preset, crf = base_preset(duration)
+    index = max(PRESETS.index(preset) - math.ceil(queued / max_jobs), 0)
+    return TranscodePlan(
+        preset=PRESETS[index],
+        crf=crf,
+        threads=max(1, cpu_count // max_jobs),
+        scale_720p=duration > 1800 and height > 720,
+    )
+
+
+def build_transcode_cmd(src: Path, out: Path, plan: TranscodePlan) -> list[str]:
+    scale = ["-vf", "scale=-2:720"] if plan.scale_720p else []
+    return [
+        "ffmpeg",
+        "-nostats",
+        "-progress",
+        "pipe:1",
+        "-i",
+        str(src),
+        "-c:v",
+        "libx264",
+        "-preset",
+        plan.preset,
+        "-crf",
+        str(plan.crf),
+        "-threads",
+        str(plan.threads),
+        *scale,
+        "-c:a",
+        "aac",
+        "-y",
+        str(out),
+    ]
+
+
+class TranscodeManager:
+    """
+    转码任务队列：同时最多运行 max_jobs 个 ffmpeg，其余排队等待。
+
+    用法：
+        manager = TranscodeManager(max_jobs=2)
+        ok = await manager.transcode(src, out, duration, height, on_progress=callback)
+    """
+
+    def __init__(self, max_jobs: int = 0, cpu_count: int | None = None, logger: Callable = logger.info):
+        self.cpu_count = cpu_count or os.cpu_count() or 1
+        self.max_jobs = max_jobs or max(1, self.cpu_count // 4)
+        self.logger = logger
+        self._semaphore = asyncio.Semaphore(self.max_jobs)
+        self._queued = 0
+        self._active: dict[int, tuple[TranscodePlan, TranscodeProgress]] = {}
+
+    @property
+    def queued(self) -> int:
+        """排队等待中的任务数"""
+        return self._queued
+
+    @property
+    def active_jobs(self) -> list[TranscodeProgress]:
+        return [progress for _, progress in self._active.values()]
+
+    @property
+    def active_threads(self) -> int:
+        """运行中的转码任务分配的编码线程总数"""
+        return sum(plan.threads for plan, _ in self._active.values())
+
+    async def transcode(
+        self,
+        src: Path,
+        out: Path,
+        duration: float,
+        height: int,
+        on_progress: TranscodeProgressCallback | None = None,
+    ) -> bool:
+        """转码为 H.264 + AAC，返回 ffmpeg 是否成功退出"""
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+
+        try:
+            plan = select_plan(duration, height, self._queued, self.max_jobs, self.cpu_count)
+            self.logger(
+                f"SW 转码策略: preset={plan.preset}, crf={plan.crf}, threads={plan.threads}, "
+                f"scale={'720p' if plan.scale_720p else 'original'}, queued={self._queued}"
+            )
+            progress = TranscodeProgress(src, duration)
+            self._active[id(progress)] = (plan, progress)
+            try:
+                # 最慢的 preset 也远快于 0.25 倍速，超出说明 ffmpeg 卡死
+                timeout = max(duration * 4, 0) + 600
+                return await self._run(build_transcode_cmd(src, out, plan), progress, on_progress, timeout)
+            finally:
+                del self._active[id(progress)]
+        finally:
+            self._semaphore.release()
+
+    async def _run(
+        self,
+        cmd: list[str],
+        progress: TranscodeProgress,
+        on_progress: TranscodeProgressCallback | None,
+        timeout: float,
+    ) -> bool:
+        async def on_line(line: str) -> None:
+            if progress.update(line) and on_progress is not None:
+                try:
+                    await on_progress(progress)
+                except Exception as e:
+                    self.logger(f"转码进度回调失败: {e}")
+
+        result = await run_process(*cmd, timeout=timeout, on_line=on_line)
+        if result.timed_out:
+            self.logger(f"转码超时: path={progress.path}, timeout={timeout:.0f}s")
+        return result.ok
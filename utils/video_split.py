@@ -0,0 +1,103 @@
+"""视频分割规划 — 一次读取关键帧位置，预先算出全部切割点，供 stream copy 并行分割"""
+
+import bisect
+from dataclasses import dataclass
+from pathlib import Path
+
+from utils.helpers import run_cmd
+
+
+@dataclass(frozen=True, slots=True)
+class Keyframe:
+    time: float
+    pos: int
+    """关键帧在文件中的字节偏移，未知时为 -1"""
+
+
+@dataclass(frozen=True, slots=True)
+class VideoPart:
+    start: float
+    duration: float | None
+    """None 表示到文件末尾"""
+
+
+async def probe_keyframes(file_path: str | Path, timeout: float = 300) -> list[Keyframe]:
+    """
+    读取第一条视频流全部关键帧的时间与字节偏移。
+
+    -skip_frame nokey 只解码关键帧，输出的行数与关键帧数相同；逐个输出 packet 时大文件有数百万行，容易超时。
+    """
+    out = await run_cmd(
+        "ffprobe",
+        "-v",
+        "error",
+        "-skip_frame",
+        "nokey",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "frame=key_frame,pts_time,pkt_pos",
+        "-of",
+        "csv=p=0",
+        str(file_path),
+        timeout=timeout,
+    )
+    return parse_keyframes(out)
+
+
+def parse_keyframes(out: str) -> list[Keyframe]:
+    """解析 ffprobe 输出的 key_frame,pts_time,pkt_pos 行，跳过非关键帧与无法解析的行"""
+    keyframes: list[Keyframe] = []
+    for line in out.splitlines():
+        fields = line.split(",")
+        if len(fields) < 3 or fields[0] != "1":
+            continue
+        try:
+            time = float(fields[1])
+        except ValueError:
+            continue
+        pos = int(fields[2]) if fields[2].isdigit() else -1
+        keyframes.append(Keyframe(time, pos))
+    keyframes.sort(key=lambda k: k.time)
+    return keyframes
+
+
+def plan_video_parts(
+    keyframes: list[Keyframe],
+    duration: float,
+    file_size: int,
+    size_limit: int,
+    keep_sec: float = 1.0,
+    safety: float = 0.95,
+) -> list[VideoPart]:
+    """
+    计算每段的起点与时长，每段都从关键帧开始，stream copy 时无需重新编码。
+
+    每段大小按关键帧字节偏移之差估算 (包含交错的音频)，没有偏移信息时按平均码率估算；
+    留出 safety 比例余量给封装开销。后一段从前一段结束点之前 keep_sec 秒处的关键帧开始，与旧实现一样保留重叠。
+    单个 GOP 超过上限时只能整段保留，由调用方用 -fs 兜底。
+    """
+    if not keyframes or duration <= 0 or file_size <= 0:
+        return []
+
+    byte_rate = file_size / duration
+    times = [k.time for k in keyframes]
+    positions = [k.pos if k.pos >= 0 else int(k.time * byte_rate) for k in keyframes]
+    # 末尾哨兵，表示文件结束
+    times.append(duration)
+    positions.append(file_size)
+    last = len(times) - 1
+    budget = size_limit * safety
+
+    parts: list[VideoPart] = []
+    start = 0
+    while True:
+        end = bisect.bisect_right(positions, positions[start] + budget) - 1
+        end = max(end, start + 1)
+        if end >= last:
+            parts.append(VideoPart(times[start], None))
+            return parts
+        parts.append(VideoPart(times[start], times[end] - times[start]))
+
+        next_start = bisect.bisect_right(times, times[end] - keep_sec) - 1
+        start = min(max(next_start, start + 1), end)